@@ -0,0 +1,553 @@
+"""
+Load test for the Flask API.
+
+Starts the server app in this process on an ephemeral port against an in-process MongoDB
+stand-in (mongomock) or a local mongod (--mongo-uri), seeds sales_data, predicted_sales and the
+rollups from the synthetic M5 generator, then runs a closed loop of concurrent clients over
+HTTP with a weighted mix of endpoints. Reports throughput, error rate and p50/p95/p99 latency
+per endpoint and compares them against the stored baseline of the run name: any endpoint whose
+p95/p99 is slower, or whose throughput is lower, than the baseline by more than the tolerance
+makes the run exit with status 1.
+
+Numbers are only comparable between runs on the same backend and machine. mongomock is a
+pure python store that runs on the server's threads, so it measures the API and serialization
+code paths rather than MongoDB, and the clients share the GIL with the server. --url drives an
+already running server instead (its own database, nothing is seeded).
+
+usage:
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --scale medium --concurrency 16 --duration 30 --save-baseline
+    python -m benchmarks.load_test --mix submit-input=2,fetch-table-data=5,fetch-results=5 --no-cache
+    python -m benchmarks.load_test --mongo-uri mongodb://localhost:27017 --name local-mongod
+    python -m benchmarks.load_test --url http://localhost:5050 --name dev-server
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import inspect
+import logging
+import argparse
+import threading
+import contextlib
+import http.client
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+
+from src.utils.components_utils import add_features
+from src.utils.synthetic_data_utils import (generate_calendar, generate_series_index, generate_sales,
+                                            generate_prices)
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCHMARK_DIR)
+SERVER_DIR = os.path.join(PROJECT_ROOT, 'website', 'server')
+BASELINE_DIR = os.path.join(BENCHMARK_DIR, 'baselines')
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+LOAD_TEST_DATABASE = 'overstock_loadtest'
+
+SCALES = {
+    'small': {'n_series': 50, 'n_days': 60},
+    'medium': {'n_series': 500, 'n_days': 90},
+    'large': {'n_series': 3000, 'n_days': 120},
+}
+DEFAULT_MIX = 'submit-input=1,fetch-table-data=3,fetch-results=3,stores=2,rollups=1'
+SAMPLE_SIZE = 500
+SEED_CHUNK_SIZE = 10000
+
+
+def parse_mix(value: str) -> dict:
+    """
+    endpoint=weight pairs separated by commas
+    """
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.strip().partition('=')
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint '{name}', choose from {', '.join(ENDPOINTS)}")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"weight of '{name}' is not a number")
+    if not any(weight > 0 for weight in mix.values()):
+        raise argparse.ArgumentTypeError("at least one endpoint needs a positive weight")
+    return mix
+
+
+def percentile_ms(latencies, q) -> float:
+    return round(float(np.percentile(latencies, q)) * 1000, 2) if latencies else None
+
+
+# ---------------------------------------------------------------------------------------------
+# seeding
+# ---------------------------------------------------------------------------------------------
+
+def generate_sales_documents(n_series: int, n_days: int, seed: int = 42) -> pd.DataFrame:
+    """
+    long sales_data rows (one per series and day) with the training features, from the
+    synthetic M5 tables. convert_dataframe only reads the last 125 days, the melt is done here.
+    """
+    rng = np.random.default_rng(seed)
+    calendar = generate_calendar(n_days, rng)
+    index_df = generate_series_index(n_series)
+    sales = generate_sales(index_df, n_days, zero_rate=0.5, rng=rng)
+    prices = generate_prices(index_df, calendar, rng)
+
+    df = sales.melt(id_vars=list(index_df.columns), var_name='d', value_name='sales')
+    df = df.merge(calendar, how='left', on='d').merge(prices, how='left', on=['store_id', 'item_id', 'wm_yr_wk'])
+    df['date'] = pd.to_datetime(df['date'])
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = add_features(df)
+    df = df.drop(columns=['d', 'wm_yr_wk', 'wday', 'snap_CA', 'snap_TX', 'snap_WI'])
+    # rows of a bulk load are stamped with the day they describe
+    df['created_at'] = df['date']
+    return df.reset_index(drop=True)
+
+
+def seed_database(db, n_series: int, n_days: int, seed: int = 42) -> dict:
+    """
+    replaces sales_data, predicted_sales and the rollups of the load test database
+    """
+    from config.mongodb import SALES_COLLECTION, PREDICTED_SALES_COLLECTION, ROLLUPS_COLLECTION, METADATA_COLLECTION
+    from utils.rollups import rebuild_rollups
+
+    for name in (SALES_COLLECTION, PREDICTED_SALES_COLLECTION, ROLLUPS_COLLECTION, METADATA_COLLECTION):
+        db.drop_collection(name)
+
+    df = generate_sales_documents(n_series, n_days, seed)
+    records = df.to_dict('records')
+    for i in range(0, len(records), SEED_CHUNK_SIZE):
+        db[SALES_COLLECTION].insert_many(records[i:i + SEED_CHUNK_SIZE])
+
+    # the last day of every series gets a prediction, like a batch scoring run
+    rng = np.random.default_rng(seed)
+    latest = df[df['date'] == df['date'].max()].copy()
+    latest['predicted_sales'] = np.round(latest['rolling_mean_28'].fillna(0) * rng.uniform(0.5, 1.5, len(latest)), 3)
+    db[PREDICTED_SALES_COLLECTION].insert_many(latest.to_dict('records'))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        rebuild_rollups(db)
+    return {'sales_data': len(records), 'predicted_sales': len(latest)}
+
+
+def patch_mongomock_bulk():
+    """
+    pymongo 4.9+ hands a `sort` keyword to the bulk builder of the collection (UpdateOne,
+    ReplaceOne), the mongomock one does not take it. single document sorts are not used by
+    the server's bulk writes, the keyword is dropped.
+    """
+    from mongomock.collection import BulkOperationBuilder
+    if 'sort' in inspect.signature(BulkOperationBuilder.add_update).parameters:
+        return
+    add_replace, add_update = BulkOperationBuilder.add_replace, BulkOperationBuilder.add_update
+
+    def replace(self, selector, doc, upsert=False, **kwargs):
+        return add_replace(self, selector, doc, upsert=upsert)
+
+    def update(self, selector, doc, multi=False, upsert=False, **kwargs):
+        return add_update(self, selector, doc, multi=multi, upsert=upsert)
+
+    BulkOperationBuilder.add_replace, BulkOperationBuilder.add_update = replace, update
+
+
+def load_server_app():
+    """
+    imports website/server/app.py. the server has its own `utils` package (a namespace
+    package, no __init__) which the project root's `utils` would shadow, so the root is left
+    off sys.path until the server modules are imported.
+    """
+    if 'utils' in sys.modules:
+        raise RuntimeError("a `utils` package is already imported, run the load test in a fresh interpreter")
+    root = os.path.normcase(PROJECT_ROOT)
+    project_paths = [path for path in sys.path if os.path.normcase(os.path.abspath(path or '.')) == root]
+    sys.path[:] = [SERVER_DIR] + [path for path in sys.path if path not in project_paths]
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app as server_app
+    finally:
+        sys.path[1:1] = project_paths
+    return server_app.app
+
+
+class LocalServer:
+    """
+    the server app on a threaded werkzeug server on 127.0.0.1, in a daemon thread
+    """
+    def __init__(self, args):
+        self.args = args
+        self.seeded = {}
+        self._server = None
+
+    def start(self) -> str:
+        args = self.args
+        os.environ['MONGODB_ENSURE_INDEXES'] = '0'
+        os.environ['MONGODB_URI'] = args.mongo_uri or 'mongodb://mongomock.invalid'
+        os.environ.setdefault('MONGODB_DATABASE', LOAD_TEST_DATABASE)
+        os.environ['RESULT_CACHE'] = '0' if args.no_cache else '1'
+        if args.artifacts_dir:
+            os.environ['SCORING_ARTIFACTS_DIR'] = os.path.abspath(args.artifacts_dir)
+        if not args.mongo_uri:
+            # no $densify / $setWindowFields in mongomock
+            os.environ['FEATURE_MODE'] = 'python'
+
+        app = load_server_app()
+        from config import mongodb
+        if not args.mongo_uri:
+            import mongomock
+            patch_mongomock_bulk()
+            mongodb._client = mongomock.MongoClient()
+
+        db = mongodb.get_db()
+        print(f"🌱 Seeding {db.name} with {args.series} series x {args.days} days "
+              f"({'mongomock' if not args.mongo_uri else args.mongo_uri})")
+        started = time.perf_counter()
+        self.seeded = seed_database(db, args.series, args.days, args.seed)
+        if args.mongo_uri:
+            from config.indexes import ensure_indexes
+            with contextlib.redirect_stdout(io.StringIO()):
+                ensure_indexes()
+        print(f"✅ Seeded {self.seeded['sales_data']} sales rows in {time.perf_counter() - started:.1f}s")
+
+        from werkzeug.serving import make_server
+        # one access log line per request would dominate the run
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        self._server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=self._server.serve_forever, name='load-test-server', daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+
+# ---------------------------------------------------------------------------------------------
+# load
+# ---------------------------------------------------------------------------------------------
+
+class Client:
+    """
+    one keep-alive connection per worker, reopened after errors and `Connection: close`
+    """
+    def __init__(self, base_url: str, timeout: float):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.timeout = timeout
+        self._connection = None
+
+    def request(self, method: str, path: str, body=None):
+        """
+        returns (status, body bytes)
+        """
+        headers = {'Accept-Encoding': 'identity'}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        if self._connection is None:
+            self._connection = self.connection_class(self.host, self.port, timeout=self.timeout)
+        try:
+            self._connection.request(method, path, body=payload, headers=headers)
+            response = self._connection.getresponse()
+            data = response.read()
+        except Exception:
+            self.close()
+            raise
+        if response.will_close:
+            self.close()
+        return response.status, data
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class Workload:
+    """
+    request bodies drawn from a sample of the stored rows, fetched through the API so the
+    same workload runs against any server
+    """
+    def __init__(self, client: Client, page_size: int, batch_size: int):
+        self.page_size = page_size
+        self.batch_size = batch_size
+        status, data = client.request('GET', f"/fetch-table-data?limit={SAMPLE_SIZE}")
+        if status != 200:
+            raise RuntimeError(f"could not sample sales_data through /fetch-table-data: {status} {data[:200]!r}")
+        self.rows = [row for row in json.loads(data)['data'] if row.get('item_id') and row.get('store_id')]
+        if not self.rows:
+            raise RuntimeError("sales_data is empty, there is nothing to build requests from")
+
+    def submit_body(self, rng: random.Random) -> dict:
+        row = rng.choice(self.rows)
+        return {
+            'item_id': row['item_id'], 'store_id': row['store_id'],
+            'snap': rng.choice(['yes', 'no']), 'sell_price': row.get('sell_price') or 1.0,
+            'event_name_1': None, 'event_type_1': None, 'event_name_2': None, 'event_type_2': None,
+        }
+
+    def predict_body(self, rng: random.Random) -> dict:
+        return {key: value for key, value in rng.choice(self.rows).items() if key != '_id'}
+
+
+# endpoint name -> (method, path, body) built from the workload
+ENDPOINTS = {
+    'submit-input': lambda w, rng: ('POST', '/submit-input', w.submit_body(rng)),
+    'submit-inputs': lambda w, rng: ('POST', '/submit-inputs', [w.submit_body(rng) for _ in range(w.batch_size)]),
+    'fetch-table-data': lambda w, rng: ('GET', f"/fetch-table-data?limit={w.page_size}", None),
+    'fetch-results': lambda w, rng: ('GET', f"/fetch-results?limit={w.page_size}", None),
+    'stores': lambda w, rng: ('GET', '/stores', None),
+    'rollups': lambda w, rng: ('GET', '/rollups/date', None),
+    'predict': lambda w, rng: ('POST', '/predict', w.predict_body(rng)),
+    'health': lambda w, rng: ('GET', '/health', None),
+}
+
+
+class LoadRunner:
+    """
+    closed loop: every worker sends its next request as soon as the previous one answered,
+    requests finished during the warmup are not recorded
+    """
+    def __init__(self, base_url: str, mix: dict, concurrency: int, duration: float, warmup: float,
+                 page_size: int = 100, batch_size: int = 50, timeout: float = 30, seed: int = 42):
+        self.base_url = base_url
+        self.mix = {name: weight for name, weight in mix.items() if weight > 0}
+        self.concurrency = concurrency
+        self.duration = duration
+        self.warmup = warmup
+        self.timeout = timeout
+        self.seed = seed
+        self.workload = Workload(Client(base_url, timeout), page_size, batch_size)
+        self._samples = {name: [] for name in self.mix}
+        self._errors = {name: {} for name in self.mix}
+        self._lock = threading.Lock()
+
+    def _worker(self, index: int, record_from: float, stop_at: float):
+        rng = random.Random(self.seed + index)
+        client = Client(self.base_url, self.timeout)
+        names, weights = list(self.mix), list(self.mix.values())
+        samples = {name: [] for name in names}
+        errors = {name: {} for name in names}
+        while True:
+            name = rng.choices(names, weights)[0]
+            method, path, body = ENDPOINTS[name](self.workload, rng)
+            started = time.perf_counter()
+            try:
+                status, _ = client.request(method, path, body)
+                error = None if status < 400 else str(status)
+            except Exception as e:
+                error = type(e).__name__
+            finished = time.perf_counter()
+            if finished >= stop_at:
+                break
+            if started >= record_from:
+                if error is None:
+                    samples[name].append(finished - started)
+                else:
+                    errors[name][error] = errors[name].get(error, 0) + 1
+        client.close()
+        with self._lock:
+            for name in names:
+                self._samples[name].extend(samples[name])
+                for error, count in errors[name].items():
+                    self._errors[name][error] = self._errors[name].get(error, 0) + count
+
+    def run(self) -> dict:
+        started = time.perf_counter()
+        record_from, stop_at = started + self.warmup, started + self.warmup + self.duration
+        workers = [threading.Thread(target=self._worker, args=(i, record_from, stop_at), daemon=True)
+                   for i in range(self.concurrency)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        endpoints = {}
+        for name in self.mix:
+            latencies = self._samples[name]
+            error_count = sum(self._errors[name].values())
+            total = len(latencies) + error_count
+            endpoints[name] = {
+                'requests': total,
+                'errors': error_count,
+                'error_rate': round(error_count / total, 4) if total else 0.0,
+                'error_codes': self._errors[name],
+                'throughput_rps': round(len(latencies) / self.duration, 2),
+                'mean_ms': round(float(np.mean(latencies)) * 1000, 2) if latencies else None,
+                'p50_ms': percentile_ms(latencies, 50),
+                'p95_ms': percentile_ms(latencies, 95),
+                'p99_ms': percentile_ms(latencies, 99),
+                'max_ms': round(max(latencies) * 1000, 2) if latencies else None,
+            }
+        every = [latency for name in self.mix for latency in self._samples[name]]
+        errors = sum(endpoint['errors'] for endpoint in endpoints.values())
+        overall = {
+            'requests': len(every) + errors,
+            'errors': errors,
+            'throughput_rps': round(len(every) / self.duration, 2),
+            'p50_ms': percentile_ms(every, 50),
+            'p95_ms': percentile_ms(every, 95),
+            'p99_ms': percentile_ms(every, 99),
+        }
+        return {'endpoints': endpoints, 'overall': overall}
+
+
+# ---------------------------------------------------------------------------------------------
+# reporting
+# ---------------------------------------------------------------------------------------------
+
+def print_report(results: dict):
+    header = f"{'endpoint':<18}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print('-' * len(header))
+
+    def fmt(value):
+        return '-' if value is None else f"{value:.2f}"
+
+    rows = list(results['endpoints'].items()) + [('overall', results['overall'])]
+    for name, stats in rows:
+        print(f"{name:<18}{stats['requests']:>10}{stats['errors']:>8}{fmt(stats['throughput_rps']):>10}"
+              f"{fmt(stats['p50_ms']):>10}{fmt(stats['p95_ms']):>10}{fmt(stats['p99_ms']):>10}")
+
+
+def compare_with_baseline(results: dict, baseline: dict, latency_tolerance: float, throughput_tolerance: float) -> list:
+    """
+    returns a list of human readable regressions, empty when everything is within tolerance
+    """
+    regressions = []
+    for name, current in results['endpoints'].items():
+        reference = baseline.get('endpoints', {}).get(name)
+        if reference is None:
+            continue
+
+        for key in ('p95_ms', 'p99_ms'):
+            now, then = current.get(key), reference.get(key)
+            ## sub millisecond latencies are noise
+            if now and then and max(now, then) > 1 and now > then * (1 + latency_tolerance):
+                regressions.append(f"{name}: {key[:3]} {now:.2f}ms vs baseline {then:.2f}ms (+{100 * (now / then - 1):.0f}%)")
+
+        now, then = current['throughput_rps'], reference['throughput_rps']
+        if then and now < then * (1 - throughput_tolerance):
+            regressions.append(f"{name}: throughput {now:.1f} req/s vs baseline {then:.1f} req/s "
+                               f"(-{100 * (1 - now / then):.0f}%)")
+
+        if current['error_rate'] > reference.get('error_rate', 0) + 0.01:
+            regressions.append(f"{name}: error rate {100 * current['error_rate']:.1f}% vs baseline "
+                               f"{100 * reference.get('error_rate', 0):.1f}% {current['error_codes']}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the Flask API against a local MongoDB stand-in')
+    parser.add_argument('--name', help='name of the run, baselines are stored per name (defaults to the scale)')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--series', type=int, help='overrides the number of seeded series of the scale')
+    parser.add_argument('--days', type=int, help='overrides the number of seeded days of the scale')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"weighted endpoints, default {DEFAULT_MIX} (also: submit-inputs, predict, health)")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20, help='seconds recorded')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds before recording starts')
+    parser.add_argument('--page-size', type=int, default=100, help='limit of the fetch endpoints')
+    parser.add_argument('--batch-size', type=int, default=50, help='rows per /submit-inputs request')
+    parser.add_argument('--timeout', type=float, default=30, help='seconds per request')
+    parser.add_argument('--no-cache', action='store_true', help='serve without the result cache (local server)')
+    parser.add_argument('--mongo-uri', help='seed and use this MongoDB instead of mongomock (database '
+                                            f'$MONGODB_DATABASE, default {LOAD_TEST_DATABASE}, is replaced)')
+    parser.add_argument('--artifacts-dir', help='training artifacts for the predict endpoint (local server)')
+    parser.add_argument('--url', help='load an already running server instead of starting one')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency-tolerance', type=float, default=0.25)
+    parser.add_argument('--throughput-tolerance', type=float, default=0.2)
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline of its name')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scale = SCALES[args.scale]
+    overridden = args.series is not None or args.days is not None
+    args.series = args.series if args.series is not None else scale['n_series']
+    args.days = args.days if args.days is not None else scale['n_days']
+    name = args.name or (f"{args.scale}-custom" if overridden else args.scale)
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server = LocalServer(args)
+        base_url = server.start()
+
+    try:
+        print(f"🚀 {args.concurrency} clients for {args.duration:g}s (+{args.warmup:g}s warmup) against {base_url}")
+        runner = LoadRunner(base_url, args.mix, args.concurrency, args.duration, args.warmup,
+                            page_size=args.page_size, batch_size=args.batch_size, timeout=args.timeout, seed=args.seed)
+        load = runner.run()
+        cache = None
+        with contextlib.suppress(Exception):
+            status, data = Client(base_url, args.timeout).request('GET', '/cache/stats')
+            cache = json.loads(data).get('cache') if status == 200 else None
+    finally:
+        if server is not None:
+            server.stop()
+
+    results = {
+        'name': name,
+        'target': 'mongomock' if server is not None and not args.mongo_uri else args.mongo_uri or args.url,
+        'params': {
+            'series': args.series if server else None,
+            'days': args.days if server else None,
+            'mix': args.mix,
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+            'page_size': args.page_size,
+            'batch_size': args.batch_size,
+            'result_cache': None if server is None else not args.no_cache,
+        },
+        'seeded': server.seeded if server else None,
+        'seed': args.seed,
+        'created_at': datetime.now().isoformat(),
+        'python_version': sys.version.split()[0],
+        'cpu_count': os.cpu_count(),
+        **load,
+        'cache': cache,
+    }
+    print_report(results)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results_path = os.path.join(RESULTS_DIR, f"load_{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(results_path, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f"📄 Results written to {results_path}")
+
+    baseline_path = os.path.join(BASELINE_DIR, f"load_{name}.json")
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"💾 Baseline saved to {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print(f"⚠️ No baseline at {baseline_path}, run with --save-baseline to create one")
+        return 0
+
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    regressions = compare_with_baseline(results, baseline, args.latency_tolerance, args.throughput_tolerance)
+    if regressions:
+        print("❌ PERFORMANCE REGRESSIONS against the baseline:")
+        for regression in regressions:
+            print(f"   {regression}")
+        return 1
+
+    print("✅ All endpoints within tolerance of the baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,306 @@
+"""
+Benchmark suite for the training pipeline components.
+
+Generates (and caches) a synthetic M5 dataset at the requested scale, runs every component on it
+under the pipeline profiler and compares wall time and peak memory against the stored baseline
+for that scale. Any component slower or hungrier than the baseline plus the tolerance makes the
+run exit with status 1.
+
+usage:
+    python -m benchmarks.run_benchmarks --scale small
+    python -m benchmarks.run_benchmarks --scale medium --save-baseline
+    python -m benchmarks.run_benchmarks --series 5000 --days 300 --zero-rate 0.7 --components add_features smart_binning
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import importlib.util
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.components.data_ingestion import DataIngestion
+from src.components.data_transformation import DataTransformation
+from src.components.model_trainer_2 import ModelTrainer
+from src.components.smart_bin import SmartBinning
+from src.components.clearance_simulator import ClearanceSimulation
+from src.entity.artifact import DataIngestionArtifact
+from src.entity.config import (TrainingConfig, DataIngestionConfig, DataTransformationConfig,
+                               ModelTrainerConfig, SmartBinningConfig, ProfilingConfig,
+                               ClearanceSimulationConfig)
+from src.utils.components_utils import convert_dataframe, add_features
+from src.utils.profiling_utils import PipelineProfiler, profile_stage
+from src.utils.synthetic_data_utils import generate_m5_dataset
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCHMARK_DIR)
+DATA_DIR = os.path.join(BENCHMARK_DIR, 'data')
+BASELINE_DIR = os.path.join(BENCHMARK_DIR, 'baselines')
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+FEATURE_MODULE_PATH = os.path.join(PROJECT_ROOT, 'website', 'server', 'utils', 'feature.py')
+
+SCALES = {
+    'small': {'n_series': 200, 'n_days': 200, 'zero_rate': 0.5},
+    'medium': {'n_series': 2000, 'n_days': 400, 'zero_rate': 0.6},
+    'large': {'n_series': 30490, 'n_days': 1913, 'zero_rate': 0.68},
+}
+COMPONENTS = ['convert_dataframe', 'add_features', 'data_transformation', 'model_training',
+              'smart_binning', 'clearance_simulation', 'feature_routes']
+FEATURE_ROUTE_CALLS = 200
+
+
+def load_feature_module():
+    """
+    the serving feature code lives in website/server which has its own `utils` package,
+    so it is loaded by path instead of through the import system
+    """
+    spec = importlib.util.spec_from_file_location('server_feature', FEATURE_MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class BenchmarkSuite:
+    def __init__(self, scale_name: str, scale: dict, components: list, repeat: int = 1, seed: int = 42):
+        self.scale_name = scale_name
+        self.scale = scale
+        self.components = components
+        self.repeat = repeat
+        self.seed = seed
+        self.data_dir = os.path.join(
+            DATA_DIR, f"{scale['n_series']}x{scale['n_days']}_z{scale['zero_rate']}_s{seed}"
+        )
+        self.work_dir = tempfile.mkdtemp(prefix='benchmark_')
+        self.results = {}
+
+    def prepare_data(self):
+        paths = {key: os.path.join(self.data_dir, name) for key, name in
+                 [('calendar', 'calendar.csv'), ('sales', 'sales_train_validation.csv'), ('prices', 'sell_prices.csv')]}
+        if not all(os.path.exists(path) for path in paths.values()):
+            print(f"🧪 Generating synthetic M5 data in {self.data_dir}")
+            paths = generate_m5_dataset(self.data_dir, seed=self.seed, **self.scale)
+        return paths
+
+    def _measure(self, component, func):
+        """
+        runs func `repeat` times under its own stage and keeps the fastest run
+        """
+        best = None
+        output = None
+        for _ in range(self.repeat):
+            with profile_stage(component) as stage:
+                output, rows_in, rows_out = func()
+                stage.rows_in, stage.rows_out = rows_in, rows_out
+            result = {
+                'wall_s': stage.wall_s,
+                'cpu_s': stage.cpu_s,
+                'peak_rss_delta_mb': round(stage.peak_rss_mb - stage.rss_start_mb, 3)
+                                     if stage.peak_rss_mb is not None and stage.rss_start_mb is not None else None,
+                'rows_in': rows_in,
+                'rows_out': rows_out,
+            }
+            if best is None or result['wall_s'] < best['wall_s']:
+                best = result
+        self.results[component] = best
+        print(f"   {component:<22} {best['wall_s']:>10.3f}s  {best['peak_rss_delta_mb'] or 0:>10.1f} MB")
+        return output
+
+    def run(self):
+        paths = self.prepare_data()
+        training_config = TrainingConfig(datetime.now())
+        training_config.artifact_dir_path = os.path.join(self.work_dir, training_config.timestamp)
+        profiler = PipelineProfiler(ProfilingConfig(training_config)).start()
+        try:
+            return self._run_components(paths, training_config, profiler)
+        finally:
+            # stop() is idempotent, _finish already stopped the profiler unless a component raised
+            profiler.stop()
+
+    def _run_components(self, paths, training_config, profiler):
+        calendar = pd.read_csv(paths['calendar'])
+        sales = pd.read_csv(paths['sales'])
+        prices = pd.read_csv(paths['prices'])
+        print(f"⏱️ Benchmarking scale '{self.scale_name}' {self.scale}")
+
+        ## convert_dataframe and add_features feed every other component so they always run,
+        ## only the selected components end up in the results
+        merged = self._measure('convert_dataframe',
+                               lambda: self._rows(convert_dataframe(calendar, sales, prices), len(sales)))
+        featured = self._measure('add_features', lambda: self._rows(add_features(merged), len(merged)))
+        if 'feature_routes' in self.components:
+            self._measure('feature_routes', lambda: self._feature_routes(featured))
+        if not self._needs_pipeline():
+            return self._finish(profiler)
+
+        ingestion_config = DataIngestionConfig(training_config)
+        data_ingestion = DataIngestion(ingestion_config)
+        final_columns = ['item_id', 'dept_id', 'store_id', 'state_id', 'weekday', 'month', 'week_of_month', 'event_name_1', 'event_type_1', 'event_name_2',
+                         'event_type_2', 'snap_active', 'sell_price', 'lag_28', 'lag_7', 'rolling_mean_28', 'price_pct_change', 'zero_streak', 'sales_28_sum']
+        final_df = featured.dropna(subset=['lag_28', 'lag_7', 'rolling_mean_28', 'sales_28_sum', 'price_pct_change', 'zero_streak'])[final_columns]
+        data_ingestion.begin_train_test_split(final_df)
+        ingestion_artifact = DataIngestionArtifact(ingestion_config.train_path, ingestion_config.test_path)
+
+        transformation = DataTransformation(ingestion_artifact, DataTransformationConfig(training_config))
+        transformation_artifact = self._measure(
+            'data_transformation', lambda: (transformation.initiate_data_transformation(), len(final_df), len(final_df)))
+        if not any(c in self.components for c in ['model_training', 'smart_binning', 'clearance_simulation']):
+            return self._finish(profiler)
+
+        trainer = ModelTrainer(transformation_artifact, ModelTrainerConfig(training_config))
+        trainer_artifact = self._measure(
+            'model_training', lambda: (trainer.initiate_model_training(), len(final_df), len(final_df)))
+
+        if any(c in self.components for c in ['smart_binning', 'clearance_simulation']):
+            sb_df = pd.read_csv(ingestion_artifact.train_path)
+            sb_df['future_sales'] = pd.read_csv(trainer_artifact.predicted_path).iloc[:, 0].values
+            offsets = np.random.default_rng(self.seed).integers(-100, 101, size=len(sb_df))
+            sb_df['actual_stock'] = (sb_df['future_sales'] + offsets).clip(lower=0)
+            binning_config = SmartBinningConfig(training_config, previous_model_file_path=None)
+            binning_artifact = self._measure('smart_binning',
+                                             lambda: (SmartBinning(sb_df, binning_config).run(), len(sb_df), len(sb_df)))
+
+            if 'clearance_simulation' in self.components:
+                simulation = ClearanceSimulation(binning_artifact, ClearanceSimulationConfig(training_config, n_draws=200))
+                self._measure('clearance_simulation', lambda: (simulation.run(), len(sb_df), len(sb_df)))
+
+        return self._finish(profiler)
+
+    def _needs_pipeline(self):
+        return any(c in self.components for c in ['data_transformation', 'model_training', 'smart_binning',
+                                                  'clearance_simulation'])
+
+    @staticmethod
+    def _rows(df, rows_in):
+        return df, rows_in, len(df)
+
+    def _feature_routes(self, featured):
+        """
+        serving side feature computation for a sample of series, on the last 60 days of history
+        """
+        feature_module = load_feature_module()
+        last_date = featured['date'].max()
+        current_date = (last_date + pd.Timedelta(days=1)).to_pydatetime()
+        history = featured[featured['date'] >= last_date - pd.Timedelta(days=59)]
+        history = history[['item_id', 'store_id', 'date', 'sales', 'sell_price']]
+
+        groups = list(history.groupby(['item_id', 'store_id']))
+        rng = np.random.default_rng(self.seed)
+        picks = rng.choice(len(groups), size=min(FEATURE_ROUTE_CALLS, len(groups)), replace=False)
+        requests = [(groups[i][0], groups[i][1].to_dict('records')) for i in picks]
+
+        for (item_id, store_id), records in requests:
+            feature_module.compute_features_from_records(records, item_id, store_id, current_date)
+        return None, len(requests), len(requests)
+
+    def _finish(self, profiler):
+        profiler.stop()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+        return {
+            'scale': self.scale_name,
+            'params': self.scale,
+            'seed': self.seed,
+            'repeat': self.repeat,
+            'created_at': datetime.now().isoformat(),
+            'python_version': sys.version.split()[0],
+            'cpu_count': os.cpu_count(),
+            'components': {name: self.results[name] for name in self.components if name in self.results},
+        }
+
+
+def compare_with_baseline(results: dict, baseline: dict, time_tolerance: float, memory_tolerance: float) -> list:
+    """
+    returns a list of human readable regressions, empty when everything is within tolerance
+    """
+    regressions = []
+    for component, current in results['components'].items():
+        reference = baseline.get('components', {}).get(component)
+        if reference is None:
+            continue
+
+        if current['wall_s'] > reference['wall_s'] * (1 + time_tolerance):
+            regressions.append(
+                f"{component}: wall time {current['wall_s']:.3f}s vs baseline {reference['wall_s']:.3f}s "
+                f"(+{100 * (current['wall_s'] / reference['wall_s'] - 1):.0f}%)"
+            )
+
+        current_mem, reference_mem = current.get('peak_rss_delta_mb'), reference.get('peak_rss_delta_mb')
+        ## tiny allocations are noise, only compare above 16 MB
+        if current_mem and reference_mem and max(current_mem, reference_mem) > 16 \
+                and current_mem > reference_mem * (1 + memory_tolerance):
+            regressions.append(
+                f"{component}: peak memory {current_mem:.1f}MB vs baseline {reference_mem:.1f}MB "
+                f"(+{100 * (current_mem / reference_mem - 1):.0f}%)"
+            )
+
+        if current.get('rows_out') != reference.get('rows_out'):
+            regressions.append(
+                f"{component}: rows out {current.get('rows_out')} vs baseline {reference.get('rows_out')}"
+            )
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the overstock pipeline on synthetic M5 data')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--series', type=int, help='overrides the number of series of the scale')
+    parser.add_argument('--days', type=int, help='overrides the number of days of the scale')
+    parser.add_argument('--zero-rate', type=float, help='overrides the zero inflation rate of the scale')
+    parser.add_argument('--components', nargs='+', choices=COMPONENTS, default=COMPONENTS)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--time-tolerance', type=float, default=0.25)
+    parser.add_argument('--memory-tolerance', type=float, default=0.25)
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline of the scale')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scale = dict(SCALES[args.scale])
+    overridden = False
+    for key, value in [('n_series', args.series), ('n_days', args.days), ('zero_rate', args.zero_rate)]:
+        if value is not None:
+            scale[key] = value
+            overridden = True
+    scale_name = f"{args.scale}-custom" if overridden else args.scale
+
+    suite = BenchmarkSuite(scale_name, scale, args.components, repeat=args.repeat, seed=args.seed)
+    results = suite.run()
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results_path = os.path.join(RESULTS_DIR, f"{scale_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(results_path, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f"📄 Results written to {results_path}")
+
+    baseline_path = os.path.join(BASELINE_DIR, f"{scale_name}.json")
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"💾 Baseline saved to {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print(f"⚠️ No baseline at {baseline_path}, run with --save-baseline to create one")
+        return 0
+
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    regressions = compare_with_baseline(results, baseline, args.time_tolerance, args.memory_tolerance)
+    if regressions:
+        print("❌ PERFORMANCE REGRESSIONS against the baseline:")
+        for regression in regressions:
+            print(f"   {regression}")
+        return 1
+
+    print("✅ All components within tolerance of the baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+
+# metric column -> summary column prefix
+SUMMARY_METRICS = {'overstock_score': 'overstock', 'days_of_supply': 'days_of_supply'}
+SUMMARY_QUANTILES = (0.1, 0.5, 0.9)
+# buckets per metric of the streaming quantile sketch
+SKETCH_BUCKETS = 512
+
+
+class GroupIndex:
+    """
+    rows grouped by integer code with one stable sort (radix for up to 2**15 groups), shared
+    by every metric summarized over the same codes
+    """
+    def __init__(self, codes: np.ndarray, n_groups: int):
+        self.codes = codes
+        self.n_groups = n_groups
+        self.order = np.argsort(codes.astype(np.int16 if n_groups < 2 ** 15 else np.int64), kind='stable')
+        self.bounds = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=n_groups))])
+
+    def stats(self, values: np.ndarray, quantiles, group_of: np.ndarray = None, bin_stats: dict = None) -> dict:
+        """
+        count, mean and quantiles (linearly interpolated like np.quantile) of values per group,
+        nan values ignored. quantiles come from a partial sort (np.partition) of each group.
+        with group_of (coarser group per group) and the stats of this index, the stats of the
+        coarser groups are returned instead, groups with a single member are copied over.
+        """
+        values = np.asarray(values, dtype='float64')
+        quantiles = np.asarray(quantiles, dtype='float64')
+        grouped_values = values[self.order]
+        valid = ~np.isnan(values)
+
+        if group_of is None:
+            n_groups = self.n_groups
+            count = np.bincount(self.codes[valid], minlength=n_groups)
+            total = np.bincount(self.codes[valid], weights=values[valid], minlength=n_groups)
+            members = [[group] for group in range(n_groups)]
+        else:
+            n_groups = group_of.max() + 1 if len(group_of) else 0
+            count = np.bincount(group_of, weights=bin_stats['count'], minlength=n_groups).astype(np.int64)
+            total = np.bincount(group_of, weights=np.nan_to_num(bin_stats['mean'] * bin_stats['count']), minlength=n_groups)
+            members = [[] for _ in range(n_groups)]
+            for group, coarse in enumerate(group_of.tolist()):
+                members[coarse].append(group)
+
+        result = np.full((n_groups, len(quantiles)), np.nan)
+        for group in np.where(count > 0)[0]:
+            if group_of is not None and len(members[group]) == 1:
+                result[group] = bin_stats['quantiles'][members[group][0]]
+                continue
+            group_values = np.concatenate([grouped_values[self.bounds[m]:self.bounds[m + 1]] for m in members[group]])
+            if count[group] < len(group_values):
+                group_values = group_values[~np.isnan(group_values)]
+            position = quantiles * (count[group] - 1)
+            low, high = np.floor(position).astype(np.int64), np.ceil(position).astype(np.int64)
+            partitioned = np.partition(group_values, np.unique(np.concatenate([low, high])))
+            result[group] = partitioned[low] + (position - low) * (partitioned[high] - partitioned[low])
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+        return {'count': count, 'mean': mean, 'quantiles': result}
+
+
+class QuantileSketch:
+    """
+    mergeable per group histogram over fixed bucket edges (taken from a sample) for the
+    streaming summary. counts and means are exact, quantiles are interpolated inside the
+    bucket and values outside the edges land in the first or last bucket.
+    """
+    def __init__(self, edges: np.ndarray, n_groups: int):
+        self.edges = edges
+        self.n_groups = n_groups
+        self.n_buckets = len(edges) - 1
+        self.histogram = np.zeros((n_groups, self.n_buckets), dtype=np.int64)
+        self.total = np.zeros(n_groups)
+
+    @classmethod
+    def from_sample(cls, sample_values, n_groups: int, n_buckets: int = SKETCH_BUCKETS):
+        sample_values = np.asarray(sample_values, dtype='float64')
+        sample_values = sample_values[~np.isnan(sample_values)]
+        if not len(sample_values):
+            sample_values = np.zeros(1)
+        edges = np.unique(np.quantile(sample_values, np.linspace(0, 1, n_buckets + 1)))
+        if len(edges) == 1:
+            edges = np.array([edges[0], edges[0] + 1.0])
+        return cls(edges, n_groups)
+
+    def update(self, codes: np.ndarray, values: np.ndarray):
+        values = np.asarray(values, dtype='float64')
+        valid = ~np.isnan(values)
+        codes, values = codes[valid], values[valid]
+        buckets = np.clip(np.searchsorted(self.edges, values, side='right') - 1, 0, self.n_buckets - 1)
+        self.histogram += np.bincount(codes * self.n_buckets + buckets,
+                                      minlength=self.n_groups * self.n_buckets).reshape(self.n_groups, self.n_buckets)
+        self.total += np.bincount(codes, weights=values, minlength=self.n_groups)
+
+    def select(self, groups: np.ndarray):
+        selected = QuantileSketch(self.edges, len(groups))
+        selected.histogram = self.histogram[groups]
+        selected.total = self.total[groups]
+        return selected
+
+    def merge_groups(self, group_of: np.ndarray, n_groups: int):
+        """
+        sketch of the coarser groups group_of[code] (clubbed bins from bins)
+        """
+        merged = QuantileSketch(self.edges, n_groups)
+        np.add.at(merged.histogram, group_of, self.histogram)
+        np.add.at(merged.total, group_of, self.total)
+        return merged
+
+    def stats(self, quantiles) -> dict:
+        count = self.histogram.sum(axis=1)
+        cumulative = np.cumsum(self.histogram, axis=1)
+        result = np.full((self.n_groups, len(quantiles)), np.nan)
+        has_values = count > 0
+        rows = np.where(has_values)[0]
+        for i, q in enumerate(quantiles):
+            rank = q * count[rows]
+            bucket = np.minimum((cumulative[rows] < rank[:, None]).sum(axis=1), self.n_buckets - 1)
+            in_bucket = self.histogram[rows, bucket]
+            before = cumulative[rows, bucket] - in_bucket
+            fraction = np.where(in_bucket > 0, (rank - before) / np.maximum(in_bucket, 1), 0.0)
+            low, high = self.edges[bucket], self.edges[bucket + 1]
+            result[rows, i] = low + np.clip(fraction, 0, 1) * (high - low)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self.total / count
+        return {'count': count, 'mean': mean, 'quantiles': result}
+
+
+def clubbed_codes(bin_ids: np.ndarray, clubbed_bin_ids: dict):
+    """
+    clubbed bin id per bin and the integer code of its clubbed group
+    """
+    clubbed = np.array([clubbed_bin_ids.get(b, b) for b in bin_ids.tolist()], dtype=np.int64)
+    clubbed_values, codes = np.unique(clubbed, return_inverse=True)
+    return clubbed, clubbed_values, codes
+
+
+def stats_columns(metric_stats: dict, quantiles) -> dict:
+    columns = {}
+    for prefix, stats in metric_stats.items():
+        columns[f'avg_{prefix}'] = stats['mean']
+        for i, q in enumerate(quantiles):
+            columns[f'{prefix}_p{int(round(q * 100))}'] = stats['quantiles'][:, i]
+    return columns
+
+
+def build_summaries(bin_ids: np.ndarray, bin_rows: np.ndarray, bin_metric_stats: dict,
+                    clubbed_metric_stats: dict, bin_discounts: dict, clubbed_bin_ids: dict,
+                    quantiles=SUMMARY_QUANTILES):
+    """
+    per bin and per clubbed bin summary frames from per group arrays (in bin_ids order and in
+    sorted clubbed bin id order)
+    """
+    clubbed, clubbed_values, codes = clubbed_codes(bin_ids, clubbed_bin_ids)
+    discounts = np.array([bin_discounts.get(b, np.nan) for b in bin_ids.tolist()], dtype='float32')
+
+    bin_summary = pd.DataFrame({
+        'bin_id': bin_ids,
+        'clubbed_bin_id': clubbed,
+        'rows': bin_rows,
+        'discount': discounts,
+        **stats_columns(bin_metric_stats, quantiles),
+    })
+
+    ## member lists and discounts over the (few) bins, never over rows
+    order = np.argsort(codes, kind='stable')
+    members = np.split(bin_ids[order], np.cumsum(np.bincount(codes, minlength=len(clubbed_values)))[:-1])
+    first_bin = np.array([m.min() for m in members])
+
+    summary = pd.DataFrame({
+        'clubbed_bins': [' && '.join(sorted(map(str, m.tolist()))) for m in members],
+        'suitable_discount': pd.Series(first_bin).map(bin_discounts).astype('float32').values,
+        'avg_overstock': clubbed_metric_stats['overstock']['mean'],
+        'clubbed_bin_id': clubbed_values,
+        'n_bins': [len(m) for m in members],
+        'rows': np.bincount(codes, weights=bin_rows, minlength=len(clubbed_values)).astype(np.int64),
+        **{k: v for k, v in stats_columns(clubbed_metric_stats, quantiles).items() if k != 'avg_overstock'},
+    })
+    summary['priority_score']    = summary['avg_overstock']
+    summary['avg_overstock_pct'] = (summary['avg_overstock'] * 100).round(1)
+    return bin_summary, summary
+
+
+def summarize_frame(df: pd.DataFrame, bin_discounts: dict, clubbed_bin_ids: dict, quantiles=SUMMARY_QUANTILES):
+    """
+    exact per bin and per clubbed bin summaries of a binned frame
+    """
+    codes, bin_ids = pd.factorize(df['bin_id'], sort=True)
+    bin_ids = np.asarray(bin_ids, dtype=np.int64)
+    _, _, clubbed_of_bin = clubbed_codes(bin_ids, clubbed_bin_ids)
+
+    ## clubbed bins are unions of bins, their stats reuse the bin grouping
+    bin_index = GroupIndex(codes, len(bin_ids))
+    bin_metric_stats, clubbed_metric_stats = {}, {}
+    for col, prefix in SUMMARY_METRICS.items():
+        values = df[col].to_numpy(dtype='float64')
+        bin_metric_stats[prefix] = bin_index.stats(values, quantiles)
+        clubbed_metric_stats[prefix] = bin_index.stats(values, quantiles, clubbed_of_bin, bin_metric_stats[prefix])
+
+    bin_rows = np.diff(bin_index.bounds)
+    return build_summaries(bin_ids, bin_rows, bin_metric_stats, clubbed_metric_stats,
+                           bin_discounts, clubbed_bin_ids, quantiles)
+
+
+def summarize_sketches(bin_ids: np.ndarray, bin_rows: np.ndarray, sketches: dict, bin_discounts: dict,
+                       clubbed_bin_ids: dict, quantiles=SUMMARY_QUANTILES):
+    """
+    per bin and per clubbed bin summaries from streaming sketches (one QuantileSketch per
+    summary metric prefix, groups in bin_ids order), bins without rows are left out
+    """
+    present = np.where(bin_rows > 0)[0]
+    bin_ids = np.asarray(bin_ids, dtype=np.int64)[present]
+    _, clubbed_values, clubbed_of_bin = clubbed_codes(bin_ids, clubbed_bin_ids)
+
+    bin_metric_stats, clubbed_metric_stats = {}, {}
+    for prefix, sketch in sketches.items():
+        sketch = sketch.select(present)
+        bin_metric_stats[prefix] = sketch.stats(quantiles)
+        clubbed_metric_stats[prefix] = sketch.merge_groups(clubbed_of_bin, len(clubbed_values)).stats(quantiles)
+
+    return build_summaries(bin_ids, bin_rows[present], bin_metric_stats, clubbed_metric_stats,
+                           bin_discounts, clubbed_bin_ids, quantiles)
@@ -0,0 +1,231 @@
+import os
+import numpy as np
+import pandas as pd
+from src.entity.config import ClearanceSimulationConfig
+from src.entity.artifact import SmartBinningArtifact, ClearanceSimulationArtifact
+from src.utils.profiling_utils import profile_stage
+from src.utils.partition_utils import iter_bin_partitions
+
+# forecasts (future_sales) are 28 day totals
+FORECAST_DAYS = 28
+BIN_INPUT_COLUMNS = ['actual_stock', 'future_sales', 'sell_price']
+BIN_INPUT_SUM_COLUMNS = ['stock', 'future_sales', 'stock_value', 'price_sum', 'price_count']
+
+
+def bin_inputs_from_frame(df: pd.DataFrame, group_columns: list) -> pd.DataFrame:
+    """
+    per group stock, forecast daily demand and stock weighted price, the inputs of the simulation
+    """
+    sums = aggregate_bin_inputs(df, group_columns)
+    return finalize_bin_inputs(sums)
+
+
+def bin_input_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    row level BIN_INPUT_SUM_COLUMNS, summed per group they give the simulation inputs
+    """
+    stock = df['actual_stock'].fillna(0).clip(lower=0)
+    return pd.DataFrame({
+        'stock': stock,
+        'future_sales': df['future_sales'].fillna(0).clip(lower=0),
+        'stock_value': stock * df['sell_price'].fillna(0),
+        'price_sum': df['sell_price'].fillna(0),
+        'price_count': df['sell_price'].notna().astype('int64'),
+    }, index=df.index)
+
+
+def aggregate_bin_inputs(df: pd.DataFrame, group_columns: list) -> pd.DataFrame:
+    """
+    additive per group sums, partitions or chunks can be aggregated separately and added up
+    """
+    frame = bin_input_columns(df)
+    for col in group_columns:
+        frame[col] = df[col].values
+    return frame.groupby(group_columns).sum()
+
+
+def finalize_bin_inputs(sums: pd.DataFrame) -> pd.DataFrame:
+    mean_price = sums['price_sum'] / sums['price_count'].replace(0, np.nan)
+    price = (sums['stock_value'] / sums['stock'].replace(0, np.nan)).fillna(mean_price).fillna(0)
+    return pd.DataFrame({
+        'stock': sums['stock'],
+        'daily_demand': sums['future_sales'] / FORECAST_DAYS,
+        'price': price,
+    }, index=sums.index)
+
+
+def demand_lift(discounts, elasticities):
+    """
+    constant elasticity demand multiplier, (1 - discount) ** -elasticity, shape (discounts, elasticities)
+    """
+    discounts = np.asarray(discounts, dtype='float64')
+    elasticities = np.asarray(elasticities, dtype='float64')
+    return (1.0 - discounts)[:, np.newaxis] ** -elasticities[np.newaxis, :]
+
+
+def simulate_clearance(bin_inputs: pd.DataFrame, discounts, elasticities, horizons,
+                       n_draws: int = 0, demand_cv: float = 0.3, seed: int = 0) -> dict:
+    """
+    projected units cleared, revenue and residual stock for every (group, discount, elasticity,
+    horizon) as one broadcast computation. arrays are shaped (groups, discounts, elasticities,
+    horizons). with n_draws > 0 demand gets a gamma distributed multiplier (mean 1, cv demand_cv)
+    per group and draw, shared by every scenario of the group, and the p10/p90 and the probability
+    of clearing everything are returned next to the means.
+    """
+    stock = bin_inputs['stock'].to_numpy(dtype='float64')[:, None, None, None]
+    rate = bin_inputs['daily_demand'].to_numpy(dtype='float64')[:, None, None, None]
+    price = bin_inputs['price'].to_numpy(dtype='float64')[:, None, None, None]
+    discounts = np.asarray(discounts, dtype='float64')
+    horizons = np.asarray(horizons, dtype='float64')
+
+    lift = demand_lift(discounts, elasticities)[None, :, :, None]
+    unit_revenue = price * (1.0 - discounts)[None, :, None, None]
+    demand = rate * lift * horizons[None, None, None, :]
+
+    if not n_draws:
+        cleared = np.minimum(stock, demand)
+        return {
+            'units_cleared': cleared,
+            'revenue': cleared * unit_revenue,
+            'residual_stock': stock - cleared,
+        }
+
+    ## the shock is shared by every scenario of a group and cleared = min(stock, demand * shock)
+    ## is monotone in it, so with the shocks sorted once per group the mean, quantiles and
+    ## probability of full clearance are exact without materializing a draws axis
+    rng = np.random.default_rng(seed)
+    shape = 1.0 / demand_cv ** 2
+    shocks = np.sort(rng.gamma(shape, 1.0 / shape, size=(len(bin_inputs), n_draws)), axis=1)
+    cumulative = np.concatenate([np.zeros((len(bin_inputs), 1)), np.cumsum(shocks, axis=1)], axis=1)
+    p10, p90 = np.quantile(shocks, [0.1, 0.9], axis=1, method='inverted_cdf')
+
+    stock = np.broadcast_to(stock, demand.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        threshold = np.where(demand > 0, stock / demand, np.inf)
+    # draws that do not clear the stock, per cell. every group's shocks are shifted into their own
+    # range so one searchsorted over all groups does it; thresholds are bounded to [0, top] so none
+    # of them spills into a neighbouring group
+    group_index = np.arange(len(bin_inputs))[:, None, None, None]
+    top = shocks[:, -1].max() + 1.0
+    offset = 2.0 * top * group_index
+    keys = (shocks + offset[:, :, 0, 0]).ravel()
+    bounded = np.clip(np.nan_to_num(threshold, nan=top, posinf=top), 0.0, top)
+    n_short = np.searchsorted(keys, bounded + offset, side='left') - n_draws * group_index
+
+    mean_cleared = (demand * cumulative[group_index, n_short] + stock * (n_draws - n_short)) / n_draws
+    cleared_p10 = np.minimum(stock, demand * p10[:, None, None, None])
+    cleared_p90 = np.minimum(stock, demand * p90[:, None, None, None])
+
+    return {
+        'units_cleared': mean_cleared,
+        'units_cleared_p10': cleared_p10,
+        'units_cleared_p90': cleared_p90,
+        'revenue': mean_cleared * unit_revenue,
+        'revenue_p10': cleared_p10 * unit_revenue,
+        'revenue_p90': cleared_p90 * unit_revenue,
+        'residual_stock': stock - mean_cleared,
+        'prob_full_clearance': (n_draws - n_short) / n_draws,
+    }
+
+
+def simulation_to_frame(bin_inputs: pd.DataFrame, result: dict, discounts, elasticities, horizons) -> pd.DataFrame:
+    """
+    tidy frame, one row per (group, discount, elasticity, horizon)
+    """
+    shape = result['units_cleared'].shape
+    group_idx, discount_idx, elasticity_idx, horizon_idx = np.indices(shape).reshape(4, -1)
+
+    frame = bin_inputs.index.to_frame(index=False).iloc[group_idx].reset_index(drop=True)
+    frame['discount'] = np.asarray(discounts)[discount_idx]
+    frame['elasticity'] = np.asarray(elasticities)[elasticity_idx]
+    frame['horizon_days'] = np.asarray(horizons)[horizon_idx]
+    frame['stock'] = bin_inputs['stock'].to_numpy()[group_idx]
+    for key, values in result.items():
+        frame[key] = values.ravel()
+    frame['clearance_rate'] = (frame['units_cleared'] / frame['stock'].replace(0, np.nan)).fillna(1.0)
+    return frame
+
+
+def optimize_discounts(bin_inputs: pd.DataFrame, discounts, elasticity: float, horizon_days: int,
+                       target_clearance: float, unit_cost_ratio: float) -> pd.DataFrame:
+    """
+    per group, the discount of the grid with the highest recovered margin (revenue minus the
+    unit cost, unit_cost_ratio * price, of the units cleared) among the ones clearing at least
+    target_clearance of the stock within horizon_days. groups that can not meet the target get
+    the discount clearing the most. every group is solved at once on a (groups, discounts) grid.
+    """
+    discounts = np.asarray(discounts, dtype='float64')
+    result = simulate_clearance(bin_inputs, discounts, [elasticity], [horizon_days])
+    cleared = result['units_cleared'][:, :, 0, 0]
+    price = bin_inputs['price'].to_numpy(dtype='float64')[:, None]
+    stock = bin_inputs['stock'].to_numpy(dtype='float64')[:, None]
+
+    margin = result['revenue'][:, :, 0, 0] - cleared * price * unit_cost_ratio
+    with np.errstate(divide='ignore', invalid='ignore'):
+        clearance_rate = np.where(stock > 0, cleared / stock, 1.0)
+    feasible = clearance_rate >= target_clearance
+
+    best = np.where(feasible.any(axis=1),
+                    np.argmax(np.where(feasible, margin, -np.inf), axis=1),
+                    np.argmax(clearance_rate, axis=1))
+    rows = np.arange(len(bin_inputs))
+    return pd.DataFrame({
+        'discount': discounts[best],
+        'margin': margin[rows, best],
+        'clearance_rate': clearance_rate[rows, best],
+        'meets_target': feasible[rows, best],
+    }, index=bin_inputs.index)
+
+
+def suggest_clearance_strategy(simulation: pd.DataFrame, group_columns: list, elasticity: float,
+                               horizon_days: int, target_clearance: float) -> pd.DataFrame:
+    """
+    per group, the discount with the highest revenue among the ones clearing at least
+    target_clearance of the stock in horizon_days (the one clearing the most when none does)
+    """
+    scenarios = simulation[np.isclose(simulation['elasticity'], elasticity)
+                           & (simulation['horizon_days'] == horizon_days)].copy()
+    scenarios['meets_target'] = scenarios['clearance_rate'] >= target_clearance
+    scenarios = scenarios.sort_values(group_columns + ['meets_target', 'revenue', 'clearance_rate'],
+                                      ascending=[True] * len(group_columns) + [False, False, False])
+    strategy = scenarios.groupby(group_columns, sort=False).head(1).reset_index(drop=True)
+    return strategy[group_columns + ['discount', 'stock', 'units_cleared', 'revenue',
+                                     'residual_stock', 'clearance_rate', 'meets_target']]
+
+
+class ClearanceSimulation:
+    def __init__(self, smart_binning_artifact: SmartBinningArtifact, clearance_simulation_config: ClearanceSimulationConfig):
+        self.smart_binning_artifact = smart_binning_artifact
+        self.config = clearance_simulation_config
+
+    def load_bin_inputs(self) -> pd.DataFrame:
+        """
+        reads only the needed columns of the binned frame, one bin partition at a time
+        """
+        columns = self.config.group_columns + BIN_INPUT_COLUMNS
+        sums = [aggregate_bin_inputs(partition, self.config.group_columns)
+                for _, partition in iter_bin_partitions(self.smart_binning_artifact.smart_bins, columns)]
+        return finalize_bin_inputs(pd.concat(sums).groupby(level=self.config.group_columns).sum())
+
+    def run(self, bin_inputs: pd.DataFrame = None):
+        if bin_inputs is None:
+            with profile_stage('load_bin_inputs') as stage:
+                bin_inputs = self.load_bin_inputs()
+                stage.rows_out = len(bin_inputs)
+
+        with profile_stage('simulate', rows_in = len(bin_inputs)) as stage:
+            result = simulate_clearance(bin_inputs, self.config.discounts, self.config.elasticities,
+                                        self.config.horizons, self.config.n_draws, self.config.demand_cv)
+            simulation = simulation_to_frame(bin_inputs, result, self.config.discounts,
+                                             self.config.elasticities, self.config.horizons)
+            stage.rows_out = len(simulation)
+
+        strategy = suggest_clearance_strategy(simulation, self.config.group_columns, self.config.strategy_elasticity,
+                                              self.config.strategy_horizon_days, self.config.target_clearance)
+
+        os.makedirs(self.config.clearance_simulation_dir, exist_ok=True)
+        simulation.to_csv(self.config.simulation_file_path, index=False)
+        strategy.to_csv(self.config.strategy_file_path, index=False)
+        print(f"✅ Clearance simulation saved: {len(simulation)} scenarios")
+
+        return ClearanceSimulationArtifact(self.config.simulation_file_path, self.config.strategy_file_path)
@@ -5,6 +5,7 @@ from src import constants
 from src.entity.config import TrainingConfig, DataIngestionConfig
 from src.entity.artifact import DataIngestionArtifact
 from src.utils.components_utils import convert_dataframe, add_features
+from src.utils.profiling_utils import profile_stage
 from sklearn.model_selection import train_test_split
 
 class DataIngestion:
@@ -12,25 +13,38 @@ class DataIngestion:
         self.data_ingestion_config = data_ingestion_config
 
     def load_data(self):
-        calendar_df = pd.read_csv(self.data_ingestion_config.calendar_path)
-        sales_df = pd.read_csv(self.data_ingestion_config.sales_path)
-        prices_df = pd.read_csv(self.data_ingestion_config.prices_path)
+        with profile_stage('read_csv') as stage:
+            calendar_df = pd.read_csv(self.data_ingestion_config.calendar_path)
+            sales_df = pd.read_csv(self.data_ingestion_config.sales_path)
+            prices_df = pd.read_csv(self.data_ingestion_config.prices_path)
+            stage.rows_out = len(calendar_df) + len(sales_df) + len(prices_df)
+
+        with profile_stage('convert_dataframe', rows_in = len(sales_df)) as stage:
+            final_df = convert_dataframe(calendar_df, sales_df, prices_df)
+            stage.rows_out = len(final_df)
+
+        with profile_stage('add_features', rows_in = len(final_df)) as stage:
+            final_df = add_features(final_df)
+            stage.rows_out = len(final_df)
 
-        final_df = convert_dataframe(calendar_df, sales_df, prices_df)
-        final_df = add_features(final_df)
         final_columns = final_columns = ['item_id', 'dept_id', 'store_id', 'state_id', 'weekday', 'month', 'week_of_month', 'event_name_1', 'event_type_1', 'event_name_2',
                  'event_type_2', 'snap_active', 'sell_price', 'lag_28', 'lag_7', 'rolling_mean_28',  'price_pct_change', 'zero_streak', 'sales_28_sum']
-        final_df = final_df.dropna(subset=['lag_28', 'lag_7', 'rolling_mean_28', 'sales_28_sum', 'price_pct_change', 'zero_streak'])
+        with profile_stage('dropna', rows_in = len(final_df)) as stage:
+            final_df = final_df.dropna(subset=['lag_28', 'lag_7', 'rolling_mean_28', 'sales_28_sum', 'price_pct_change', 'zero_streak'])
+            stage.rows_out = len(final_df)
         return final_df[final_columns]
     
     def begin_train_test_split(self, dataframe):
-        train_df, test_df = train_test_split(dataframe,test_size = self.data_ingestion_config.train_test_ratio, random_state = 42)
+        with profile_stage('train_test_split', rows_in = len(dataframe)) as stage:
+            train_df, test_df = train_test_split(dataframe,test_size = self.data_ingestion_config.train_test_ratio, random_state = 42)
+            stage.rows_out = len(train_df) + len(test_df)
 
         dir_name = os.path.dirname(self.data_ingestion_config.train_path)
         os.makedirs(dir_name, exist_ok = True)
 
-        train_df.to_csv(self.data_ingestion_config.train_path, index = False)
-        test_df.to_csv(self.data_ingestion_config.test_path, index = False)
+        with profile_stage('write_csv', rows_in = len(dataframe)):
+            train_df.to_csv(self.data_ingestion_config.train_path, index = False)
+            test_df.to_csv(self.data_ingestion_config.test_path, index = False)
 
     def initiate_data_ingestion(self):
         final_df = self.load_data()
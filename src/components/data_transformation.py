@@ -7,6 +7,7 @@ from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 from src.utils.components_utils import save_npz_array_data, save_object_pkl
+from src.utils.profiling_utils import profile_stage
 from joblib import parallel_backend
 import os
 
@@ -85,8 +86,10 @@ class DataTransformation:
 
     def initiate_data_transformation(self):
 
-        train_df = pd.read_csv(self.data_ingestion_artifact.train_path)
-        test_df = pd.read_csv(self.data_ingestion_artifact.test_path)
+        with profile_stage('read_csv') as stage:
+            train_df = pd.read_csv(self.data_ingestion_artifact.train_path)
+            test_df = pd.read_csv(self.data_ingestion_artifact.test_path)
+            stage.rows_out = len(train_df) + len(test_df)
         print('initiated data transformation')
 
         # drop_cols = ['lag_28', 'lag_7','rolling_mean_28', 'sales_28_sum', 'price_pct_change', 'zero_streak']
@@ -100,12 +103,14 @@ class DataTransformation:
         # if test_df.shape[0] == 0:
         #     raise ValueError("Test set is empty after dropping missing values.")
         
-        for df in [train_df, test_df]:
-            if 'sell_price' in df.columns:
-                df['sell_price'] = (
-                    df.groupby(['store_id', 'item_id'])['sell_price']
-                    .transform(lambda x: x.ffill().bfill())
-                )
+        with profile_stage('fill_sell_price', rows_in = len(train_df) + len(test_df)) as stage:
+            for df in [train_df, test_df]:
+                if 'sell_price' in df.columns:
+                    df['sell_price'] = (
+                        df.groupby(['store_id', 'item_id'])['sell_price']
+                        .transform(lambda x: x.ffill().bfill())
+                    )
+            stage.rows_out = len(train_df) + len(test_df)
 
         target_col = self.data_transformation_config.target_column
 
@@ -127,22 +132,29 @@ class DataTransformation:
         available_numeric_cols = [col for col in numeric_cols if col in X_train_df.columns]
         pipeline.named_steps['scaler'].transformers = [('scale_num', StandardScaler(), available_numeric_cols)]
 
-        with parallel_backend('threading', n_jobs = -1):
-            pipeline.fit(X_train_df)
+        with profile_stage('fit', rows_in = len(X_train_df)):
+            with parallel_backend('threading', n_jobs = -1):
+                pipeline.fit(X_train_df)
 
-        transformed_train = pipeline.transform(X_train_df)
-        transformed_test = pipeline.transform(X_test_df)
-        transformed_train = transformed_train.astype(np.float32)
-        transformed_test = transformed_test.astype(np.float32)
+        with profile_stage('transform_train', rows_in = len(X_train_df)) as stage:
+            transformed_train = pipeline.transform(X_train_df)
+            transformed_train = transformed_train.astype(np.float32)
+            stage.rows_out = transformed_train.shape[0]
+
+        with profile_stage('transform_test', rows_in = len(X_test_df)) as stage:
+            transformed_test = pipeline.transform(X_test_df)
+            transformed_test = transformed_test.astype(np.float32)
+            stage.rows_out = transformed_test.shape[0]
         print('data transformation done')
 
         train_arr = np.c_[transformed_train, np.array(y_train_df)]
         test_arr = np.c_[transformed_test, np.array(y_test_df)]
 
-        save_npz_array_data(self.data_transformation_config.transformed_train_path, train_arr)
-        save_npz_array_data(self.data_transformation_config.transformed_test_path, test_arr)
+        with profile_stage('save', rows_in = train_arr.shape[0] + test_arr.shape[0]):
+            save_npz_array_data(self.data_transformation_config.transformed_train_path, train_arr)
+            save_npz_array_data(self.data_transformation_config.transformed_test_path, test_arr)
 
-        save_object_pkl(self.data_transformation_config.preprocessor_obj_file_path, pipeline)
+            save_object_pkl(self.data_transformation_config.preprocessor_obj_file_path, pipeline)
         print('saved the objects')
 
         feature_names = list(train_df.columns)
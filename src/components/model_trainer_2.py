@@ -4,6 +4,7 @@ import os
 from src.entity.config import ModelTrainerConfig, TrainingConfig, DataIngestionConfig
 from src.entity.artifact import DataTransformationArtifact, ClassificationMetric, ModelTrainerArtifact
 from src.utils.components_utils import save_model_as_joblib, calculate_rmsle, calculate_smape
+from src.utils.profiling_utils import profile_stage
 import catboost as cb
 from sklearn.metrics import mean_squared_error
 import joblib
@@ -65,11 +66,13 @@ class ModelTrainer:
 
     def initiate_model_training(self):
         print("🔁 Loading transformed data...")
-        train_loaded = np.load(self.data_transformation_artifact.transformed_train_file_path, allow_pickle=True)
-        train_arr_loaded = train_loaded['data']
+        with profile_stage('load_arrays') as stage:
+            train_loaded = np.load(self.data_transformation_artifact.transformed_train_file_path, allow_pickle=True)
+            train_arr_loaded = train_loaded['data']
 
-        test_loaded = np.load(self.data_transformation_artifact.transformed_test_file_path, allow_pickle=True)
-        test_arr_loaded = test_loaded["data"]
+            test_loaded = np.load(self.data_transformation_artifact.transformed_test_file_path, allow_pickle=True)
+            test_arr_loaded = test_loaded["data"]
+            stage.rows_out = len(train_arr_loaded) + len(test_arr_loaded)
 
         if train_arr_loaded.ndim == 1:
             train_arr_loaded = train_arr_loaded.reshape(1, -1)
@@ -97,11 +100,16 @@ class ModelTrainer:
         print("🧠 Starting CatBoost model training...")
         
         # Train CatBoost model
-        catboost_model = self.train_catboost(X_train, y_train_log, X_test, y_test_log)
+        with profile_stage('fit', rows_in = len(X_train)):
+            catboost_model = self.train_catboost(X_train, y_train_log, X_test, y_test_log)
         
         # Make predictions in log space
-        train_pred_log = catboost_model.predict(X_train)
-        test_pred_log = catboost_model.predict(X_test)
+        with profile_stage('predict_train', rows_in = len(X_train)) as stage:
+            train_pred_log = catboost_model.predict(X_train)
+            stage.rows_out = len(train_pred_log)
+        with profile_stage('predict_test', rows_in = len(X_test)) as stage:
+            test_pred_log = catboost_model.predict(X_test)
+            stage.rows_out = len(test_pred_log)
         
         # Transform predictions back to original scale
         y_train_pred = np.expm1(train_pred_log)
@@ -110,7 +118,8 @@ class ModelTrainer:
         y_test_true = np.expm1(y_test_log)
         
         # Save model
-        self.save_model(catboost_model, self.model_trainer_config.model_file_path)
+        with profile_stage('save_model'):
+            self.save_model(catboost_model, self.model_trainer_config.model_file_path)
         
         print("🧪 Calculating evaluation metrics...")
         test_metric = ClassificationMetric(
@@ -124,9 +133,10 @@ class ModelTrainer:
         )
 
         # Save predictions
-        y_future = pd.DataFrame(y_train_true)
-        os.makedirs(os.path.dirname(self.model_trainer_config.trained_y), exist_ok=True)
-        y_future.to_csv(self.model_trainer_config.trained_y, index=False)
+        with profile_stage('save_predictions', rows_in = len(y_train_true)):
+            y_future = pd.DataFrame(y_train_true)
+            os.makedirs(os.path.dirname(self.model_trainer_config.trained_y), exist_ok=True)
+            y_future.to_csv(self.model_trainer_config.trained_y, index=False)
 
         model_trainer_artifact = ModelTrainerArtifact(
             trained_model_file_path=self.model_trainer_config.model_file_path,
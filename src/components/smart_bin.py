@@ -1,13 +1,276 @@
 # src/components/smart_binning.py
 import os
+import joblib
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.decomposition import TruncatedSVD
 from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics import pairwise_distances_argmin_min
+from sklearn.metrics.pairwise import euclidean_distances
+from joblib import Parallel, delayed
+from scipy.optimize import linear_sum_assignment
+from src import constants
 from src.entity.config import SmartBinningConfig
 from src.entity.artifact import SmartBinningArtifact
+from src.utils.components_utils import save_model_as_joblib
 from scipy.sparse import hstack, csr_matrix
+from src.utils.profiling_utils import profile_stage
+from src.utils.partition_utils import BinPartitionWriter, write_bin_partitions
+from src.components.bin_summary import SUMMARY_METRICS, QuantileSketch, summarize_frame, summarize_sketches
+from src.components.clearance_simulator import (BIN_INPUT_SUM_COLUMNS, bin_input_columns, finalize_bin_inputs,
+                                                optimize_discounts)
+
+CAT_COLS = ['dept_id','store_id','state_id','weekday',
+            'event_type_1','event_type_2','snap_active']
+NUM_COLS = ['overstock_score','days_of_supply','turnover_rate_28',
+            'price_pct_change','lag_28','lag_7','rolling_mean_28','zero_streak']
+
+
+def add_binning_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    adds the overstock_score, days_of_supply and turnover_rate_28 columns in place
+    """
+    df['overstock_score']  = ((df['actual_stock'] - df['future_sales'])
+                              / df['future_sales']).astype('float32')
+    df['days_of_supply']   = (df['actual_stock']
+                              / df['rolling_mean_28'].replace(0, np.nan)).astype('float32')
+    df['turnover_rate_28'] = ((df['rolling_mean_28'] * 28)
+                              / df['actual_stock'].replace(0, np.nan)).astype('float32')
+
+    # ✂️ CLEAN INF/−INF → NaN
+    df.replace([np.inf, -np.inf], np.nan, inplace=True)
+    return df
+
+
+class SmartBinningModel:
+    """
+    the fitted encoder, scaler, svd and centroids of a binning run. bin_ids maps each centroid
+    to its public bin id so ids can be kept stable when the model is refitted.
+    """
+    def __init__(self, ohe, scaler, svd, centroids, bin_ids, reference_distance):
+        self.ohe = ohe
+        self.scaler = scaler
+        self.svd = svd
+        self.centroids = centroids
+        self.bin_ids = bin_ids
+        # mean squared distance of the training rows to their centroid, the drift reference
+        self.reference_distance = reference_distance
+        self.bin_discounts = {}
+        self.clubbed_bin_ids = {}
+        # binning_fingerprint of the run that saved it, a run with another one refits
+        self.fingerprint = None
+
+    def transform(self, df: pd.DataFrame):
+        X_cat = self.ohe.transform(df[CAT_COLS])
+        X_num_scaled = self.scaler.transform(df[NUM_COLS].fillna(0).values)
+        X = hstack([csr_matrix(X_num_scaled), X_cat], format='csr')
+        return self.svd.transform(X)
+
+    def nearest(self, X_reduced):
+        """
+        index of the nearest centroid and the squared distance to it, for every row
+        """
+        closest, distances = pairwise_distances_argmin_min(X_reduced, self.centroids)
+        return closest, distances ** 2
+
+    def drift(self, squared_distances) -> float:
+        """
+        how much worse the centroids fit these rows than the rows they were fitted on,
+        1.0 means no drift
+        """
+        if len(squared_distances) == 0 or not self.reference_distance:
+            return 1.0
+        return float(np.mean(squared_distances) / self.reference_distance)
+
+    def assign(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        bins new rows without re-clustering. df needs the binning input columns
+        (actual_stock, future_sales and the model features), returns bin_id, clubbed_bin_id
+        and discount aligned with df
+        """
+        df = add_binning_features(df.copy())
+        closest, _ = self.nearest(self.transform(df))
+        bin_id = pd.Series(self.bin_ids[closest], index=df.index)
+        return pd.DataFrame({
+            'bin_id': bin_id,
+            'clubbed_bin_id': bin_id.map(self.clubbed_bin_ids).fillna(bin_id).astype('int64'),
+            'discount': map_discounts(bin_id, self.bin_discounts),
+        })
+
+    def save(self, filepath: str):
+        save_model_as_joblib(filepath, self)
+
+    @staticmethod
+    def load(filepath: str):
+        return joblib.load(filepath)
+
+
+def binning_fingerprint(config: SmartBinningConfig) -> dict:
+    """
+    what a persisted model has to share with a run to be reused: the input dataset and the
+    settings that shape the clusters
+    """
+    return {
+        'dataset': config.dataset,
+        'cat_cols': list(CAT_COLS),
+        'num_cols': list(NUM_COLS),
+        'n_clusters': config.n_clusters,
+        'k_range': list(config.k_range),
+        'auto_k_metric': config.auto_k_metric,
+        'auto_k_sample_rows': config.auto_k_sample_rows,
+        'auto_k_strata': list(config.auto_k_strata),
+        'batch_size': config.batch_size,
+    }
+
+
+def map_discounts(bin_id: pd.Series, bin_discounts: dict) -> pd.Series:
+    """
+    discount of every row. bins without a decision (no rows in the run that decided the
+    discounts of a reused model) get constants.SMART_BINNING_DEFAULT_DISCOUNT instead of NaN
+    """
+    discount = bin_id.map(bin_discounts)
+    missing = int(discount.isna().sum())
+    if missing:
+        print(f"⚠️ {missing} rows in bins without a discount decision, "
+              f"given the default discount {constants.SMART_BINNING_DEFAULT_DISCOUNT}")
+    return discount.fillna(constants.SMART_BINNING_DEFAULT_DISCOUNT).astype('float32')
+
+
+def apply_bin_decisions(df: pd.DataFrame, model: SmartBinningModel):
+    """
+    adds the discount and clubbed_bin_id columns for the bin_id column in place
+    """
+    df['discount'] = map_discounts(df['bin_id'], model.bin_discounts)
+    df['clubbed_bin_id'] = df['bin_id'].map(model.clubbed_bin_ids).fillna(df['bin_id']).astype(df['bin_id'].dtype)
+    return df
+
+
+def match_bin_ids(previous_bins, new_clusters, n_clusters, previous_bin_ids):
+    """
+    maps every new cluster to the previous bin id it overlaps most with, so a refit keeps the
+    ids of the bins that still exist. clusters left over get fresh ids.
+    """
+    previous_codes, previous_index = np.unique(previous_bins, return_inverse=True)
+    overlap = np.zeros((n_clusters, len(previous_codes)), dtype=np.int64)
+    np.add.at(overlap, (new_clusters, previous_index), 1)
+
+    rows, cols = linear_sum_assignment(-overlap)
+    bin_ids = np.full(n_clusters, -1, dtype=np.int64)
+    bin_ids[rows] = previous_codes[cols]
+
+    unmatched = np.where(bin_ids < 0)[0]
+    next_id = int(max(np.max(previous_bin_ids), np.max(previous_codes))) + 1
+    bin_ids[unmatched] = fresh_bin_ids(len(unmatched), start=next_id)
+    return bin_ids
+
+
+# CLUBBING HIGH‑PRIORITY BINS
+CLUBBED_BIN_ID = 99
+
+
+def fresh_bin_ids(n: int, start: int = 0) -> np.ndarray:
+    """
+    n consecutive bin ids from start, CLUBBED_BIN_ID is skipped so a real bin never merges
+    with the clubbed group
+    """
+    ids = np.arange(start, start + n + 1, dtype=np.int64)
+    return ids[ids != CLUBBED_BIN_ID][:n]
+
+
+def bin_stats_from_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    per bin accumulators (rows, overstock sum/count and BIN_INPUT_SUM_COLUMNS) of a binned frame
+    """
+    stats = bin_input_columns(df)
+    stats['rows'] = 1
+    stats['overstock_sum'] = df['overstock_score'].fillna(0).astype('float64')
+    stats['overstock_count'] = df['overstock_score'].notna().astype('int64')
+    stats = stats.groupby(df['bin_id'].values).sum()
+    stats.index.name = 'bin_id'
+    return stats.reset_index()[['bin_id', 'rows', 'overstock_sum', 'overstock_count'] + BIN_INPUT_SUM_COLUMNS]
+
+
+def decide_bins(bin_stats: pd.DataFrame, config):
+    """
+    clubs the n_high_priority_bins most overstocked bins together and gives every (clubbed)
+    bin the discount recovering the most margin while clearing its stock in time, see
+    optimize_discounts. returns the bin_discounts and clubbed_bin_ids mappings.
+    """
+    bin_stats = bin_stats.set_index('bin_id')
+    bin_avg = bin_stats['overstock_sum'] / bin_stats['overstock_count'].replace(0, np.nan)
+    clubbed_bin_ids = {b: CLUBBED_BIN_ID for b in bin_avg.dropna().nlargest(config.n_high_priority_bins).index}
+
+    groups = pd.Series(bin_stats.index, index=bin_stats.index).replace(clubbed_bin_ids)
+    inputs = finalize_bin_inputs(bin_stats[BIN_INPUT_SUM_COLUMNS].groupby(groups.values).sum())
+    decisions = optimize_discounts(inputs, config.discount_grid, config.elasticity, config.max_clearance_days,
+                                   config.clearance_target, config.unit_cost_ratio)
+    bin_discounts = groups.map(decisions['discount']).astype('float32').to_dict()
+    return bin_discounts, clubbed_bin_ids
+
+
+def stratified_sample_index(strata: pd.DataFrame, n_rows: int, seed: int = 0):
+    """
+    positions of about n_rows rows, drawn from every stratum in proportion to its size
+    """
+    if len(strata) <= n_rows:
+        return np.arange(len(strata))
+
+    rng = np.random.default_rng(seed)
+    codes = strata.groupby(list(strata.columns), sort=False, dropna=False).ngroup().to_numpy()
+    order = np.lexsort((rng.random(len(codes)), codes))
+    sizes = np.bincount(codes)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    rank = np.arange(len(codes)) - starts[codes[order]]
+    quota = np.ceil(sizes * n_rows / len(codes)).astype(np.int64)
+    return np.sort(order[rank < quota[codes[order]]])
+
+
+def simplified_silhouette(X, centroids):
+    """
+    centroid based silhouette, (b - a) / max(a, b) with a the distance to the nearest centroid
+    and b the distance to the second nearest. O(n * k) instead of the O(n^2) of the exact one.
+    """
+    distances = euclidean_distances(X, centroids)
+    two_nearest = np.partition(distances, 1, axis=1)[:, :2]
+    a, b = two_nearest[:, 0], two_nearest[:, 1]
+    return float(np.mean((b - a) / np.maximum(np.maximum(a, b), 1e-12)))
+
+
+def _score_k(X_sample, k, metric, batch_size):
+    mbk = MiniBatchKMeans(n_clusters=k, batch_size=batch_size, n_init=1, random_state=0)
+    mbk.fit(X_sample)
+    if metric == 'silhouette':
+        return simplified_silhouette(X_sample, mbk.cluster_centers_)
+    return mbk.inertia_
+
+
+def choose_n_clusters(X_reduced, strata: pd.DataFrame, config) -> int:
+    """
+    evaluates every k of config.k_range in parallel on a stratified sample of the reduced
+    space. silhouette picks the best scoring k, inertia picks the elbow of the curve.
+    """
+    sample_index = stratified_sample_index(strata, config.auto_k_sample_rows)
+    X_sample = X_reduced[sample_index]
+    k_values = [k for k in range(config.k_range[0], config.k_range[1] + 1) if k < len(X_sample)]
+
+    scores = Parallel(n_jobs=config.auto_k_n_jobs)(
+        delayed(_score_k)(X_sample, k, config.auto_k_metric, config.auto_k_batch_size)
+        for k in k_values
+    )
+    scores = np.asarray(scores, dtype='float64')
+
+    if config.auto_k_metric == 'silhouette':
+        best = int(np.argmax(scores))
+    else:
+        ## elbow, the point furthest below the line between the first and last inertia
+        x = (np.asarray(k_values) - k_values[0]) / max(k_values[-1] - k_values[0], 1)
+        y = (scores - scores[-1]) / max(scores[0] - scores[-1], 1e-12)
+        best = int(np.argmax((1 - x) - y))
+
+    print(f"🔢 auto k: {k_values[best]} ({config.auto_k_metric} over k={k_values[0]}..{k_values[-1]} on {len(X_sample)} rows)")
+    return k_values[best]
+
 
 class SmartBinning:
     def __init__(self, input_data_frame: pd.DataFrame, smart_binning_config: SmartBinningConfig):
@@ -15,102 +278,342 @@ class SmartBinning:
         self.config = smart_binning_config
         # self.smart_binning_config = smart_binning_config
 
-    def run(self):
-        # 1) FEATURE ENGINEERING
-        df = self.df
-        df['overstock_score']  = ((df['actual_stock'] - df['future_sales']) 
-                                  / df['future_sales']).astype('float32')
-        df['days_of_supply']   = (df['actual_stock'] 
-                                  / df['rolling_mean_28'].replace(0, np.nan)).astype('float32')
-        df['turnover_rate_28'] = ((df['rolling_mean_28'] * 28) 
-                                  / df['actual_stock'].replace(0, np.nan)).astype('float32')
-        
-        # ✂️ CLEAN INF/−INF → NaN
-        df.replace([np.inf, -np.inf], np.nan, inplace=True)
-
+    def fit_model(self, df: pd.DataFrame):
         # 2) CATEGORICAL ENCODING
-        cat_cols = ['dept_id','store_id','state_id','weekday',
-                    'event_type_1','event_type_2','snap_active']
-        ohe = OneHotEncoder(dtype='uint8', handle_unknown='ignore')
-        X_cat = ohe.fit_transform(df[cat_cols])
-      
+        with profile_stage('one_hot_encode', rows_in = len(df)) as stage:
+            ohe = OneHotEncoder(dtype='uint8', handle_unknown='ignore')
+            X_cat = ohe.fit_transform(df[CAT_COLS])
+            stage.rows_out = X_cat.shape[0]
+
 
         # 3) NUMERIC FEATURES & SCALING
-        num_cols = ['overstock_score','days_of_supply','turnover_rate_28',
-                    'price_pct_change','lag_28','lag_7','rolling_mean_28','zero_streak']
-        X_num = df[num_cols].fillna(0).values
-        scaler = StandardScaler()
-        X_num_scaled = scaler.fit_transform(X_num)
-        
+        with profile_stage('scale', rows_in = len(df)) as stage:
+            X_num = df[NUM_COLS].fillna(0).values
+            scaler = StandardScaler()
+            X_num_scaled = scaler.fit_transform(X_num)
+            stage.rows_out = X_num_scaled.shape[0]
+
 
         # 4) STACK & DIM‑REDUCE
-        X = hstack([csr_matrix(X_num_scaled), X_cat], format='csr')
-        svd = TruncatedSVD(n_components=20, random_state=0)
-        X_reduced = svd.fit_transform(X)
-    
+        with profile_stage('svd', rows_in = len(df)) as stage:
+            X = hstack([csr_matrix(X_num_scaled), X_cat], format='csr')
+            svd = TruncatedSVD(n_components=20, random_state=0)
+            X_reduced = svd.fit_transform(X)
+            stage.rows_out = X_reduced.shape[0]
+
 
         # 5) CLUSTERING INTO BINS
-        mbk = MiniBatchKMeans(
-            n_clusters=self.config.n_clusters,
-            batch_size=10000,
-            random_state=0
+        n_clusters = self.config.n_clusters
+        if n_clusters == 'auto':
+            with profile_stage('choose_k', rows_in = len(df)):
+                n_clusters = choose_n_clusters(X_reduced, df[self.config.auto_k_strata], self.config)
+
+        with profile_stage('cluster', rows_in = len(df)) as stage:
+            mbk = MiniBatchKMeans(
+                n_clusters=n_clusters,
+                batch_size=self.config.batch_size,
+                random_state=0
+            )
+            clusters = mbk.fit_predict(X_reduced)
+            stage.rows_out = len(clusters)
+
+        model = SmartBinningModel(
+            ohe, scaler, svd,
+            centroids=mbk.cluster_centers_,
+            bin_ids=fresh_bin_ids(n_clusters),
+            reference_distance=mbk.inertia_ / max(len(df), 1)
         )
-        df['bin_id'] = mbk.fit_predict(X_reduced)
-      
-
-        # 6) ASSIGN TIERED DISCOUNTS
-        bin_avg = df.groupby('bin_id')['overstock_score'].mean()
-        def tiered(o):
-            if o > 0.5: return 0.20
-            if o > 0.3: return 0.15
-            if o > 0.1: return 0.10
-            return 0.05
-        df['discount'] = df['bin_id'].map(bin_avg.map(tiered)).astype('float32')
-
-        # 7) CLUBBING HIGH‑PRIORITY BINS (example bins 1 & 2)
-        high_pri = [1, 2]
-        df['clubbed_bin_id'] = df['bin_id']
-        mask = df['bin_id'].isin(high_pri)
-        df.loc[mask, 'clubbed_bin_id'] = 99
-        df.loc[mask, 'discount']       = 0.30
+        return model, clusters
+
+    def load_previous_model(self):
+        """
+        the persisted model, None when there is none or it was fitted on another dataset or
+        with other settings (models saved before fingerprints existed included)
+        """
+        path = self.config.previous_model_file_path
+        if not (path and os.path.exists(path)):
+            return None
+        model = SmartBinningModel.load(path)
+        if getattr(model, 'fingerprint', None) != binning_fingerprint(self.config):
+            print("🔁 Persisted binning model was fitted on other data or settings, refitting")
+            return None
+        return model
+
+    def assign_bins(self, df: pd.DataFrame):
+        """
+        reuses the previous model when its drift on this data stays under the threshold,
+        otherwise refits and relabels the new clusters to the previous bin ids
+        """
+        previous_model = self.load_previous_model()
+        drift = None
+        if previous_model is not None:
+            with profile_stage('assign_previous', rows_in = len(df)) as stage:
+                previous_closest, squared_distances = previous_model.nearest(previous_model.transform(df))
+                previous_bins = previous_model.bin_ids[previous_closest]
+                drift = previous_model.drift(squared_distances)
+                stage.rows_out = len(previous_bins)
+
+            if drift <= self.config.drift_threshold:
+                print(f"♻️ Reusing binning model, drift {drift:.3f} <= {self.config.drift_threshold}")
+                return previous_model, previous_bins, drift, False
+
+            print(f"🔁 Binning drift {drift:.3f} > {self.config.drift_threshold}, refitting")
+
+        model, clusters = self.fit_model(df)
+        if previous_model is not None:
+            model.bin_ids = match_bin_ids(previous_bins, clusters, len(model.centroids), previous_model.bin_ids)
+        return model, model.bin_ids[clusters], drift, True
+
+    def run(self):
+        # 1) FEATURE ENGINEERING
+        df = self.df
+        with profile_stage('features', rows_in = len(df)) as stage:
+            add_binning_features(df)
+            stage.rows_out = len(df)
+
+        # 2-5) ENCODE, REDUCE & CLUSTER (or reuse the persisted model)
+        model, bin_ids, drift, refitted = self.assign_bins(df)
+        df['bin_id'] = bin_ids
+
+
+        # 6-7) CLUBBING & OPTIMIZED DISCOUNTS, kept with the model so new items can be assigned later
+        with profile_stage('decide_bins', rows_in = len(df)):
+            bin_stats = bin_stats_from_frame(df)
+            model.bin_discounts, model.clubbed_bin_ids = decide_bins(bin_stats, self.config)
+            apply_bin_decisions(df, model)
 
         # 8) WRITE OUT ARTIFACTS
-        os.makedirs(os.path.dirname(self.config.smart_binning_smart_bins_file_path), exist_ok=True)
-        # full detail
-        df.to_csv(
-            self.config.smart_binning_smart_bins_file_path,
-            index=False
-        )
+        os.makedirs(self.config.smart_binning_dir, exist_ok=True)
+        # full detail, partitioned by clubbed bin
+        with profile_stage('write_smart_bins', rows_in = len(df)):
+            write_bin_partitions(df, self.config.smart_binning_smart_bins_dir,
+                                 self.config.partition_column, self.config.partition_stats_columns)
 
         # summary + strategies
-        summary = (
-            df.groupby('clubbed_bin_id')
-              .agg(
-                  clubbed_bins      = ('bin_id', lambda x: ' && '.join(sorted(map(str, set(x))))),
-                  suitable_discount = ('discount','first'),
-                  avg_overstock     = ('overstock_score','mean')
-              )
-              .reset_index(drop=True)
-        )
-        summary['priority_score']    = summary['avg_overstock']
-        summary['avg_overstock_pct'] = (summary['avg_overstock'] * 100).round(1)
+        with profile_stage('summary', rows_in = len(df)) as stage:
+            bin_summary, summary = summarize_frame(df, model.bin_discounts, model.clubbed_bin_ids)
+            stage.rows_out = len(summary)
+
+        return self.write_outputs(summary, bin_summary, model, drift, refitted)
 
+    def write_outputs(self, summary: pd.DataFrame, bin_summary: pd.DataFrame, model: SmartBinningModel, drift, refitted):
         summary.to_csv(
             self.config.smart_binning_summary_file_path,
             index=False
         )
+        bin_summary.to_csv(
+            self.config.smart_binning_bin_summary_file_path,
+            index=False
+        )
         summary[['clubbed_bins','suitable_discount','priority_score','avg_overstock_pct']].to_csv(
             self.config.smart_binning_strategies_file_path,
             index=False
         )
 
-        smart_binning_artifact = SmartBinningArtifact(smart_binning_smart_bins=self.config.smart_binning_smart_bins_file_path,
+        with profile_stage('save_model'):
+            model.fingerprint = binning_fingerprint(self.config)
+            model.save(self.config.smart_binning_model_file_path)
+            if self.config.previous_model_file_path:
+                model.save(self.config.previous_model_file_path)
+
+        smart_binning_artifact = SmartBinningArtifact(smart_binning_smart_bins=self.config.smart_binning_smart_bins_dir,
                                                       smart_binning_strategies=self.config.smart_binning_summary_file_path,
-                                                      smart_binning_summary=self.config.smart_binning_strategies_file_path)
-        
+                                                      smart_binning_summary=self.config.smart_binning_strategies_file_path,
+                                                      smart_binning_model=self.config.smart_binning_model_file_path,
+                                                      drift=drift,
+                                                      refitted=refitted,
+                                                      n_clusters=len(model.centroids),
+                                                      smart_binning_bin_summary=self.config.smart_binning_bin_summary_file_path)
+
 
         print(f"✅ Smart‑binning artifacts saved")
 
         return smart_binning_artifact
 
+    @staticmethod
+    def assign(input_data_frame: pd.DataFrame, model_file_path: str) -> pd.DataFrame:
+        """
+        bins new inventory with a persisted model, see SmartBinningModel.assign
+        """
+        return SmartBinningModel.load(model_file_path).assign(input_data_frame)
+
+
+class StreamingSmartBinning(SmartBinning):
+    """
+    out of core smart binning. chunk_source is called once per pass and has to return a fresh
+    iterator of row chunks (pd.read_csv(..., chunksize=...) for example). the encoder, scaler and
+    svd are fitted on a uniform sample, the centroids with MiniBatchKMeans.partial_fit over every
+    chunk and bins are assigned in later passes, so memory is bounded by the chunk and sample size.
+    """
+    def __init__(self, chunk_source, smart_binning_config: SmartBinningConfig):
+        self.chunk_source = chunk_source
+        self.config = smart_binning_config
+
+    def _chunks(self):
+        for chunk in self.chunk_source():
+            yield add_binning_features(chunk)
+
+    def sample_pass(self):
+        """
+        keeps a uniform sample of sample_rows rows (the rows with the smallest random keys) and
+        collects every category of the categorical columns
+        """
+        rng = np.random.default_rng(0)
+        sample_rows = self.config.sample_rows
+        values = {col: set() for col in CAT_COLS}
+        missing = {col: False for col in CAT_COLS}
+        sample, keys = None, None
+        n_rows = 0
+
+        for chunk in self._chunks():
+            n_rows += len(chunk)
+            for col in CAT_COLS:
+                missing[col] = missing[col] or bool(chunk[col].isna().any())
+                values[col].update(chunk[col].dropna().unique().tolist())
+
+            chunk_keys = rng.random(len(chunk))
+            if sample is not None and len(sample) >= sample_rows:
+                keep = chunk_keys < keys.max()
+                chunk, chunk_keys = chunk[keep], chunk_keys[keep]
+            sample = chunk if sample is None else pd.concat([sample, chunk], ignore_index=True)
+            keys = chunk_keys if keys is None else np.concatenate([keys, chunk_keys])
+            if len(sample) > sample_rows:
+                keep = np.argpartition(keys, sample_rows)[:sample_rows]
+                sample, keys = sample.iloc[keep].reset_index(drop=True), keys[keep]
+
+        ## OneHotEncoder wants missing values as the last category
+        categories = [sorted(values[col]) + ([np.nan] if missing[col] else []) for col in CAT_COLS]
+        return sample, categories, n_rows
+
+    def fit_streaming_model(self, sample: pd.DataFrame, categories: list):
+        with profile_stage('fit_sample', rows_in = len(sample)):
+            ohe = OneHotEncoder(categories=categories, dtype='uint8', handle_unknown='ignore')
+            X_cat = ohe.fit_transform(sample[CAT_COLS])
+            scaler = StandardScaler()
+            X_num_scaled = scaler.fit_transform(sample[NUM_COLS].fillna(0).values)
+            svd = TruncatedSVD(n_components=20, random_state=0)
+            X_sample = svd.fit_transform(hstack([csr_matrix(X_num_scaled), X_cat], format='csr'))
+
+        n_clusters = self.config.n_clusters
+        if n_clusters == 'auto':
+            with profile_stage('choose_k', rows_in = len(sample)):
+                n_clusters = choose_n_clusters(X_sample, sample[self.config.auto_k_strata], self.config)
+
+        model = SmartBinningModel(ohe, scaler, svd, centroids=None,
+                                  bin_ids=fresh_bin_ids(n_clusters), reference_distance=None)
+
+        with profile_stage('partial_fit') as stage:
+            mbk = MiniBatchKMeans(
+                n_clusters=n_clusters,
+                batch_size=self.config.batch_size,
+                random_state=0
+            )
+            ## the sample seeds the centroids, then every chunk updates them
+            mbk.partial_fit(X_sample)
+            n_rows = 0
+            for chunk in self._chunks():
+                X_reduced = model.transform(chunk)
+                for start in range(0, len(X_reduced), self.config.batch_size):
+                    mbk.partial_fit(X_reduced[start:start + self.config.batch_size])
+                n_rows += len(chunk)
+            stage.rows_out = n_rows
+
+        model.centroids = mbk.cluster_centers_
+        return model
+
+    def stats_pass(self, model: SmartBinningModel, sketches: dict):
+        """
+        rows, overstock sum/count, simulation input sums and squared distance per centroid,
+        over every chunk. the summary sketches are updated along the way.
+        """
+        n_centroids = len(model.centroids)
+        rows = np.zeros(n_centroids, dtype=np.int64)
+        overstock_sum = np.zeros(n_centroids)
+        overstock_count = np.zeros(n_centroids, dtype=np.int64)
+        input_sums = {col: np.zeros(n_centroids) for col in BIN_INPUT_SUM_COLUMNS}
+        distance_sum = 0.0
+
+        for chunk in self._chunks():
+            closest, squared_distances = model.nearest(model.transform(chunk))
+            overstock = chunk['overstock_score'].to_numpy(dtype='float64')
+            valid = ~np.isnan(overstock)
+            rows += np.bincount(closest, minlength=n_centroids)
+            overstock_sum += np.bincount(closest[valid], weights=overstock[valid], minlength=n_centroids)
+            overstock_count += np.bincount(closest[valid], minlength=n_centroids)
+            for col, values in bin_input_columns(chunk).items():
+                input_sums[col] += np.bincount(closest, weights=values.to_numpy(dtype='float64'), minlength=n_centroids)
+            for col, prefix in SUMMARY_METRICS.items():
+                sketches[prefix].update(closest, chunk[col].to_numpy(dtype='float64'))
+            distance_sum += squared_distances.sum()
+
+        bin_stats = pd.DataFrame({
+            'bin_id': model.bin_ids,
+            'rows': rows,
+            'overstock_sum': overstock_sum,
+            'overstock_count': overstock_count,
+            **input_sums,
+        })
+        return bin_stats[bin_stats['rows'] > 0].reset_index(drop=True), distance_sum / max(rows.sum(), 1)
+
+    def write_pass(self, model: SmartBinningModel):
+        os.makedirs(self.config.smart_binning_dir, exist_ok=True)
+        writer = BinPartitionWriter(self.config.smart_binning_smart_bins_dir,
+                                    self.config.partition_column, self.config.partition_stats_columns)
+        n_rows = 0
+        for chunk in self._chunks():
+            closest, _ = model.nearest(model.transform(chunk))
+            chunk['bin_id'] = model.bin_ids[closest]
+            apply_bin_decisions(chunk, model)
+            writer.write(chunk)
+            n_rows += len(chunk)
+        writer.close()
+        return n_rows
+
+    def run(self):
+        # 1) SAMPLE & CATEGORIES
+        with profile_stage('sample_pass') as stage:
+            sample, categories, n_rows = self.sample_pass()
+            stage.rows_in, stage.rows_out = n_rows, len(sample)
+        print(f"🧮 Streaming smart-binning over {n_rows} rows, sample of {len(sample)}")
+
+        # 2-5) FIT ON THE SAMPLE + PARTIAL FIT (or reuse the persisted model)
+        previous_model = self.load_previous_model()
+        drift, refitted = None, True
+        if previous_model is not None:
+            previous_closest, squared_distances = previous_model.nearest(previous_model.transform(sample))
+            drift = previous_model.drift(squared_distances)
+
+        if previous_model is not None and drift <= self.config.drift_threshold:
+            print(f"♻️ Reusing binning model, drift {drift:.3f} <= {self.config.drift_threshold}")
+            model, refitted = previous_model, False
+        else:
+            model = self.fit_streaming_model(sample, categories)
+            if previous_model is not None:
+                print(f"🔁 Binning drift {drift:.3f} > {self.config.drift_threshold}, refitted")
+                sample_closest, _ = model.nearest(model.transform(sample))
+                model.bin_ids = match_bin_ids(previous_model.bin_ids[previous_closest], sample_closest,
+                                              len(model.centroids), previous_model.bin_ids)
+        # summary quantiles are approximated on bucket edges taken from the sample
+        sketches = {prefix: QuantileSketch.from_sample(sample[col], len(model.centroids))
+                    for col, prefix in SUMMARY_METRICS.items()}
+        del sample
+
+        # 6-7) BIN STATS, CLUBBING & OPTIMIZED DISCOUNTS
+        with profile_stage('stats_pass', rows_in = n_rows) as stage:
+            bin_stats, mean_distance = self.stats_pass(model, sketches)
+            if refitted:
+                model.reference_distance = mean_distance
+            model.bin_discounts, model.clubbed_bin_ids = decide_bins(bin_stats, self.config)
+            stage.rows_out = len(bin_stats)
+
+        # 8) WRITE OUT ARTIFACTS
+        with profile_stage('write_smart_bins', rows_in = n_rows) as stage:
+            stage.rows_out = self.write_pass(model)
+
+        with profile_stage('summary', rows_in = len(bin_stats)) as stage:
+            bin_rows = pd.Series(bin_stats['rows'].values, index=bin_stats['bin_id'].values).reindex(model.bin_ids, fill_value=0).values
+            bin_summary, summary = summarize_sketches(model.bin_ids, bin_rows, sketches,
+                                                      model.bin_discounts, model.clubbed_bin_ids)
+            stage.rows_out = len(summary)
 
+        return self.write_outputs(summary, bin_summary, model, drift, refitted)
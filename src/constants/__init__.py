@@ -43,6 +43,74 @@ smart binning variable
 """
 
 SMART_BINNING_DIR_NAME = 'smart_binning'
-SMART_BINNING_SMART_BINS_FILE_NAME = 'smart_bins.csv'
+# full detail frame, parquet partitioned by SMART_BINNING_PARTITION_COLUMN with an index json
+SMART_BINNING_SMART_BINS_DIR_NAME = 'smart_bins'
+SMART_BINNING_PARTITION_COLUMN = 'clubbed_bin_id'
+SMART_BINNING_PARTITION_STATS_COLUMNS = ['overstock_score', 'actual_stock', 'future_sales', 'sell_price', 'discount']
 SMART_BINNING_SUMMARY_FILE_NAME = 'smart_bins_summary.csv'
+SMART_BINNING_BIN_SUMMARY_FILE_NAME = 'bin_summary.csv'
 SMART_BINNING_STRATEGIES_FILE_NAME = 'strategies.csv'
+SMART_BINNING_MODEL_FILE_NAME = 'binning_model.pkl'
+# the model of the latest run, new runs reuse it while the data has not drifted
+SMART_BINNING_CURRENT_MODEL_PATH = os.path.join(ARTIFACT_DIR_NAME, 'smart_binning_model.pkl')
+SMART_BINNING_DRIFT_THRESHOLD = 1.5
+# dataset name of runs on the configured input files
+SMART_BINNING_DEFAULT_DATASET = 'default'
+SMART_BINNING_BATCH_SIZE = 10000
+# 'auto' picks k from SMART_BINNING_K_RANGE on a stratified sample
+SMART_BINNING_N_CLUSTERS = 'auto'
+SMART_BINNING_K_RANGE = (5, 30)
+SMART_BINNING_AUTO_K_METRIC = 'silhouette'
+SMART_BINNING_AUTO_K_SAMPLE_ROWS = 20000
+SMART_BINNING_AUTO_K_BATCH_SIZE = 2048
+SMART_BINNING_AUTO_K_STRATA = ['store_id', 'dept_id']
+SMART_BINNING_HIGH_PRIORITY_BINS = 2
+# per bin discount optimizer, the grid is searched for the best recovered margin
+# (revenue minus unit cost) that still clears the stock in time
+SMART_BINNING_DISCOUNT_GRID = [round(0.01 * x, 2) for x in range(0, 51)]
+SMART_BINNING_ELASTICITY = 2.0
+SMART_BINNING_MAX_CLEARANCE_DAYS = 56
+SMART_BINNING_CLEARANCE_TARGET = 0.9
+SMART_BINNING_UNIT_COST_RATIO = 0.6
+# discount of rows a reused model puts in a bin that had no rows when the discounts were decided
+SMART_BINNING_DEFAULT_DISCOUNT = 0.0
+# rows the encoder, scaler and svd are fitted on in streaming mode
+SMART_BINNING_SAMPLE_ROWS = 200000
+
+
+"""
+Clearance simulation variables
+"""
+CLEARANCE_SIMULATION_DIR_NAME = 'clearance_simulation'
+CLEARANCE_SIMULATION_FILE_NAME = 'campaign_simulation.csv'
+CLEARANCE_STRATEGY_FILE_NAME = 'bin_strategy.csv'
+CLEARANCE_GROUP_COLUMNS = ['store_id', 'clubbed_bin_id']
+CLEARANCE_DISCOUNTS = [0.0, 0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.35, 0.4, 0.45, 0.5]
+# price elasticities of demand (as positive numbers) swept by the simulation
+CLEARANCE_ELASTICITIES = [1.0, 1.5, 2.0, 2.5, 3.0]
+CLEARANCE_HORIZON_DAYS = [7, 14, 28, 56]
+# monte carlo demand draws per group, 0 only computes the expected values
+CLEARANCE_N_DRAWS = 0
+CLEARANCE_DEMAND_CV = 0.3
+CLEARANCE_TARGET = 0.9
+CLEARANCE_STRATEGY_ELASTICITY = 2.0
+CLEARANCE_STRATEGY_HORIZON_DAYS = 28
+
+
+"""
+Profiling variables
+"""
+PROFILING_DIR_NAME = 'profiling'
+PROFILING_REPORT_FILE_NAME = 'profile.json'
+PROFILING_SAMPLES_FILE_NAME = 'samples.collapsed'
+PROFILING_MEMORY_POLL_INTERVAL = 0.05
+
+
+"""
+Artifact registry variables
+"""
+# manifest of training runs and the pointer to the run serving uses, both in ARTIFACT_DIR_NAME
+REGISTRY_FILE_NAME = 'registry.json'
+REGISTRY_PROMOTED_FILE_NAME = 'promoted.json'
+REGISTRY_LOCK_FILE_NAME = 'registry.lock'
+REGISTRY_LOCK_TIMEOUT = 30
@@ -25,10 +25,24 @@ class ModelTrainerArtifact:
         self.predicted_path = predicted_path
 
 class SmartBinningArtifact:
-    def __init__(self, smart_binning_smart_bins, smart_binning_summary, smart_binning_strategies):
+    def __init__(self, smart_binning_smart_bins, smart_binning_summary, smart_binning_strategies,
+                 smart_binning_model = None, drift = None, refitted = True, n_clusters = None,
+                 smart_binning_bin_summary = None):
         self.smart_bins = smart_binning_smart_bins
         self.summary = smart_binning_summary
         self.strategies = smart_binning_strategies
+        self.model = smart_binning_model
+        self.drift = drift
+        self.refitted = refitted
+        self.n_clusters = n_clusters
+        self.bin_summary = smart_binning_bin_summary
 
-    
-        
\ No newline at end of file
+class ClearanceSimulationArtifact:
+    def __init__(self, simulation_file_path, strategy_file_path):
+        self.simulation_file_path = simulation_file_path
+        self.strategy_file_path = strategy_file_path
+
+class ProfilingArtifact:
+    def __init__(self, profile_file_path, samples_file_path = None):
+        self.profile_file_path = profile_file_path
+        self.samples_file_path = samples_file_path
@@ -4,7 +4,9 @@ import os
 
 class TrainingConfig:
     def __init__(self, timestamp = datetime.now()):
-        self.timestamp = timestamp.strftime("%m_%d_%Y_%H_%M_%S")
+        # year first so run directories sort chronologically
+        self.timestamp = timestamp.strftime("%Y_%m_%d_%H_%M_%S")
+        self.created_at = timestamp.isoformat()
         self.artifact_dir_name = constants.ARTIFACT_DIR_NAME
         self.artifact_dir_path = os.path.join(self.artifact_dir_name, self.timestamp)
         
@@ -36,15 +38,71 @@ class ModelTrainerConfig:
     self.trained_y = os.path.join(self.model_trainer_dir, constants.PREDICTED_TRAIN)
 
 class SmartBinningConfig:
-    def __init__(self, training_pipeline_config: TrainingConfig, n_clusters: int = 15):
+    def __init__(self, training_pipeline_config: TrainingConfig, n_clusters = constants.SMART_BINNING_N_CLUSTERS,
+                 previous_model_file_path: str = constants.SMART_BINNING_CURRENT_MODEL_PATH,
+                 drift_threshold: float = constants.SMART_BINNING_DRIFT_THRESHOLD,
+                 chunk_size: int = None, sample_rows: int = constants.SMART_BINNING_SAMPLE_ROWS,
+                 dataset: str = constants.SMART_BINNING_DEFAULT_DATASET):
         self.smart_binning_dir = os.path.join(training_pipeline_config.artifact_dir_path, constants.SMART_BINNING_DIR_NAME)
-        self.smart_binning_smart_bins_file_path = os.path.join(self.smart_binning_dir, constants.SMART_BINNING_SMART_BINS_FILE_NAME)
+        self.smart_binning_smart_bins_dir = os.path.join(self.smart_binning_dir, constants.SMART_BINNING_SMART_BINS_DIR_NAME)
+        self.partition_column = constants.SMART_BINNING_PARTITION_COLUMN
+        self.partition_stats_columns = constants.SMART_BINNING_PARTITION_STATS_COLUMNS
         self.smart_binning_summary_file_path = os.path.join(self.smart_binning_dir, constants.SMART_BINNING_SUMMARY_FILE_NAME)
+        self.smart_binning_bin_summary_file_path = os.path.join(self.smart_binning_dir, constants.SMART_BINNING_BIN_SUMMARY_FILE_NAME)
         self.smart_binning_strategies_file_path = os.path.join(self.smart_binning_dir, constants.SMART_BINNING_STRATEGIES_FILE_NAME)
-         # **NEW** number of clusters to generate
+        self.smart_binning_model_file_path = os.path.join(self.smart_binning_dir, constants.SMART_BINNING_MODEL_FILE_NAME)
+         # **NEW** number of clusters to generate, or 'auto'
         self.n_clusters = n_clusters
+        self.k_range = constants.SMART_BINNING_K_RANGE
+        self.auto_k_metric = constants.SMART_BINNING_AUTO_K_METRIC
+        self.auto_k_sample_rows = constants.SMART_BINNING_AUTO_K_SAMPLE_ROWS
+        self.auto_k_batch_size = constants.SMART_BINNING_AUTO_K_BATCH_SIZE
+        self.auto_k_strata = constants.SMART_BINNING_AUTO_K_STRATA
+        self.auto_k_n_jobs = -1
+        # most overstocked bins clubbed together, the group gets one optimized discount
+        self.n_high_priority_bins = constants.SMART_BINNING_HIGH_PRIORITY_BINS
+        # discount per (clubbed) bin, maximizing the margin of the units cleared while clearing
+        # at least clearance_target of the stock within max_clearance_days
+        self.discount_grid = constants.SMART_BINNING_DISCOUNT_GRID
+        self.elasticity = constants.SMART_BINNING_ELASTICITY
+        self.max_clearance_days = constants.SMART_BINNING_MAX_CLEARANCE_DAYS
+        self.clearance_target = constants.SMART_BINNING_CLEARANCE_TARGET
+        self.unit_cost_ratio = constants.SMART_BINNING_UNIT_COST_RATIO
+        # model reused (and overwritten) across runs, None always refits
+        self.previous_model_file_path = previous_model_file_path
+        # identifies the input data, a persisted model of another dataset is never reused
+        self.dataset = dataset
+        # refit once the mean distance to the centroids grows past this ratio
+        self.drift_threshold = drift_threshold
+        self.batch_size = constants.SMART_BINNING_BATCH_SIZE
+        # rows per chunk in streaming mode, None bins the whole frame in memory
+        self.chunk_size = chunk_size
+        self.sample_rows = sample_rows
 
 
+class ClearanceSimulationConfig:
+    def __init__(self, training_pipeline_config: TrainingConfig, n_draws: int = constants.CLEARANCE_N_DRAWS):
+        self.clearance_simulation_dir = os.path.join(training_pipeline_config.artifact_dir_path, constants.CLEARANCE_SIMULATION_DIR_NAME)
+        self.simulation_file_path = os.path.join(self.clearance_simulation_dir, constants.CLEARANCE_SIMULATION_FILE_NAME)
+        self.strategy_file_path = os.path.join(self.clearance_simulation_dir, constants.CLEARANCE_STRATEGY_FILE_NAME)
+        # one simulated group per store and clubbed bin
+        self.group_columns = constants.CLEARANCE_GROUP_COLUMNS
+        self.discounts = constants.CLEARANCE_DISCOUNTS
+        self.elasticities = constants.CLEARANCE_ELASTICITIES
+        self.horizons = constants.CLEARANCE_HORIZON_DAYS
+        self.n_draws = n_draws
+        self.demand_cv = constants.CLEARANCE_DEMAND_CV
+        # the suggested strategy is the best discount under this elasticity and horizon
+        self.target_clearance = constants.CLEARANCE_TARGET
+        self.strategy_elasticity = constants.CLEARANCE_STRATEGY_ELASTICITY
+        self.strategy_horizon_days = constants.CLEARANCE_STRATEGY_HORIZON_DAYS
 
-   
 
+class ProfilingConfig:
+    def __init__(self, training_pipeline_config: TrainingConfig, sampling_interval: float = None):
+        self.profiling_dir = os.path.join(training_pipeline_config.artifact_dir_path, constants.PROFILING_DIR_NAME)
+        self.profile_file_path = os.path.join(self.profiling_dir, constants.PROFILING_REPORT_FILE_NAME)
+        self.samples_file_path = os.path.join(self.profiling_dir, constants.PROFILING_SAMPLES_FILE_NAME)
+        self.memory_poll_interval = constants.PROFILING_MEMORY_POLL_INTERVAL
+        # seconds between stack samples, None keeps the sampling profiler off
+        self.sampling_interval = sampling_interval
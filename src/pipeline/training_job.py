@@ -0,0 +1,55 @@
+import sys
+import json
+import time
+import argparse
+import traceback
+from src.pipeline.training_pipeline import run_training_pipeline
+
+"""
+Training pipeline as a worker process
+
+Runs the pipeline and reports progress as one json object per line on stdout, prefixed with
+EVENT_PREFIX so they stand out from the pipeline's own prints:
+    {"type": "stage", "stage": "model_training", "status": "started", "time": ...}
+    {"type": "completed", "result": {...metrics and artifact paths...}, "time": ...}
+    {"type": "failed", "error": "...", "traceback": "...", "time": ...}
+
+usage (from the project root):
+    python -m src.pipeline.training_job [--calendar PATH --sales PATH --prices PATH] [--no-promote]
+"""
+EVENT_PREFIX = "@@training-event "
+
+
+def emit(event: dict):
+    print(EVENT_PREFIX + json.dumps({**event, 'time': time.time()}, default=str), flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the training pipeline and report progress as json lines")
+    parser.add_argument('--calendar')
+    parser.add_argument('--sales')
+    parser.add_argument('--prices')
+    parser.add_argument('--no-promote', action='store_true', help="register the run without promoting it")
+    args = parser.parse_args(argv)
+
+    data_paths = None
+    if args.calendar or args.sales or args.prices:
+        if not (args.calendar and args.sales and args.prices):
+            parser.error("--calendar, --sales and --prices go together")
+        data_paths = {'calendar': args.calendar, 'sales': args.sales, 'prices': args.prices}
+
+    try:
+        result = run_training_pipeline(
+            data_paths=data_paths,
+            promote=False if args.no_promote else None,
+            progress=lambda stage, status: emit({'type': 'stage', 'stage': stage, 'status': status}),
+        )
+    except Exception as e:
+        emit({'type': 'failed', 'error': f"{type(e).__name__}: {e}", 'traceback': traceback.format_exc()})
+        return 1
+    emit({'type': 'completed', 'result': result})
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import os
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from src.components.data_ingestion import DataIngestion
+from src.components.data_transformation import DataTransformation
+from src.components.model_trainer_2 import ModelTrainer
+from src.components.smart_bin import SmartBinning, StreamingSmartBinning
+from src.components.clearance_simulator import ClearanceSimulation
+from src.entity.config import (TrainingConfig, DataIngestionConfig, DataTransformationConfig, ModelTrainerConfig,
+                               SmartBinningConfig, ProfilingConfig, ClearanceSimulationConfig)
+from src.utils.profiling_utils import PipelineProfiler, profile_stage
+from src.utils.registry_utils import ArtifactRegistry
+from src import constants
+
+TRAINING_STAGES = ['data_ingestion', 'data_transformation', 'model_training', 'smart_binning', 'clearance_simulation']
+
+
+def sb_chunks(sb_path, preds_path, chunk_size):
+    """
+    SB dataframe in chunks for streaming smart-binning, same future_sales and synthetic
+    actual_stock as the in memory path
+    """
+    random_state = np.random.RandomState(42)
+    for sb_chunk, y_chunk in zip(pd.read_csv(sb_path, chunksize=chunk_size),
+                                 pd.read_csv(preds_path, chunksize=chunk_size)):
+        sb_chunk['future_sales'] = y_chunk.iloc[:, 0].values
+        offsets = random_state.randint(-100, 101, size=len(sb_chunk))
+        sb_chunk['actual_stock'] = (sb_chunk['future_sales'] + offsets).clip(lower=0)
+        yield sb_chunk
+
+
+def metric_dict(metric) -> dict:
+    return {'rmsle': float(metric.rmsle_value), 'smape': float(metric.smape_value)}
+
+
+class TrainingPipeline:
+    """
+    the full training run (ingestion -> clearance simulation). progress(stage, status) is
+    called with 'started' and 'completed' around every stage, run() returns the metrics and
+    artifact paths of the run as a plain dict.
+    data_paths ({'calendar', 'sales', 'prices'}) replaces the configured input files.
+    """
+    def __init__(self, training_config: TrainingConfig = None, data_paths: dict = None, progress=None,
+                 sampling_interval: float = None, smart_binning_chunk_size: int = None, clearance_n_draws: int = 0):
+        self.training_config = training_config or TrainingConfig(datetime.now())
+        self.data_paths = data_paths
+        self.progress = progress or (lambda stage, status: None)
+        self.sampling_interval = sampling_interval
+        self.smart_binning_chunk_size = smart_binning_chunk_size
+        self.clearance_n_draws = clearance_n_draws
+
+    def dataset(self) -> str:
+        """
+        the directory of the input files when data_paths replaces them, the default dataset otherwise
+        """
+        if not self.data_paths:
+            return constants.SMART_BINNING_DEFAULT_DATASET
+        return os.path.dirname(os.path.abspath(self.data_paths['sales']))
+
+    @contextmanager
+    def _stage(self, name):
+        self.progress(name, 'started')
+        with profile_stage(name) as stage:
+            yield stage
+        self.progress(name, 'completed')
+
+    def run(self) -> dict:
+        training_config = self.training_config
+        profiling_config = ProfilingConfig(training_config, sampling_interval=self.sampling_interval)
+        profiler = PipelineProfiler(profiling_config).start()
+
+        ## the report is written (and the sampler/monitor threads stopped) when a stage raises too,
+        ## the failed stage carries the error
+        try:
+            data_ingestion_config = DataIngestionConfig(training_config)
+            if self.data_paths:
+                data_ingestion_config.calendar_path = self.data_paths['calendar']
+                data_ingestion_config.sales_path = self.data_paths['sales']
+                data_ingestion_config.prices_path = self.data_paths['prices']
+            with self._stage('data_ingestion'):
+                data_ingestion_artifact = DataIngestion(data_ingestion_config).initiate_data_ingestion()
+            print("📥 Data ingestion complete")
+
+            data_transformation_config = DataTransformationConfig(training_config)
+            with self._stage('data_transformation'):
+                data_transformation_artifact = DataTransformation(
+                    data_ingestion_artifact, data_transformation_config).initiate_data_transformation()
+            print("🔄 Data transformation complete")
+
+            model_trainer_config = ModelTrainerConfig(training_config)
+            with self._stage('model_training'):
+                model_trainer_artifact = ModelTrainer(data_transformation_artifact, model_trainer_config).initiate_model_training()
+            print("🤖 Model training complete")
+
+            smart_binning_config = SmartBinningConfig(training_config, chunk_size=self.smart_binning_chunk_size,
+                                                      dataset=self.dataset())
+            sb_path    = data_ingestion_artifact.train_path
+            preds_path = model_trainer_artifact.predicted_path
+            with self._stage('smart_binning'):
+                if smart_binning_config.chunk_size:
+                    smart_binning = StreamingSmartBinning(
+                        lambda: sb_chunks(sb_path, preds_path, smart_binning_config.chunk_size),
+                        smart_binning_config
+                    )
+                else:
+                    smart_binning = SmartBinning(self.sb_dataframe(sb_path, preds_path), smart_binning_config)
+                smart_binning_artifact = smart_binning.run()
+            print('📊  smart binning completed')
+
+            clearance_simulation_config = ClearanceSimulationConfig(training_config, n_draws=self.clearance_n_draws)
+            with self._stage('clearance_simulation'):
+                clearance_simulation_artifact = ClearanceSimulation(smart_binning_artifact, clearance_simulation_config).run()
+            print('🏷️ clearance simulation completed')
+        finally:
+            profiling_artifact = profiler.write_report()
+            print(f"⏱️ Profile written to {profiling_artifact.profile_file_path}")
+
+        paths = {
+            'preprocessor': data_transformation_artifact.preprocessor_obj_file_path,
+            'model': model_trainer_artifact.trained_model_file_path,
+            'smart_bins': smart_binning_artifact.smart_bins,
+            'smart_bins_summary': smart_binning_config.smart_binning_summary_file_path,
+            'bin_summary': smart_binning_config.smart_binning_bin_summary_file_path,
+            'strategies': smart_binning_config.smart_binning_strategies_file_path,
+            'clearance_strategy': clearance_simulation_artifact.strategy_file_path,
+            'profile': profiling_artifact.profile_file_path,
+        }
+        return {
+            'run_id': training_config.timestamp,
+            'created_at': training_config.created_at,
+            'artifact_dir': os.path.abspath(training_config.artifact_dir_path),
+            'metrics': {
+                'train': metric_dict(model_trainer_artifact.train_metrics),
+                'test': metric_dict(model_trainer_artifact.test_metrics),
+            },
+            'paths': {name: os.path.abspath(path) for name, path in paths.items() if path},
+        }
+
+    @staticmethod
+    def sb_dataframe(sb_path, preds_path) -> pd.DataFrame:
+        """
+        SB dataframe with the model predictions as future_sales and a synthetic actual_stock
+        """
+        sb_df      = pd.read_csv(sb_path)
+        print("📥 input_data read")
+        y_future   = pd.read_csv(preds_path)
+        print("📥 predicted_data read")
+        # ensure the predictions column is named 'future_sales'
+        if 'future_sales' not in y_future.columns:
+            y_future.columns = ['future_sales']
+
+        sb_df['future_sales'] = y_future['future_sales'].values
+
+        # we dont have actual_stock, so we synthesize it here
+        np.random.seed(42)
+        offsets = np.random.randint(-100, 101, size=len(sb_df))
+        sb_df['actual_stock'] = (sb_df['future_sales'] + offsets).clip(lower=0)
+        print("🔄 SB dataframe enriched with actual_stock")
+        return sb_df
+
+
+def run_training_pipeline(promote: bool = None, **kwargs) -> dict:
+    """
+    TrainingPipeline(**kwargs).run() with the environment knobs of main1.py as defaults
+    (PROFILE_SAMPLING_INTERVAL, SMART_BINNING_CHUNK_SIZE, CLEARANCE_N_DRAWS). the run is
+    registered in the artifact registry and promoted unless promote (default
+    PROMOTE_TRAINED_MODEL, on) is off.
+    """
+    if promote is None:
+        promote = os.getenv("PROMOTE_TRAINED_MODEL", "1") == "1"
+    sampling_interval = os.getenv("PROFILE_SAMPLING_INTERVAL")
+    chunk_size = os.getenv("SMART_BINNING_CHUNK_SIZE")
+    n_draws = os.getenv("CLEARANCE_N_DRAWS")
+    kwargs.setdefault('sampling_interval', float(sampling_interval) if sampling_interval else None)
+    kwargs.setdefault('smart_binning_chunk_size', int(chunk_size) if chunk_size else None)
+    kwargs.setdefault('clearance_n_draws', int(n_draws) if n_draws else 0)
+    result = TrainingPipeline(**kwargs).run()
+    registry = ArtifactRegistry(os.path.dirname(result['artifact_dir']))
+    registry.register(result, promote=promote)
+    result['promoted'] = promote
+    return result
@@ -5,6 +5,7 @@ import os
 import pickle
 import joblib
 from sklearn.metrics import mean_squared_log_error
+from src.utils.profiling_utils import profile_stage
 
 
 def convert_dataframe(calendar, sales, prices) -> pd.DataFrame:
@@ -17,17 +18,25 @@ def convert_dataframe(calendar, sales, prices) -> pd.DataFrame:
     col = [f'd_{x}' for x in range(start_col, end_col + 1)]
     columns = ['id', 'item_id', 'dept_id', 'cat_id', 'store_id', 'state_id'] + col
     sub_validation_df = sales[columns]
-    final_df = sub_validation_df.melt(
-        id_vars=['id', 'item_id', 'dept_id', 'cat_id', 'store_id', 'state_id'],
-        var_name='d',
-        value_name='sales'
-    )
+    with profile_stage('melt', rows_in = len(sub_validation_df)) as stage:
+        final_df = sub_validation_df.melt(
+            id_vars=['id', 'item_id', 'dept_id', 'cat_id', 'store_id', 'state_id'],
+            var_name='d',
+            value_name='sales'
+        )
+        stage.rows_out = len(final_df)
 
-    final_df = final_df.merge(calendar, how = 'left', on = 'd')
+    with profile_stage('merge_calendar', rows_in = len(final_df)) as stage:
+        final_df = final_df.merge(calendar, how = 'left', on = 'd')
+        stage.rows_out = len(final_df)
 
-    final_df = final_df.merge(prices, how = 'left', on = ['store_id', 'item_id', 'wm_yr_wk'])
+    with profile_stage('merge_prices', rows_in = len(final_df)) as stage:
+        final_df = final_df.merge(prices, how = 'left', on = ['store_id', 'item_id', 'wm_yr_wk'])
+        stage.rows_out = len(final_df)
 
-    final_df['date'] = pd.to_datetime(final_df['date'])
+    with profile_stage('parse_dates', rows_in = len(final_df)) as stage:
+        final_df['date'] = pd.to_datetime(final_df['date'])
+        stage.rows_out = len(final_df)
 
     return final_df
 
@@ -37,79 +46,98 @@ def add_features(data_df : pd.DataFrame) -> pd.DataFrame:
     """
     This fucntion is responsible for feature engineering 
     """
-    data_df = data_df.sort_values(['id', 'date'])
+    n_rows = len(data_df)
+    with profile_stage('sort', rows_in = n_rows) as stage:
+        data_df = data_df.sort_values(['id', 'date'])
+        stage.rows_out = len(data_df)
 
     ## create lag of 28
-    data_df['lag_28'] = (
-        data_df
-        .groupby('id')['sales']
-        .shift(28)
-    )
+    with profile_stage('lag_28', rows_in = n_rows) as stage:
+        data_df['lag_28'] = (
+            data_df
+            .groupby('id')['sales']
+            .shift(28)
+        )
+        stage.rows_out = len(data_df)
 
     ## create lag of 7
-    data_df['lag_7'] = (
-        data_df
-        .groupby('id')['sales']
-        .shift(7)
-    )
+    with profile_stage('lag_7', rows_in = n_rows) as stage:
+        data_df['lag_7'] = (
+            data_df
+            .groupby('id')['sales']
+            .shift(7)
+        )
+        stage.rows_out = len(data_df)
 
     ## rolling mean of 28
-    data_df['rolling_mean_28'] = (
-        data_df
-        .groupby('id')['sales']
-        .transform(
-            lambda x: x.shift(1).rolling(window=28).mean()
+    with profile_stage('rolling_mean_28', rows_in = n_rows) as stage:
+        data_df['rolling_mean_28'] = (
+            data_df
+            .groupby('id')['sales']
+            .transform(
+                lambda x: x.shift(1).rolling(window=28).mean()
+            )
         )
-    )
+        stage.rows_out = len(data_df)
 
     # ## percent price change feature
-    data_df["price_pct_change"] = (
-        data_df.groupby("id")["sell_price"]
-        .pct_change(fill_method = None).fillna(0)
-    )
+    with profile_stage('price_pct_change', rows_in = n_rows) as stage:
+        data_df["price_pct_change"] = (
+            data_df.groupby("id")["sell_price"]
+            .pct_change(fill_method = None).fillna(0)
+        )
+        stage.rows_out = len(data_df)
 
     # ## zero streaks
-    data_df["zero_streak"] = (
-        data_df.groupby("id")["sales"]
-        .transform(lambda x: x.eq(0).astype(int).groupby(x.ne(0).cumsum()).cumsum())
-    )
+    with profile_stage('zero_streak', rows_in = n_rows) as stage:
+        data_df["zero_streak"] = (
+            data_df.groupby("id")["sales"]
+            .transform(lambda x: x.eq(0).astype(int).groupby(x.ne(0).cumsum()).cumsum())
+        )
+        stage.rows_out = len(data_df)
 
 
     ## calendar features
-    data_df['month'] = data_df['date'].dt.month
-    data_df['year'] = data_df['date'].dt.year
+    with profile_stage('calendar_features', rows_in = n_rows) as stage:
+        data_df['month'] = data_df['date'].dt.month
+        data_df['year'] = data_df['date'].dt.year
 
-    data_df['day_of_month'] = data_df['date'].dt.day
-    data_df['week_of_month'] = ((data_df['day_of_month'] - 1) // 7) + 1
+        data_df['day_of_month'] = data_df['date'].dt.day
+        data_df['week_of_month'] = ((data_df['day_of_month'] - 1) // 7) + 1
+        stage.rows_out = len(data_df)
 
 
     ## adding a snap_active feature
-    conditions = [
-    data_df["state_id"] == "CA",
-    data_df["state_id"] == "TX",
-    data_df["state_id"] == "WI"
-    ]
-
-    choices = [
-        data_df["snap_CA"],
-        data_df["snap_TX"],
-        data_df["snap_WI"]
-    ]
-    data_df["snap_active"] = np.select(conditions, choices, default=0)
-    data_df.drop(['snap_CA', 'snap_TX', 'snap_WI'], axis = 1)
+    with profile_stage('snap_active', rows_in = n_rows) as stage:
+        conditions = [
+        data_df["state_id"] == "CA",
+        data_df["state_id"] == "TX",
+        data_df["state_id"] == "WI"
+        ]
+
+        choices = [
+            data_df["snap_CA"],
+            data_df["snap_TX"],
+            data_df["snap_WI"]
+        ]
+        data_df["snap_active"] = np.select(conditions, choices, default=0)
+        data_df.drop(['snap_CA', 'snap_TX', 'snap_WI'], axis = 1)
+        stage.rows_out = len(data_df)
 
 
     ## target columns
     ## Reverse the time series so rolling looks "forward"
-    data_df['sales_28_sum'] = (
-        data_df
-        .iloc[::-1]                                 
-        .groupby('id')['sales']
-        .rolling(window=28, min_periods=28)
-        .sum()
-        .reset_index(level=0, drop=True)
-        .iloc[::-1]                               
-    )
+    with profile_stage('sales_28_sum', rows_in = n_rows) as stage:
+        data_df['sales_28_sum'] = (
+            data_df
+            .iloc[::-1]                                 
+            .groupby('id')['sales']
+            .rolling(window=28, min_periods=28)
+            .sum()
+            .reset_index(level=0, drop=True)
+            .iloc[::-1]                               
+        )
+        stage.rows_out = len(data_df)
 
     return data_df
 
@@ -0,0 +1,146 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+"""
+Bin partitioned parquet
+
+A frame is written as one directory per value of the partition column (hive style,
+clubbed_bin_id=3/part-00000.parquet) next to a small json index with the schema and the row
+count and stats of every partition. The partition column is not stored in the files, readers
+add it back, so one bin (or a few columns of it) is loaded without touching the rest.
+"""
+INDEX_FILE_NAME = '_index.json'
+
+
+def arrow_schema(table: pa.Table) -> pa.Schema:
+    """
+    schema of table with all-null columns typed as strings, so every chunk of a streamed
+    frame gets the same schema
+    """
+    schema = table.schema.remove_metadata()
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, pa.field(field.name, pa.string()))
+    return schema
+
+
+class BinPartitionWriter:
+    """
+    appends frames (whole or chunk by chunk) to a bin partitioned parquet directory, every
+    write adds one part file per partition it holds. close() writes the index.
+    """
+    def __init__(self, output_dir: str, partition_column: str, stats_columns: list):
+        self.output_dir = output_dir
+        self.partition_column = partition_column
+        self.stats_columns = stats_columns
+        self.schema = None
+        self.partitions = {}
+        self.n_writes = 0
+
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.makedirs(output_dir, exist_ok=True)
+
+    def write(self, df: pd.DataFrame):
+        table = pa.Table.from_pandas(df.drop(columns=[self.partition_column]), preserve_index=False)
+        if self.schema is None:
+            self.schema = arrow_schema(table)
+        table = table.cast(self.schema)
+        stats_values = {col: df[col].to_numpy(dtype='float64') for col in self.stats_columns}
+
+        for value, positions in df.groupby(self.partition_column, sort=False).indices.items():
+            key = str(value)
+            relative_path = os.path.join(f"{self.partition_column}={key}", f"part-{self.n_writes:05d}.parquet")
+            os.makedirs(os.path.join(self.output_dir, os.path.dirname(relative_path)), exist_ok=True)
+            pq.write_table(table.take(positions), os.path.join(self.output_dir, relative_path))
+            self._update_stats(key, value, relative_path, len(positions),
+                              {col: values[positions] for col, values in stats_values.items()})
+
+        self.n_writes += 1
+
+    def _update_stats(self, key, value, relative_path, n_rows: int, stats_values: dict):
+        entry = self.partitions.setdefault(key, {
+            'value': value.item() if isinstance(value, np.generic) else value,
+            'files': [], 'rows': 0, 'stats': {},
+        })
+        entry['files'].append(relative_path)
+        entry['rows'] += n_rows
+        for col, values in stats_values.items():
+            values = values[~np.isnan(values)]
+            if not len(values):
+                continue
+            stats = entry['stats'].setdefault(col, {'min': None, 'max': None, 'sum': 0.0, 'count': 0})
+            stats['min'] = float(values.min()) if stats['min'] is None else min(stats['min'], float(values.min()))
+            stats['max'] = float(values.max()) if stats['max'] is None else max(stats['max'], float(values.max()))
+            stats['sum'] += float(values.sum())
+            stats['count'] += int(len(values))
+
+    def close(self) -> dict:
+        for entry in self.partitions.values():
+            for stats in entry['stats'].values():
+                stats['mean'] = stats['sum'] / stats['count'] if stats['count'] else None
+
+        index = {
+            'partition_column': self.partition_column,
+            'columns': {field.name: str(field.type) for field in self.schema} if self.schema is not None else {},
+            'rows': sum(entry['rows'] for entry in self.partitions.values()),
+            'partitions': self.partitions,
+        }
+        with open(os.path.join(self.output_dir, INDEX_FILE_NAME), 'w') as file:
+            json.dump(index, file, indent=2)
+        return index
+
+
+def write_bin_partitions(df: pd.DataFrame, output_dir: str, partition_column: str, stats_columns: list) -> dict:
+    writer = BinPartitionWriter(output_dir, partition_column, stats_columns)
+    writer.write(df)
+    return writer.close()
+
+
+def load_bin_index(bins_dir: str) -> dict:
+    with open(os.path.join(bins_dir, INDEX_FILE_NAME)) as file:
+        return json.load(file)
+
+
+def read_bin_partition(bins_dir: str, partition_value, columns: list = None, index: dict = None) -> pd.DataFrame:
+    """
+    rows of one partition, only the requested columns (the partition column included) are read
+    """
+    index = index or load_bin_index(bins_dir)
+    partition_column = index['partition_column']
+    entry = index['partitions'].get(str(partition_value))
+    file_columns = None if columns is None else [col for col in columns if col != partition_column]
+    if entry is None:
+        empty_columns = columns if columns is not None else [partition_column] + list(index['columns'])
+        return pd.DataFrame(columns=empty_columns)
+
+    tables = [pq.read_table(os.path.join(bins_dir, path), columns=file_columns) for path in entry['files']]
+    df = pa.concat_tables(tables).to_pandas()
+    if columns is None or partition_column in columns:
+        df.insert(0, partition_column, entry['value'])
+        if columns is not None:
+            df = df[columns]
+    return df
+
+
+def iter_bin_partitions(bins_dir: str, columns: list = None, partition_values: list = None):
+    """
+    yields (partition value, frame) for the requested partitions, all of them by default
+    """
+    index = load_bin_index(bins_dir)
+    keys = index['partitions'] if partition_values is None else [str(value) for value in partition_values]
+    for key in keys:
+        if key in index['partitions']:
+            yield index['partitions'][key]['value'], read_bin_partition(bins_dir, key, columns, index)
+
+
+def read_bins(bins_dir: str, columns: list = None, partition_values: list = None) -> pd.DataFrame:
+    frames = [df for _, df in iter_bin_partitions(bins_dir, columns, partition_values)]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,298 @@
+import os
+import sys
+import json
+import time
+import platform
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from src.entity.artifact import ProfilingArtifact
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+"""
+Memory helpers
+"""
+def get_current_rss_mb():
+    """
+    returns the resident set size of this process in MB, or None when it can not be read
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+
+    statm_path = '/proc/self/statm'
+    if os.path.exists(statm_path):
+        with open(statm_path) as file:
+            rss_pages = int(file.read().split()[1])
+        return rss_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+    return get_peak_rss_mb()
+
+
+def get_peak_rss_mb():
+    """
+    returns the high water mark of the resident set size of this process in MB
+    """
+    if resource is None:
+        if psutil is not None:
+            info = psutil.Process().memory_info()
+            return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    ## linux reports kilobytes, macOS reports bytes
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+"""
+Stage records
+"""
+class StageRecord:
+    def __init__(self, name, path, depth, rows_in=None):
+        self.name = name
+        self.path = path
+        self.depth = depth
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.wall_s = None
+        self.cpu_s = None
+        self.rss_start_mb = None
+        self.rss_end_mb = None
+        self.peak_rss_mb = None
+        self.error = None
+
+    def observe_rss(self, rss_mb):
+        if rss_mb is None:
+            return
+        if self.peak_rss_mb is None or rss_mb > self.peak_rss_mb:
+            self.peak_rss_mb = rss_mb
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'path': self.path,
+            'depth': self.depth,
+            'wall_s': self.wall_s,
+            'cpu_s': self.cpu_s,
+            'rss_start_mb': self.rss_start_mb,
+            'rss_end_mb': self.rss_end_mb,
+            'peak_rss_mb': self.peak_rss_mb,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'error': self.error,
+        }
+
+
+class _MemoryMonitor(threading.Thread):
+    """
+    polls the current rss while stages are open so every stage gets its own peak
+    """
+    def __init__(self, profiler, interval):
+        super().__init__(name='profiler-memory-monitor', daemon=True)
+        self.profiler = profiler
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.profiler._observe_rss(get_current_rss_mb())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+"""
+Sampling profiler
+"""
+class StackSampler(threading.Thread):
+    """
+    low overhead sampling profiler. every `interval` seconds it captures the stack of the
+    profiled thread and counts it, the output is written in the collapsed stack format that
+    flamegraph.pl and speedscope understand.
+    """
+    def __init__(self, interval = 0.01, target_thread_id = None):
+        super().__init__(name='profiler-stack-sampler', daemon=True)
+        self.interval = interval
+        self.target_thread_id = target_thread_id or threading.main_thread().ident
+        self.samples = Counter()
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def _collapse(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is not None:
+                self.samples[self._collapse(frame)] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write(self, filepath: str):
+        os.makedirs(os.path.dirname(filepath), exist_ok = True)
+        with open(filepath, 'w') as file:
+            for stack, count in self.samples.most_common():
+                file.write(f"{stack} {count}\n")
+
+
+"""
+Pipeline profiler
+"""
+class PipelineProfiler:
+    """
+    records wall time, cpu time, peak rss and rows in/out for every stage of a run and
+    writes them to a json report. stages can be nested, the record path joins the names
+    of the open stages with '/'.
+    """
+    def __init__(self, profiling_config):
+        self.profiling_config = profiling_config
+        self.records = []
+        self._open = []
+        self._lock = threading.Lock()
+        self._monitor = None
+        self._sampler = None
+        self.started_at = None
+        self._start_wall = None
+        self._start_cpu = None
+
+    def start(self):
+        self.started_at = datetime.now()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+        if self.profiling_config.memory_poll_interval:
+            self._monitor = _MemoryMonitor(self, self.profiling_config.memory_poll_interval)
+            self._monitor.start()
+
+        if self.profiling_config.sampling_interval:
+            self._sampler = StackSampler(self.profiling_config.sampling_interval)
+            self._sampler.start()
+
+        activate_profiler(self)
+        return self
+
+    def _observe_rss(self, rss_mb):
+        with self._lock:
+            for record in self._open:
+                record.observe_rss(rss_mb)
+
+    @contextmanager
+    def stage(self, name, rows_in = None):
+        with self._lock:
+            parent_path = self._open[-1].path if self._open else None
+            path = f"{parent_path}/{name}" if parent_path else name
+            record = StageRecord(name, path, len(self._open), rows_in)
+            self.records.append(record)
+            self._open.append(record)
+
+        record.rss_start_mb = get_current_rss_mb()
+        record.observe_rss(record.rss_start_mb)
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield record
+        except BaseException as e:
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record.wall_s = round(time.perf_counter() - start_wall, 6)
+            record.cpu_s = round(time.process_time() - start_cpu, 6)
+            record.rss_end_mb = get_current_rss_mb()
+            record.observe_rss(record.rss_end_mb)
+            with self._lock:
+                self._open.remove(record)
+
+    def stop(self):
+        if self._monitor is not None:
+            self._monitor.stop()
+        if self._sampler is not None:
+            self._sampler.stop()
+        deactivate_profiler(self)
+
+    def report(self):
+        return {
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'total_wall_s': round(time.perf_counter() - self._start_wall, 6) if self._start_wall else None,
+            'total_cpu_s': round(time.process_time() - self._start_cpu, 6) if self._start_cpu else None,
+            'process_peak_rss_mb': get_peak_rss_mb(),
+            'python_version': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'stages': [record.to_dict() for record in self.records],
+        }
+
+    def write_report(self):
+        """
+        stops the profiler and writes the json report (and the collapsed stacks when the
+        sampling profiler was enabled)
+        """
+        self.stop()
+        report = self.report()
+
+        os.makedirs(os.path.dirname(self.profiling_config.profile_file_path), exist_ok = True)
+        with open(self.profiling_config.profile_file_path, 'w') as file:
+            json.dump(report, file, indent = 2)
+
+        samples_file_path = None
+        if self._sampler is not None:
+            samples_file_path = self.profiling_config.samples_file_path
+            self._sampler.write(samples_file_path)
+
+        return ProfilingArtifact(self.profiling_config.profile_file_path, samples_file_path)
+
+
+"""
+Active profiler, components record their stages against it without having to pass it around
+"""
+_active_profiler = None
+
+
+def activate_profiler(profiler: PipelineProfiler):
+    global _active_profiler
+    _active_profiler = profiler
+
+
+def deactivate_profiler(profiler: PipelineProfiler = None):
+    global _active_profiler
+    if profiler is None or _active_profiler is profiler:
+        _active_profiler = None
+
+
+def get_active_profiler():
+    return _active_profiler
+
+
+@contextmanager
+def profile_stage(name: str, rows_in = None):
+    """
+    records a stage on the active profiler, when no profiler is active the record is
+    still yielded (so callers can set rows_out) but nothing is measured
+    """
+    profiler = _active_profiler
+    if profiler is None:
+        yield StageRecord(name, name, 0, rows_in)
+        return
+
+    with profiler.stage(name, rows_in) as record:
+        yield record
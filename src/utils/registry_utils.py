@@ -0,0 +1,158 @@
+import os
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from src.constants import (ARTIFACT_DIR_NAME, REGISTRY_FILE_NAME, REGISTRY_PROMOTED_FILE_NAME,
+                           REGISTRY_LOCK_FILE_NAME, REGISTRY_LOCK_TIMEOUT)
+
+
+"""
+Artifact registry
+
+registry.json in the artifacts directory lists every registered training run (metrics and
+artifact paths, paths under the artifacts directory stored relative to it), promoted.json
+points at the run serving has to use. Both are replaced atomically (write + os.replace), so
+a reader sees the old or the new file, never half of one. Writers serialize on a lock file.
+"""
+
+
+def write_json_atomic(path: str, payload):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as file:
+        json.dump(payload, file, indent=2, default=str)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_json(path: str, default=None):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return default
+
+
+class RegistryError(Exception):
+    pass
+
+
+class ArtifactRegistry:
+    def __init__(self, artifacts_dir: str = ARTIFACT_DIR_NAME):
+        self.artifacts_dir = os.path.abspath(artifacts_dir)
+        self.registry_path = os.path.join(self.artifacts_dir, REGISTRY_FILE_NAME)
+        self.promoted_path = os.path.join(self.artifacts_dir, REGISTRY_PROMOTED_FILE_NAME)
+        self.lock_path = os.path.join(self.artifacts_dir, REGISTRY_LOCK_FILE_NAME)
+
+    @contextmanager
+    def _locked(self, timeout: float = REGISTRY_LOCK_TIMEOUT):
+        """
+        exclusive lock file (O_EXCL works on every platform), a lock older than the timeout is
+        left over from a crashed writer and taken over
+        """
+        os.makedirs(self.artifacts_dir, exist_ok=True)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.lock_path) > timeout:
+                        os.remove(self.lock_path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.monotonic() > deadline:
+                    raise RegistryError(f"❌ Registry is locked ({self.lock_path})")
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            os.remove(self.lock_path)
+
+    def _relative(self, path: str) -> str:
+        path = os.path.abspath(path)
+        return os.path.relpath(path, self.artifacts_dir) if path.startswith(self.artifacts_dir + os.sep) else path
+
+    def _resolve(self, run: dict) -> dict:
+        run = dict(run)
+        run['artifact_dir'] = os.path.join(self.artifacts_dir, run['artifact_dir'])
+        run['paths'] = {name: os.path.join(self.artifacts_dir, path) for name, path in run['paths'].items()}
+        return run
+
+    def runs(self) -> list:
+        """
+        registered runs, oldest first
+        """
+        manifest = read_json(self.registry_path, {'runs': []})
+        return [self._resolve(run) for run in sorted(manifest['runs'], key=lambda run: run['created_at'])]
+
+    def get(self, run_id: str):
+        return next((run for run in self.runs() if run['run_id'] == run_id), None)
+
+    def register(self, result: dict, created_at: str = None, promote: bool = False) -> dict:
+        """
+        adds (or replaces) a run from the result of the training pipeline, optionally promoting it
+        """
+        run = {
+            'run_id': result['run_id'],
+            'created_at': created_at or result.get('created_at') or datetime.now().isoformat(),
+            'registered_at': datetime.now().isoformat(),
+            'artifact_dir': self._relative(result['artifact_dir']),
+            'metrics': result.get('metrics'),
+            'paths': {name: self._relative(path) for name, path in result['paths'].items()},
+        }
+        with self._locked():
+            manifest = read_json(self.registry_path, {'runs': []})
+            manifest['runs'] = [r for r in manifest['runs'] if r['run_id'] != run['run_id']] + [run]
+            write_json_atomic(self.registry_path, manifest)
+        print(f"🗃️ Registered run {run['run_id']}")
+        if promote:
+            self.promote(run['run_id'])
+        return self._resolve(run)
+
+    def promote(self, run_id: str) -> dict:
+        """
+        points serving at a registered run, returns the new pointer
+        """
+        with self._locked():
+            if not any(r['run_id'] == run_id for r in read_json(self.registry_path, {'runs': []})['runs']):
+                raise RegistryError(f"❌ Unknown run '{run_id}'")
+            previous = read_json(self.promoted_path, {})
+            pointer = {
+                'run_id': run_id,
+                'promoted_at': datetime.now().isoformat(),
+                'generation': previous.get('generation', 0) + 1,
+                'previous_run_id': previous.get('run_id'),
+            }
+            write_json_atomic(self.promoted_path, pointer)
+        print(f"🚀 Promoted run {run_id} (generation {pointer['generation']})")
+        return pointer
+
+    def pointer(self):
+        return read_json(self.promoted_path)
+
+    def pointer_version(self):
+        """
+        cheap change check for watchers (one stat call), None without a pointer
+        """
+        try:
+            stat = os.stat(self.promoted_path)
+            return stat.st_mtime_ns, stat.st_size, stat.st_ino
+        except FileNotFoundError:
+            return None
+
+    def promoted(self):
+        """
+        (pointer, run) of the promoted run, (None, None) when nothing is promoted
+        """
+        pointer = self.pointer()
+        if not pointer:
+            return None, None
+        run = self.get(pointer['run_id'])
+        if run is None:
+            raise RegistryError(f"❌ Promoted run '{pointer['run_id']}' is not registered")
+        return pointer, run
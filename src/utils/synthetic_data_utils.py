@@ -0,0 +1,160 @@
+import os
+import numpy as np
+import pandas as pd
+
+
+"""
+Synthetic M5 data
+
+Writes calendar.csv, sales_train_validation.csv and sell_prices.csv with the same columns as
+the m5-forecasting-accuracy files so the pipeline can run anywhere at any scale. The sales day
+columns always end at d_1913 like the real validation file, convert_dataframe reads
+d_1789..d_1913 so n_days must be at least 125 for the training pipeline.
+"""
+M5_LAST_DAY = 1913
+M5_FIRST_DATE = pd.Timestamp('2011-01-29')
+M5_CALENDAR_EXTRA_DAYS = 56
+M5_STORES = {
+    'CA': ['CA_1', 'CA_2', 'CA_3', 'CA_4'],
+    'TX': ['TX_1', 'TX_2', 'TX_3'],
+    'WI': ['WI_1', 'WI_2', 'WI_3'],
+}
+M5_DEPARTMENTS = {
+    'HOBBIES': ['HOBBIES_1', 'HOBBIES_2'],
+    'HOUSEHOLD': ['HOUSEHOLD_1', 'HOUSEHOLD_2'],
+    'FOODS': ['FOODS_1', 'FOODS_2', 'FOODS_3'],
+}
+M5_EVENTS = [
+    ('SuperBowl', 'Sporting'), ('ValentinesDay', 'Cultural'), ('PresidentsDay', 'National'),
+    ('LentStart', 'Religious'), ('StPatricksDay', 'Cultural'), ('Easter', 'Cultural'),
+    ('MemorialDay', 'National'), ('Ramadan starts', 'Religious'), ('IndependenceDay', 'National'),
+    ('LaborDay', 'National'), ('Halloween', 'Cultural'), ('Thanksgiving', 'National'),
+    ('Christmas', 'National'), ('NewYear', 'National'),
+]
+
+SALES_FILE_NAME = 'sales_train_validation.csv'
+CALENDAR_FILE_NAME = 'calendar.csv'
+PRICES_FILE_NAME = 'sell_prices.csv'
+
+
+def generate_calendar(n_days: int, rng: np.random.Generator, event_rate: float = 0.03) -> pd.DataFrame:
+    first_day = M5_LAST_DAY - n_days + 1
+    day_numbers = np.arange(first_day, M5_LAST_DAY + M5_CALENDAR_EXTRA_DAYS + 1)
+    dates = M5_FIRST_DATE + pd.to_timedelta(day_numbers - 1, unit='D')
+
+    ## walmart weeks start on saturday, encoded as 1 + yy + ww like 11101
+    week_index = (day_numbers - 1) // 7
+    wm_yr_wk = 11101 + (week_index // 52) * 100 + week_index % 52
+
+    n = len(day_numbers)
+    event_idx = np.where(rng.random(n) < event_rate, rng.integers(0, len(M5_EVENTS), n), -1)
+    second_event_idx = np.where(rng.random(n) < event_rate / 10, rng.integers(0, len(M5_EVENTS), n), -1)
+    event_names = np.array([name for name, _ in M5_EVENTS] + [None], dtype=object)
+    event_types = np.array([kind for _, kind in M5_EVENTS] + [None], dtype=object)
+
+    calendar = pd.DataFrame({
+        'date': dates.strftime('%Y-%m-%d'),
+        'wm_yr_wk': wm_yr_wk,
+        'weekday': dates.day_name(),
+        'wday': (dates.dayofweek + 2) % 7 + 1,
+        'month': dates.month,
+        'year': dates.year,
+        'd': [f'd_{x}' for x in day_numbers],
+        'event_name_1': event_names[event_idx],
+        'event_type_1': event_types[event_idx],
+        'event_name_2': event_names[second_event_idx],
+        'event_type_2': event_types[second_event_idx],
+    })
+
+    ## snap days are the first ten days of the month, staggered per state like the real data
+    for offset, state in enumerate(M5_STORES):
+        calendar[f'snap_{state}'] = ((dates.day + offset) % 15 < 10).astype('int64')
+
+    return calendar
+
+
+def generate_series_index(n_series: int) -> pd.DataFrame:
+    stores = [(state, store) for state, state_stores in M5_STORES.items() for store in state_stores]
+    departments = [(cat, dept) for cat, cat_depts in M5_DEPARTMENTS.items() for dept in cat_depts]
+
+    series = np.arange(n_series)
+    store_pos = series % len(stores)
+    item_pos = series // len(stores)
+    dept_pos = item_pos % len(departments)
+
+    cat_ids = np.array([cat for cat, _ in departments])[dept_pos]
+    dept_ids = np.array([dept for _, dept in departments])[dept_pos]
+    item_numbers = item_pos // len(departments) + 1
+    item_ids = pd.Series(dept_ids) + '_' + pd.Series(item_numbers).map('{:03d}'.format)
+    store_ids = np.array([store for _, store in stores])[store_pos]
+    state_ids = np.array([state for state, _ in stores])[store_pos]
+
+    return pd.DataFrame({
+        'id': item_ids + '_' + store_ids + '_validation',
+        'item_id': item_ids,
+        'dept_id': dept_ids,
+        'cat_id': cat_ids,
+        'store_id': store_ids,
+        'state_id': state_ids,
+    })
+
+
+def generate_sales(index_df: pd.DataFrame, n_days: int, zero_rate: float, rng: np.random.Generator) -> pd.DataFrame:
+    n_series = len(index_df)
+    ## per series demand level plus a weekly pattern
+    level = rng.gamma(shape=1.2, scale=1.5, size=(n_series, 1))
+    weekly = 1 + 0.25 * np.sin(2 * np.pi * np.arange(n_days) / 7)
+    demand = rng.poisson(level * weekly[np.newaxis, :]).astype('int64')
+    demand[rng.random((n_series, n_days)) < zero_rate] = 0
+
+    first_day = M5_LAST_DAY - n_days + 1
+    day_columns = [f'd_{x}' for x in range(first_day, M5_LAST_DAY + 1)]
+    return pd.concat([index_df, pd.DataFrame(demand, columns=day_columns)], axis=1)
+
+
+def generate_prices(index_df: pd.DataFrame, calendar: pd.DataFrame, rng: np.random.Generator) -> pd.DataFrame:
+    weeks = np.sort(calendar['wm_yr_wk'].unique())
+    items = index_df[['store_id', 'item_id']].drop_duplicates().reset_index(drop=True)
+
+    base_price = np.round(rng.uniform(0.5, 30.0, size=len(items)), 2)
+    ## occasional price changes, held for the rest of the weeks
+    changes = np.where(rng.random((len(items), len(weeks))) < 0.05,
+                       rng.uniform(-0.15, 0.15, size=(len(items), len(weeks))), 0.0)
+    prices = np.round(base_price[:, np.newaxis] * np.cumprod(1 + changes, axis=1), 2)
+
+    return pd.DataFrame({
+        'store_id': np.repeat(items['store_id'].values, len(weeks)),
+        'item_id': np.repeat(items['item_id'].values, len(weeks)),
+        'wm_yr_wk': np.tile(weeks, len(items)),
+        'sell_price': prices.ravel(),
+    })
+
+
+def generate_m5_dataset(output_dir: str, n_series: int = 1000, n_days: int = 400,
+                        zero_rate: float = 0.5, seed: int = 42) -> dict:
+    """
+    writes the three m5 csv files to output_dir and returns their paths keyed by
+    'calendar', 'sales' and 'prices'
+    """
+    if n_days > M5_LAST_DAY:
+        raise ValueError(f"n_days can not be more than {M5_LAST_DAY}")
+    if not 0 <= zero_rate < 1:
+        raise ValueError("zero_rate has to be in [0, 1)")
+
+    rng = np.random.default_rng(seed)
+    os.makedirs(output_dir, exist_ok=True)
+
+    calendar = generate_calendar(n_days, rng)
+    index_df = generate_series_index(n_series)
+    sales = generate_sales(index_df, n_days, zero_rate, rng)
+    prices = generate_prices(index_df, calendar, rng)
+
+    paths = {
+        'calendar': os.path.join(output_dir, CALENDAR_FILE_NAME),
+        'sales': os.path.join(output_dir, SALES_FILE_NAME),
+        'prices': os.path.join(output_dir, PRICES_FILE_NAME),
+    }
+    calendar.to_csv(paths['calendar'], index=False)
+    sales.to_csv(paths['sales'], index=False)
+    prices.to_csv(paths['prices'], index=False)
+    return paths
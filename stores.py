@@ -1,4 +1,5 @@
-from config.mongodb import sales_collection  # or your Mongo client setup
+from config.mongodb import get_collection, ROLLUPS_COLLECTION  # run from website/server (or with it on PYTHONPATH)
 
-store_ids = sales_collection.distinct("store_id")
+# store ids from the maintained rollups (utils/rollups.py) instead of a distinct over raw sales
+store_ids = [doc["key"] for doc in get_collection(ROLLUPS_COLLECTION).find({"level": "store"}, {"key": 1}).sort("key", 1)]
 print(store_ids)
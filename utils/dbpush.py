@@ -2,6 +2,8 @@ from dotenv import load_dotenv
 from pymongo import MongoClient
 from data_pusher import DataPusher  # ✅ Update path to your class file
 from src.constants import SALES_FILE_PATH, CALENDAR_FILE_PATH, PRICES_FILE_PATH
+from website.server.utils.rollups import RollupAccumulator
+from website.server.utils.watermark import advance_watermark
 import os
 
 load_dotenv()
@@ -20,10 +22,17 @@ print(f"📦 Final DataFrame loaded: {df.shape[0]} rows, {df.shape[1]} columns")
 # ✅ MongoDB Atlas connection
 client = MongoClient(os.getenv("MONGO_URI"))
 collection = client["aioverstock"]["sales_data"]
+# the server reads "today" from this document (website/server/utils/watermark.py)
+metadata_collection = client["aioverstock"]["metadata"]
+# store/dept/state/date totals the dashboard reads (website/server/utils/rollups.py)
+rollups_collection = client["aioverstock"]["sales_rollups"]
 
 # ✅ Push in chunks
 chunk_size = 10000
 for i in range(0, len(df), chunk_size):
     chunk = df.iloc[i:i + chunk_size].to_dict("records")
     collection.insert_many(chunk)
+    # $max: the watermark only moves forward, whatever order the chunks land in
+    advance_watermark(metadata_collection, df['date'].iloc[i:i + chunk_size].max().to_pydatetime())
+    RollupAccumulator().add_sales(chunk).increment(rollups_collection)
     print(f"✅ Inserted chunk {i // chunk_size + 1}")
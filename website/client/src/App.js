@@ -109,18 +109,41 @@ const handleTrainModel = async () => {
   setTrainingDone(false); // reset
 
   try {
+    // the server answers right away with a job id, progress comes as server-sent events
     const response = await fetch('http://localhost:5050/train-model', {
       method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({}),
     });
 
     const data = await response.json();
-    setTraining(false);
-
-    if (data.status === 'success') {
-      setTrainingDone(true);
-    } else {
+    if (!data.job_id) {
+      setTraining(false);
       console.error("Training failed:", data.error);
+      return;
     }
+
+    const events = new EventSource(`http://localhost:5050/train-model/${data.job_id}/events`);
+    events.addEventListener('stage', (e) => {
+      const stage = JSON.parse(e.data);
+      console.log(`🔧 ${stage.stage}: ${stage.status}`);
+    });
+    events.addEventListener('job', (e) => {
+      const job = JSON.parse(e.data);
+      events.close();
+      setTraining(false);
+      if (job.status === 'succeeded') {
+        console.log('📊 Training metrics:', job.metrics);
+        setTrainingDone(true);
+      } else {
+        console.error("Training failed:", job.error);
+      }
+    });
+    events.onerror = () => {
+      events.close();
+      setTraining(false);
+      console.error("Lost the training event stream");
+    };
   } catch (err) {
     setTraining(false);
     console.error("Training request failed:", err);
@@ -140,12 +163,27 @@ const handleRunPrediction = async () => {
 
     const runData = await runResponse.json();
     console.log('📊 Prediction response:', runData);
-
-    if (runData.status === 'success') {
-      console.log('✅ Prediction completed. Now fetching results from DB...');
-    } else {
+    if (!runData.job_id || runData.status === 'error') {
       console.error('❌ Prediction error:', runData.error);
       alert('❌ Prediction failed: ' + runData.error);
+      return;
+    }
+
+    // the scoring job runs in the background, poll it until it finishes
+    let job = runData.job;
+    while (job.status === 'running') {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      const statusResponse = await fetch(`http://localhost:5050/run-prediction/${runData.job_id}`);
+      const statusData = await statusResponse.json();
+      if (!statusData.job) throw new Error(statusData.error);
+      job = statusData.job;
+    }
+
+    if (job.status === 'succeeded') {
+      console.log('✅ Prediction completed. Now fetching results from DB...', job.result);
+    } else {
+      console.error('❌ Prediction error:', job.error);
+      alert('❌ Prediction failed: ' + job.error);
     }
   } catch (error) {
     console.error('💥 Network error:', error);
@@ -5,7 +5,7 @@ const InteractiveSalesDashboard = () => {
   const [data, setData] = useState([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState("");
-  const [skip, setSkip] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
   const [darkMode, setDarkMode] = useState(true);
   
   // Filter and search states
@@ -25,16 +25,20 @@ const InteractiveSalesDashboard = () => {
     setLoading(true);
     setError("");
     
-    const currentSkip = reset ? 0 : skip;
+    if (!reset && !nextCursor) {
+      setLoading(false);
+      return;
+    }
+    const cursorParam = reset ? '' : `?cursor=${encodeURIComponent(nextCursor)}`;
     
     try {
-      const res = await fetch(`http://localhost:5050/fetch-table-data?skip=${currentSkip}`);
+      const res = await fetch(`http://localhost:5050/fetch-table-data${cursorParam}`);
       const json = await res.json();
       
       if (json.status === 'success') {
         const newData = reset ? json.data : [...data, ...json.data];
         setData(newData);
-        setSkip(currentSkip + 50);
+        setNextCursor(json.next_cursor);
       } else {
         setError(json.error || "Unknown error");
       }
@@ -302,9 +306,9 @@ const InteractiveSalesDashboard = () => {
                 <button
                   onClick={() => fetchTableData(false)}
                   className={`flex items-center gap-2 px-4 py-2 text-sm ${themeClasses.button} text-white rounded-lg transition-all duration-300 ${
-                    loading ? 'opacity-70 cursor-not-allowed' : ''
+                    loading || !nextCursor ? 'opacity-70 cursor-not-allowed' : ''
                   }`}
-                  disabled={loading}
+                  disabled={loading || !nextCursor}
                 >
                   {loading ? (
                     <>
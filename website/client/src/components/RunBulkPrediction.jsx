@@ -453,7 +453,7 @@ const PredictionDashboard = ({ data }) => {
 const RunPredictionSection = ({ setPredictionData, appendPredictionData }) => {
   const [isRunning, setIsRunning] = useState(false);
   const [lastRunTime, setLastRunTime] = useState(null);
-  const [skip, setSkip] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
 
   const handleRunPrediction = async () => {
     setIsRunning(true);
@@ -479,8 +479,12 @@ const RunPredictionSection = ({ setPredictionData, appendPredictionData }) => {
 
   const handleFetchResults = async (reset = false) => {
     try {
-      const currentSkip = reset ? 0 : skip;
-      const res = await fetch(`http://localhost:5050/fetch-results?skip=${currentSkip}`);
+      if (!reset && !nextCursor) {
+        alert("📭 No more data to fetch.");
+        return;
+      }
+      const cursorParam = reset ? '' : `?cursor=${encodeURIComponent(nextCursor)}`;
+      const res = await fetch(`http://localhost:5050/fetch-results${cursorParam}`);
       const json = await res.json();
 
       if (json.status === 'success') {
@@ -489,7 +493,7 @@ const RunPredictionSection = ({ setPredictionData, appendPredictionData }) => {
         } else {
           appendPredictionData(json.data);
         }
-        setSkip(currentSkip + 1000);
+        setNextCursor(json.next_cursor);
         if (json.data.length === 0 && !reset) {
           alert("📭 No more data to fetch.");
         }
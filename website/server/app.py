@@ -5,7 +5,13 @@ from routes.run_predict import run_prediction_bp
 from routes.fetch_table_data import fetch_data_bp
 from routes.train_model import train_model_bp
 from routes.fetch_results import fetch_results_bp
+from routes.models import models_bp
+from routes.cache import cache_bp
+from routes.rollups import rollups_bp
+from routes.health import health_bp
+from utils.metrics import init_app as init_metrics
 from dotenv import load_dotenv
+import os
 
 load_dotenv()
 
@@ -19,6 +25,19 @@ app.register_blueprint(run_prediction_bp)
 app.register_blueprint(fetch_data_bp)
 app.register_blueprint(train_model_bp)
 app.register_blueprint(fetch_results_bp)
+app.register_blueprint(models_bp)
+app.register_blueprint(cache_bp)
+app.register_blueprint(rollups_bp)
+app.register_blueprint(health_bp)
+# request latency/status metrics and GET /metrics (utils.metrics)
+init_metrics(app)
 if __name__ == '__main__':
+   # indexes are created at startup (MONGODB_ENSURE_INDEXES=0 skips it), MONGODB_CHECK_INDEXES=1
+   # also refuses to start when a hot query would scan a whole collection
+   if os.getenv("MONGODB_ENSURE_INDEXES", "1") == "1":
+      from config.indexes import ensure_indexes, check_query_plans
+      ensure_indexes()
+      if os.getenv("MONGODB_CHECK_INDEXES") == "1":
+         check_query_plans()
    app.run(debug=True, port=5050)
 
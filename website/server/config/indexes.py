@@ -0,0 +1,153 @@
+import sys
+import argparse
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from config.mongodb import get_db, SALES_COLLECTION, PREDICTED_SALES_COLLECTION, ROLLUPS_COLLECTION
+from utils.pagination import SORT, keyset_filter, encode_cursor
+
+"""
+Index bootstrap
+
+Declares the indexes the hot queries of the server need, creates the missing ones (an
+existing index with the same keys counts, whatever its name) and checks with explain() that
+every hot query is answered from an index.
+
+usage (from website/server):
+    python -m config.indexes            create the missing indexes
+    python -m config.indexes --check    create them, then fail when a hot query does a COLLSCAN
+    python -m config.indexes --check-only
+"""
+INDEXES = {
+    SALES_COLLECTION: [
+        # compute_features_from_mongo: item_id + store_id equality, date range
+        IndexModel([("item_id", ASCENDING), ("store_id", ASCENDING), ("date", ASCENDING)], name="item_store_date"),
+        # submit_input: latest date
+        IndexModel([("date", DESCENDING)], name="date_desc"),
+        # fetch-table-data keyset pages use the _id index
+    ],
+    PREDICTED_SALES_COLLECTION: [
+        # fetch-results keyset pages use the _id index
+    ],
+    ROLLUPS_COLLECTION: [
+        # rollups / stores: one level in key order
+        IndexModel([("level", ASCENDING), ("key", ASCENDING)], name="level_key"),
+    ],
+}
+
+
+class IndexCheckError(Exception):
+    pass
+
+
+def ensure_indexes(db=None, indexes: dict = INDEXES) -> list:
+    """
+    creates the declared indexes that do not exist yet, returns their names
+    """
+    db = db if db is not None else get_db()
+    created = []
+    for collection_name, models in indexes.items():
+        collection = db[collection_name]
+        existing = {tuple(info['key']) for info in collection.index_information().values()}
+        missing = [model for model in models if tuple(model.document['key'].items()) not in existing]
+        if missing:
+            created += collection.create_indexes(missing)
+    for name in created:
+        print(f"🗂️ Created index {name}")
+    return created
+
+
+def hot_queries(db):
+    """
+    (name, explain output) of every hot query of the server
+    """
+    sales = db[SALES_COLLECTION]
+    predicted = db[PREDICTED_SALES_COLLECTION]
+    now = datetime.now()
+    sample = sales.find_one({}, {"item_id": 1, "store_id": 1}) or {}
+    token = encode_cursor(sample) if "_id" in sample else None
+
+    # imported here, pandas is not needed to create the indexes
+    from utils.feature import feature_filter, batch_feature_filter, feature_pipeline
+    item_id, store_id = sample.get("item_id", ""), sample.get("store_id", "")
+    yield "features", sales.find(feature_filter(item_id, store_id, now)).explain()
+    # /submit-inputs: one $or branch per store
+    pairs = [(item_id, store_id), (item_id, store_id + "_check")]
+    yield "features_batch", sales.find(batch_feature_filter(pairs, now)).explain()
+    # FEATURE_MODE=aggregate: the $match of the pipeline ($densify needs MongoDB 5.1+)
+    try:
+        explain = db.command("aggregate", SALES_COLLECTION, explain=True,
+                             pipeline=feature_pipeline(item_id, store_id, now))
+    except OperationFailure as e:
+        print(f"⚠️ features_pipeline not checked, the server can not run it: {e}")
+    else:
+        yield "features_pipeline", explain
+    yield "latest_date", sales.find({}).sort("date", -1).limit(1).explain()
+    yield "fetch_table_data", sales.find(keyset_filter(token)).sort(SORT).limit(1001).explain()
+    yield "fetch_results", predicted.find(keyset_filter(token)).sort(SORT).limit(1001).explain()
+    yield "rollups", db[ROLLUPS_COLLECTION].find({"level": "store"}).sort("key", 1).explain()
+
+
+def plan_stages(plan) -> list:
+    """
+    every stage name in an explain plan tree
+    """
+    stages = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for value in plan.values():
+            stages += plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            stages += plan_stages(value)
+    return stages
+
+
+def winning_plan_stages(explain: dict) -> list:
+    """
+    stages of a find explain, or of an aggregate explain (where the query part sits in the
+    $cursor of the first stage unless the whole pipeline was pushed down)
+    """
+    if 'queryPlanner' not in explain and 'stages' in explain:
+        cursor = next((stage['$cursor'] for stage in explain['stages'] if '$cursor' in stage), {})
+        return winning_plan_stages(cursor)
+    planner = explain.get('queryPlanner', explain)
+    return plan_stages(planner.get('winningPlan', {}))
+
+
+def check_query_plans(db=None) -> dict:
+    """
+    winning plan stages per hot query, raises IndexCheckError when any of them scans the
+    whole collection
+    """
+    db = db if db is not None else get_db()
+    plans = {name: winning_plan_stages(explain) for name, explain in hot_queries(db)}
+    scans = [name for name, stages in plans.items() if 'COLLSCAN' in stages]
+    for name, stages in plans.items():
+        print(f"{'❌' if name in scans else '✅'} {name}: {' <- '.join(stages)}")
+    if scans:
+        raise IndexCheckError(f"❌ COLLSCAN in the winning plan of: {', '.join(scans)}")
+    return plans
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create and check the MongoDB indexes of the server")
+    parser.add_argument('--check', action='store_true', help="check the query plans after creating the indexes")
+    parser.add_argument('--check-only', action='store_true', help="only check the query plans")
+    args = parser.parse_args(argv)
+
+    if not args.check_only:
+        created = ensure_indexes()
+        print(f"🗂️ Indexes up to date ({len(created)} created)")
+    if args.check or args.check_only:
+        try:
+            check_query_plans()
+        except IndexCheckError as e:
+            print(e)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
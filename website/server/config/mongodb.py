@@ -1,33 +1,120 @@
 import os
+import time
+import threading
+import pymongo
 from dotenv import load_dotenv
 from pymongo import MongoClient
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+from utils.metrics import mongo_command_metrics
 
 # ✅ Load environment variables
 load_dotenv()
 
-# ✅ Get the MongoDB URI from .env
+# ✅ Get the MongoDB URI from .env (checked when the client is created, importing this module does no I/O)
 mongo_uri = os.getenv("MONGODB_URI")
 
-if not mongo_uri:
-    raise Exception("❌ MONGODB_URI not found in .env file!")
-
-print(f"📡 Connecting to MongoDB at: {mongo_uri}")
-
-# ✅ Create the client
-client = MongoClient(mongo_uri)
-
-# ✅ Select database and collection
-db = client["aioverstock"]
-sales_collection = db["sales_data"]
-
-# ✅ Try a sample query to verify
-try:
-    print("🔍 Checking connection and sample data...")
-    doc = sales_collection.find_one()
-    if doc:
-        print("✅ Connection successful! Sample document:")
-        print(doc)
-    else:
-        print("⚠️ Connected, but no documents in sales_data collection.")
-except Exception as e:
-    print(f"❌ Connection failed: {e}")
+DATABASE_NAME = os.getenv("MONGODB_DATABASE", "aioverstock")
+SALES_COLLECTION = "sales_data"
+PREDICTED_SALES_COLLECTION = "predicted_sales"
+USER_INPUTS_COLLECTION = "user_inputs"
+METADATA_COLLECTION = "metadata"
+ROLLUPS_COLLECTION = "sales_rollups"
+
+READ_PREFERENCE_MODES = {
+    'primary': Primary,
+    'primaryPreferred': PrimaryPreferred,
+    'secondary': Secondary,
+    'secondaryPreferred': SecondaryPreferred,
+    'nearest': Nearest,
+}
+
+# read preference per route, MONGODB_READ_PREFERENCE_<ROUTE> (e.g. MONGODB_READ_PREFERENCE_FETCH_RESULTS)
+# overrides it. the dashboard tables can be served by secondaries, the submit flow reads its own writes.
+ROUTE_READ_PREFERENCES = {
+    'fetch_table_data': 'secondaryPreferred',
+    'fetch_results': 'secondaryPreferred',
+    'get_inputs': 'secondaryPreferred',
+    'rollups': 'secondaryPreferred',
+    'submit_input': 'primary',
+    'features': 'primary',
+}
+
+
+def client_options():
+    """
+    pool size and timeouts of the shared client, all tunable from the environment
+    """
+    return {
+        'maxPoolSize': int(os.getenv("MONGODB_MAX_POOL_SIZE", 50)),
+        'minPoolSize': int(os.getenv("MONGODB_MIN_POOL_SIZE", 0)),
+        'maxIdleTimeMS': int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", 300000)),
+        'waitQueueTimeoutMS': int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", 5000)),
+        'connectTimeoutMS': int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", 5000)),
+        'serverSelectionTimeoutMS': int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 5000)),
+        'socketTimeoutMS': int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", 30000)),
+        'retryReads': True,
+        'retryWrites': True,
+        'appname': os.getenv("MONGODB_APP_NAME", "overstock-server"),
+        # command latency per collection for /metrics
+        'event_listeners': [mongo_command_metrics],
+    }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> MongoClient:
+    """
+    the application scoped client, created on first use. MongoClient is thread safe and
+    keeps its own connection pool, every blueprint and controller shares this one.
+    it connects in the background, a server that is down only fails the requests that need it.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if not mongo_uri:
+                    raise Exception("❌ MONGODB_URI not found in .env file!")
+                print(f"📡 Connecting to MongoDB at: {mongo_uri}")
+                _client = MongoClient(mongo_uri, **client_options())
+    return _client
+
+
+def close_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def get_read_preference(route: str = None):
+    if route is None:
+        return None
+    mode = os.getenv(f"MONGODB_READ_PREFERENCE_{route.upper()}", ROUTE_READ_PREFERENCES.get(route, 'primary'))
+    if mode not in READ_PREFERENCE_MODES:
+        raise ValueError(f"❌ Unknown read preference '{mode}' for route '{route}'")
+    return READ_PREFERENCE_MODES[mode]()
+
+
+def get_db(route: str = None):
+    return get_client().get_database(DATABASE_NAME, read_preference=get_read_preference(route))
+
+
+def get_collection(name: str, route: str = None):
+    """
+    collection on the shared client with the read preference of route
+    """
+    return get_db(route)[name]
+
+
+
+def ping(timeout_seconds: float = 2) -> float:
+    """
+    round trip of a ping in ms on the shared client, raises when the server does not answer in time
+    """
+    started = time.perf_counter()
+    with pymongo.timeout(timeout_seconds):
+        get_client().admin.command("ping")
+    return (time.perf_counter() - started) * 1000
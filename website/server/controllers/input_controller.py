@@ -1,10 +1,35 @@
-from config.mongodb import db
+from pymongo.errors import BulkWriteError
+from config.mongodb import get_collection, SALES_COLLECTION, USER_INPUTS_COLLECTION, ROLLUPS_COLLECTION
+from utils.result_cache import result_cache
+from utils.rollups import apply_sales
 
 def store_input(data):
-    inputs_collection = db["sales_data"]
+    inputs_collection = get_collection(SALES_COLLECTION)
     result = inputs_collection.insert_one(data)
+    apply_sales(get_collection(ROLLUPS_COLLECTION), [data])
+    result_cache.invalidate()
     return str(result.inserted_id)
 
+def store_inputs(docs):
+    """
+    one unordered insert_many, a failing document does not stop the others.
+    returns ({position: inserted id}, {position: error message})
+    """
+    if not docs:
+        return {}, {}
+    inputs_collection = get_collection(SALES_COLLECTION)
+    errors = {}
+    try:
+        inputs_collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        errors = {error['index']: error.get('errmsg', 'write failed') for error in e.details.get('writeErrors', [])}
+    finally:
+        result_cache.invalidate()
+    # insert_many sets the _id of every document before sending them
+    inserted_ids = {i: str(doc['_id']) for i, doc in enumerate(docs) if i not in errors}
+    apply_sales(get_collection(ROLLUPS_COLLECTION), [docs[i] for i in inserted_ids])
+    return inserted_ids, errors
+
 def get_all_inputs():
-    inputs_collection = db["user_inputs"]
+    inputs_collection = get_collection(USER_INPUTS_COLLECTION, route="get_inputs")
     return list(inputs_collection.find({}, {"_id": 0}))
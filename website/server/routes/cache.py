@@ -0,0 +1,19 @@
+from flask import Blueprint, jsonify
+from utils.result_cache import result_cache
+
+cache_bp = Blueprint('cache_bp', __name__)
+
+@cache_bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """
+    hit/miss counters and size of the dashboard result cache
+    """
+    return jsonify({"status": "success", "cache": result_cache.stats()})
+
+@cache_bp.route('/cache/invalidate', methods=['POST'])
+def cache_invalidate():
+    """
+    drops every cached result, for writes this process does not see (dbpush, other workers)
+    """
+    result_cache.invalidate()
+    return jsonify({"status": "success", "cache": result_cache.stats()})
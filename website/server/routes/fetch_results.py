@@ -1,26 +1,16 @@
 from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
-from dotenv import load_dotenv
-import os
-from flask import Response
-import numpy as np
-from bson.json_util import dumps
-import math
-
-load_dotenv()
+from config.mongodb import get_collection, PREDICTED_SALES_COLLECTION
+from utils.pagination import PageStream, parse_page_size, InvalidCursor
+from utils.serialization import page_response, negotiate_format, accepts_gzip
+from utils.result_cache import cached_response
 
 fetch_results_bp = Blueprint('fetch_results_bp', __name__)
 
 @fetch_results_bp.route('/fetch-results', methods=['GET'])
+@cached_response
 def fetch_results():
     try:
-        mongo_uri = os.getenv("MONGODB_URI")
-        client = MongoClient(mongo_uri)
-        db = client["aioverstock"]
-        collection = db["predicted_sales"]
-
-        # Get skip value from query params
-        skip = int(request.args.get("skip", 0))
+        collection = get_collection(PREDICTED_SALES_COLLECTION, route="fetch_results")
 
         # Fields to include in the response
         projection = {
@@ -31,23 +21,21 @@ def fetch_results():
             "sales_28_sum": 1,
             "predicted_sales": 1,
             "sell_price": 1,
-            "price_pct_change": 1
+            "price_pct_change": 1,
+            "created_at": 1
         }
 
-        data_cursor = collection.find({}, projection).sort("created_at", -1).skip(skip).limit(1000)
-        data = []
-
-        def clean(doc):
-            doc["_id"] = str(doc["_id"])
-            for k, v in doc.items():
-                if isinstance(v, float) and (np.isnan(v) or np.isinf(v)):
-                    doc[k] = None
-            return doc
-
-        for doc in data_cursor:
-            data.append(clean(doc))
+        # ?cursor= continues after the previous page, ?limit= page size,
+        # ?format=json|ndjson|columnar (or the Accept header) response encoding
+        try:
+            page_size = parse_page_size(request.args.get("limit"))
+            fmt = negotiate_format(request)
+            page = PageStream(collection, request.args.get("cursor"), page_size, projection)
+        except (InvalidCursor, ValueError) as e:
+            return jsonify({"status": "error", "error": str(e)}), 400
 
-        return jsonify({"status": "success", "data": data})
+        # streamed in chunks, NaN/Inf become null and ObjectIds/datetimes strings (utils.serialization)
+        return page_response(page, fmt, accepts_gzip(request))
 
     except Exception as e:
-        return jsonify({"status": "error", "error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"status": "error", "error": str(e)}), 500
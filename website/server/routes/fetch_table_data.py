@@ -1,38 +1,29 @@
 from flask import Blueprint, jsonify, request
-from pymongo import MongoClient
-from dotenv import load_dotenv
-import os
-import numpy as np
-
-load_dotenv()
+from config.mongodb import get_collection, SALES_COLLECTION
+from utils.pagination import PageStream, parse_page_size, parse_fields, InvalidCursor
+from utils.serialization import page_response, negotiate_format, accepts_gzip
+from utils.result_cache import cached_response
 
 fetch_data_bp = Blueprint('fetch_data_bp', __name__)
 
 @fetch_data_bp.route('/fetch-table-data', methods=['GET'])
+@cached_response
 def fetch_table_data():
     try:
-        mongo_uri = os.getenv("MONGODB_URI")
-        client = MongoClient(mongo_uri)
-        db = client["aioverstock"]
-        collection = db["sales_data"]
-
-        # Get skip value from query params
-        skip = int(request.args.get("skip", 0))
-
-        data_cursor = collection.find().sort("created_at", -1).skip(skip).limit(1000)
-        data = []
-
-        def clean(doc):
-            doc["_id"] = str(doc["_id"])
-            for k, v in doc.items():
-                if isinstance(v, float) and (np.isnan(v) or np.isinf(v)):
-                    doc[k] = None
-            return doc
-
-        for doc in data_cursor:
-            data.append(clean(doc))
-
-        return jsonify({"status": "success", "data": data})
+        collection = get_collection(SALES_COLLECTION, route="fetch_table_data")
+
+        # ?cursor= continues after the previous page, ?limit= page size, ?fields=a,b only those fields,
+        # ?format=json|ndjson|columnar (or the Accept header) response encoding
+        try:
+            page_size = parse_page_size(request.args.get("limit"))
+            projection = parse_fields(request.args.get("fields"))
+            fmt = negotiate_format(request)
+            page = PageStream(collection, request.args.get("cursor"), page_size, projection)
+        except (InvalidCursor, ValueError) as e:
+            return jsonify({"status": "error", "error": str(e)}), 400
+
+        # streamed in chunks, NaN/Inf become null and ObjectIds/datetimes strings (utils.serialization)
+        return page_response(page, fmt, accepts_gzip(request))
 
     except Exception as e:
         return jsonify({"status": "error", "error": str(e)}), 500
@@ -0,0 +1,39 @@
+import os
+import sys
+import time
+from flask import Blueprint, jsonify
+from config.mongodb import ping
+
+health_bp = Blueprint('health_bp', __name__)
+
+STARTED_AT = time.time()
+READY_DB_TIMEOUT_SECONDS = float(os.getenv("READY_DB_TIMEOUT_SECONDS", 2))
+
+@health_bp.route('/health', methods=['GET'])
+def health():
+    """
+    liveness: the process answers, no I/O
+    """
+    return jsonify({"status": "ok", "uptime_seconds": round(time.time() - STARTED_AT, 1)})
+
+def model_state() -> dict:
+    """
+    whether the scoring model is loaded in this worker and which run it serves. nothing is
+    imported or loaded here, a worker that never scored reports loaded: false
+    """
+    scoring = sys.modules.get("utils.scoring")
+    run_id = scoring.scoring_model.run_id if scoring is not None else None
+    return {"loaded": run_id is not None, "run_id": run_id}
+
+@health_bp.route('/ready', methods=['GET'])
+def ready():
+    """
+    readiness: 200 when MongoDB answers a ping within READY_DB_TIMEOUT_SECONDS, 503 otherwise.
+    the model state is reported, it does not gate readiness (it loads on the first prediction)
+    """
+    try:
+        database = {"ok": True, "ping_ms": round(ping(READY_DB_TIMEOUT_SECONDS), 1)}
+    except Exception as e:
+        database = {"ok": False, "error": str(e)}
+    body = {"status": "ready" if database["ok"] else "unavailable", "database": database, "model": model_state()}
+    return jsonify(body), 200 if database["ok"] else 503
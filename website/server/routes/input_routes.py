@@ -1,11 +1,7 @@
 from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
-from datetime import datetime, timedelta
-from controllers.input_controller import store_input, get_all_inputs
-from datetime import datetime
-import math
-from config.mongodb import db,sales_collection
-from utils.feature import compute_features_from_mongo  
+from controllers.input_controller import store_input, store_inputs, get_all_inputs
+import os
+from utils.watermark import sales_watermark
 input_bp = Blueprint('input_bp', __name__)
 
 def get_week_of_month(date):
@@ -25,34 +21,35 @@ def derive_state_id(store_id):
     return store_id.split('_')[0]  # "TX_3" → "TX"
 
 
-@input_bp.route('/submit-input', methods=['POST'])
-def submit_input():
-    data = request.json
-    if not data:
-        return jsonify({'error': 'No data provided'}), 400
-
-    required_fields = ['item_id', 'store_id', 'snap', 'sell_price',
-                       'event_name_1', 'event_type_1', 'event_name_2', 'event_type_2']
+REQUIRED_FIELDS = ['item_id', 'store_id', 'snap', 'sell_price',
+                   'event_name_1', 'event_type_1', 'event_name_2', 'event_type_2']
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", 5000))
 
-    for field in required_fields:
+def missing_field(data):
+    for field in REQUIRED_FIELDS:
         if field not in data:
-            return jsonify({'error': f'Missing field: {field}'}), 400
-
+            return field
+    return None
 
-    # 1. Get latest date from sales_data
-    latest_doc = sales_collection.find_one(sort=[("date", -1)])
-    if not latest_doc or "date" not in latest_doc:
-     raise Exception("No sales data with valid date found.")
+def invalid_field(data):
+    """
+    error message for the first field of a row with the wrong type, None when the row can be
+    structured. the ids key the grouped feature query so they have to be strings
+    """
+    for field in ['item_id', 'store_id', 'snap']:
+        if not isinstance(data[field], str):
+            return f'Invalid field: {field} must be a string'
+    price = data['sell_price']
+    if isinstance(price, bool) or not isinstance(price, (int, float, str)):
+        return 'Invalid field: sell_price must be a number'
+    try:
+        float(price)
+    except ValueError:
+        return 'Invalid field: sell_price must be a number'
+    return None
 
-    # 2. Parse and increment the date
-    latest_date_str = latest_doc["date"]  # e.g., '2024-03-28'
-    latest_date = (
-      datetime.strptime(latest_date_str, "%Y-%m-%d") if isinstance(latest_date_str, str) else latest_date_str
-    )
-    now= latest_date + timedelta(days=1)
- 
-    features = compute_features_from_mongo(data['item_id'], data['store_id'], now)
-    structured_data = {
+def structure_input(data, now, features):
+    return {
     "item_id": data['item_id'],
     "dept_id": derive_department_id(data['item_id']),   # renamed
     "store_id": data['store_id'],
@@ -75,9 +72,83 @@ def submit_input():
     }
 
 
+@input_bp.route('/submit-input', methods=['POST'])
+def submit_input():
+    data = request.json
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+
+    field = missing_field(data)
+    if field:
+        return jsonify({'error': f'Missing field: {field}'}), 400
+    error = invalid_field(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    # day after the latest sales date, from the cached watermark
+    now = sales_watermark.next_date()
+ 
+    from utils.feature import compute_features_from_mongo  # pandas, imported on first use
+    features = compute_features_from_mongo(data['item_id'], data['store_id'], now)
+    structured_data = structure_input(data, now, features)
+
     inserted_id = store_input(structured_data)
     return jsonify({'message': 'Stored', 'id': str(inserted_id)}), 200
 
+@input_bp.route('/submit-inputs', methods=['POST'])
+def submit_inputs():
+    """
+    batch intake: a json array of /submit-input bodies (or {"inputs": [...]}). one latest
+    date lookup, one grouped feature query and one unordered insert_many for the whole batch,
+    every row gets its own status in the response (in request order).
+    """
+    data = request.json
+    if isinstance(data, dict):
+        data = data.get('inputs')
+    if not isinstance(data, list) or not data:
+        return jsonify({'error': 'Expected a non empty array of inputs'}), 400
+    if len(data) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'At most {MAX_BATCH_SIZE} inputs per batch'}), 413
+
+    results = [None] * len(data)
+    valid = []
+    for index, row in enumerate(data):
+        field = missing_field(row) if isinstance(row, dict) else 'input'
+        error = f'Missing field: {field}' if field else invalid_field(row)
+        if error:
+            results[index] = {'index': index, 'status': 'error', 'error': error}
+        else:
+            valid.append(index)
+
+    # day after the latest sales date, from the cached watermark
+    now = sales_watermark.next_date()
+    from utils.feature import compute_features_batch_from_mongo
+    features = compute_features_batch_from_mongo([(data[i]['item_id'], data[i]['store_id']) for i in valid], now)
+
+    docs, doc_rows = [], []
+    for index in valid:
+        row = data[index]
+        try:
+            docs.append(structure_input(row, now, features[(row['item_id'], row['store_id'])]))
+            doc_rows.append(index)
+        except (TypeError, ValueError, AttributeError) as e:
+            results[index] = {'index': index, 'status': 'error', 'error': f'Invalid input: {e}'}
+
+    inserted_ids, errors = store_inputs(docs)
+    for position, index in enumerate(doc_rows):
+        if position in errors:
+            results[index] = {'index': index, 'status': 'error', 'error': errors[position]}
+        else:
+            results[index] = {'index': index, 'status': 'stored', 'id': inserted_ids[position]}
+
+    stored = sum(result['status'] == 'stored' for result in results)
+    return jsonify({
+        'message': f'Stored {stored} of {len(results)} inputs',
+        'stored': stored,
+        'failed': len(results) - stored,
+        'results': results,
+    }), 200
+
 @input_bp.route('/get-inputs', methods=['GET'])
 def fetch_inputs():
     inputs = get_all_inputs()
@@ -0,0 +1,45 @@
+from flask import Blueprint, jsonify
+
+# utils.scoring (numpy, pandas, joblib) is imported by the handlers, not when the worker starts
+
+models_bp = Blueprint('models_bp', __name__)
+
+@models_bp.route('/models', methods=['GET'])
+def list_models():
+    """
+    registered training runs (newest first) with the promoted pointer
+    """
+    from utils.scoring import scoring_model
+    registry = scoring_model.registry
+    return jsonify({"status": "success", "promoted": registry.pointer(), "serving": scoring_model.run_id,
+                    "runs": registry.runs()[::-1]})
+
+@models_bp.route('/models/current', methods=['GET'])
+def current_model():
+    from utils.scoring import scoring_model
+    from src.utils.registry_utils import RegistryError
+    registry = scoring_model.registry
+    try:
+        pointer, run = registry.promoted()
+    except RegistryError as e:
+        return jsonify({"status": "error", "error": str(e)}), 500
+    return jsonify({"status": "success", "promoted": pointer, "run": run, "serving": scoring_model.run_id})
+
+@models_bp.route('/models/<run_id>/promote', methods=['POST'])
+def promote_model(run_id):
+    """
+    points serving at a registered run once it loaded. this process swaps right away, other
+    workers pick the pointer up within MODEL_WATCH_SECONDS. a run that can not be loaded is not
+    promoted and the pointer stays where it was
+    """
+    from utils.scoring import scoring_model
+    from src.utils.registry_utils import RegistryError
+    try:
+        pointer = scoring_model.promote(run_id)
+    except RegistryError as e:
+        return jsonify({"status": "error", "error": str(e)}), 404
+    except Exception as e:
+        print(f"❗ Exception: {e}")
+        return jsonify({"status": "error", "error": f"Run could not be loaded, not promoted: {e}",
+                        "promoted": scoring_model.registry.pointer(), "serving": scoring_model.run_id}), 500
+    return jsonify({"status": "success", "promoted": pointer, "serving": scoring_model.run_id})
@@ -0,0 +1,45 @@
+from flask import Blueprint, jsonify, request
+from config.mongodb import get_collection, ROLLUPS_COLLECTION
+from utils.rollups import read_rollups, summarize, LEVELS
+from utils.result_cache import cached_response
+
+rollups_bp = Blueprint('rollups_bp', __name__)
+
+@rollups_bp.route('/rollups/<level>', methods=['GET'])
+@cached_response
+def rollups(level):
+    """
+    totals of every store, dept, state or date from the maintained rollups,
+    ?from=&to= bound the keys (dates for the date level), ?limit= caps the count
+    """
+    try:
+        limit = int(request.args.get("limit", 0))
+        data = read_rollups(get_collection(ROLLUPS_COLLECTION, route="rollups"), level,
+                            request.args.get("from"), request.args.get("to"), limit)
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "error": str(e)}), 500
+    return jsonify({"status": "success", "level": level, "data": data})
+
+@rollups_bp.route('/rollups/<level>/<key>', methods=['GET'])
+@cached_response
+def rollup(level, key):
+    if level not in LEVELS:
+        return jsonify({"status": "error", "error": f"level has to be one of {', '.join(LEVELS)}"}), 400
+    doc = get_collection(ROLLUPS_COLLECTION, route="rollups").find_one({"_id": f"{level}:{key}"})
+    if doc is None:
+        return jsonify({"status": "error", "error": f"No rollup for {level} {key}"}), 404
+    return jsonify({"status": "success", "data": summarize(doc)})
+
+@rollups_bp.route('/stores', methods=['GET'])
+@cached_response
+def stores():
+    """
+    store ids with their state and totals, for the map
+    """
+    try:
+        data = read_rollups(get_collection(ROLLUPS_COLLECTION, route="rollups"), "store")
+    except Exception as e:
+        return jsonify({"status": "error", "error": str(e)}), 500
+    return jsonify({"status": "success", "stores": [doc["key"] for doc in data], "data": data})
@@ -1,65 +1,47 @@
-import os
-import sys
-
-# ✅ Step 0: Add root dir to sys.path before anything else
-project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../"))
-if project_root not in sys.path:
-    sys.path.insert(0, project_root)
-
-print("🧭 sys.path (patched):")
-for p in sys.path:
-    print("  ", p)
-
-
-from flask import Blueprint, jsonify
-import subprocess
-import pandas as pd
-import glob
-import numpy as np
-from pymongo import MongoClient
-from joblib import load
-from dotenv import load_dotenv
-import json
-
-load_dotenv()
+from flask import Blueprint, jsonify, request, Response, stream_with_context
+from utils.training_jobs import training_jobs, JobConflict, DEFAULT_DATASET
 
 train_model_bp = Blueprint('train_model_bp', __name__)
 
-@train_model_bp.route('/train-model', methods=['POST'])
 @train_model_bp.route('/train-model', methods=['POST'])
 def train_model():
+    """
+    starts a training job in a worker process and answers right away with its id,
+    progress is read from /train-model/<job_id> or streamed from /train-model/<job_id>/events
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "error": "Expected a json object"}), 400
+    dataset = data.get('dataset', DEFAULT_DATASET)
+    promote = data.get('promote', True)
+    if not isinstance(dataset, str):
+        return jsonify({"status": "error", "error": "dataset must be a string"}), 400
+    if not isinstance(promote, bool):
+        return jsonify({"status": "error", "error": "promote must be true or false"}), 400
     try:
-        print("🚀 Starting run-prediction route...")
-
-        script_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../main.py'))
-        print(f"📍 Training script path: {script_path}")
-
-        if not os.path.exists(script_path):
-            print("❌ main.py not found.")
-            return jsonify({"status": "error", "error": f"Script not found at {script_path}"}), 404
-
-        print("🔧 Running training pipeline...")
-        result = subprocess.run([sys.executable, script_path], capture_output=True, text=True)
-        print("✅ Training script executed.")
-
-        if result.returncode != 0:
-            print(f"❌ Error in training: {result.stderr}")
-            return jsonify({"status": "error", "error": result.stderr}), 500
-
-        stdout_lines = result.stdout.strip().split("\n")
-        print("📜 Full stdout:")
-        for line in stdout_lines:
-            print(line)
-
-        metric_lines = [line for line in stdout_lines if any(m in line for m in ['RMSLE', 'SMAPE'])]
-        print(f"📊 Extracted Metrics: {metric_lines}")
-
-        # ✅ RETURN RESPONSE HERE
-        return jsonify({
-            "status": "success",
-            "metrics": metric_lines
-        })
-
-    except Exception as e:
-        print(f"❗ Exception occurred: {e}")
-        return jsonify({"status": "error", "error": str(e)}), 500
+        job = training_jobs.submit(dataset, promote=promote)
+    except JobConflict as e:
+        return jsonify({"status": "error", "error": str(e), "job_id": e.job['job_id'], "job": e.job}), 409
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+
+    print(f"🚀 Training job {job['job_id']} started for dataset '{job['dataset']}'")
+    return jsonify({"status": "accepted", "job_id": job['job_id'], "job": job}), 202
+
+@train_model_bp.route('/train-model/jobs', methods=['GET'])
+def list_training_jobs():
+    return jsonify({"status": "success", "jobs": training_jobs.list()})
+
+@train_model_bp.route('/train-model/<job_id>', methods=['GET'])
+def training_job_status(job_id):
+    job = training_jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "error": f"Unknown job {job_id}"}), 404
+    return jsonify({"status": "success", "job": job})
+
+@train_model_bp.route('/train-model/<job_id>/events', methods=['GET'])
+def training_job_events(job_id):
+    if training_jobs.get(job_id) is None:
+        return jsonify({"status": "error", "error": f"Unknown job {job_id}"}), 404
+    return Response(stream_with_context(training_jobs.stream(job_id)), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
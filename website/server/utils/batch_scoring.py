@@ -0,0 +1,270 @@
+import os
+import sys
+import time
+import uuid
+import threading
+from itertools import islice
+from datetime import datetime, timedelta
+import pandas as pd
+from pymongo import ReplaceOne, ReturnDocument
+from pymongo.errors import AutoReconnect, OperationFailure, DuplicateKeyError
+from utils.result_cache import result_cache
+from utils.rollups import RollupAccumulator
+
+"""
+Batch scoring job
+
+Scores all of sales_data into predicted_sales without holding the collection in memory and
+without a window where predicted_sales is empty:
+  1. the sales cursor is read in SCORING_BATCH_SIZE documents at a time, each batch is
+     transformed, predicted and written before the next one is read
+  2. writes go to a staging collection of the job as ReplaceOne upserts keyed on the source
+     _id, so a retried batch (or a rerun) overwrites instead of duplicating
+  3. the staging collection gets the read indexes and is renamed over predicted_sales with
+     dropTarget, readers see the old results until the rename and the new ones after it
+  4. the predicted totals of the run, accumulated while streaming, replace those in the
+     store/dept/state/date rollups (utils.rollups)
+One job runs at a time across every worker process and the command line: the job holds a
+lease, a metadata document with its owner and an expiry, renewed after every batch and
+checked again right before the swap. A job that lost its lease (it stalled past
+SCORING_LEASE_SECONDS and another one took over) stops without swapping anything in.
+/run-prediction runs the job on a background thread (scoring_jobs) and answers with its id.
+
+usage (from website/server):
+    python -m utils.batch_scoring
+"""
+SCORING_BATCH_SIZE = int(os.getenv("SCORING_BATCH_SIZE", 5000))
+SCORING_WRITE_RETRIES = int(os.getenv("SCORING_WRITE_RETRIES", 3))
+SCORING_LEASE_SECONDS = float(os.getenv("SCORING_LEASE_SECONDS", 300))
+MAX_FINISHED_JOBS = int(os.getenv("SCORING_MAX_FINISHED_JOBS", 50))
+STAGING_SUFFIX = "_staging"
+LEASE_ID = "batch_scoring_lease"
+
+# fields of the source documents that are not copied to the results
+DROPPED_FIELDS = ["sales", "sales_28_sum"]
+
+
+class ScoringJobRunning(Exception):
+    def __init__(self, message: str, owner: str = None):
+        super().__init__(message)
+        self.owner = owner
+
+
+class ScoringLease:
+    """
+    cross process lock of the scoring job, one document in the metadata collection that is
+    free when missing or expired
+    """
+    def __init__(self, collection, owner: str = None, seconds: float = SCORING_LEASE_SECONDS):
+        self.collection = collection
+        self.owner = owner or uuid.uuid4().hex
+        self.seconds = seconds
+
+    def _take(self, now):
+        return self.collection.find_one_and_update(
+            {"_id": LEASE_ID, "$or": [{"expires_at": {"$lt": now}}, {"owner": self.owner}]},
+            {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.seconds), "renewed_at": now}},
+            upsert=True, return_document=ReturnDocument.AFTER,
+        )
+
+    def acquire(self):
+        """
+        takes the lease or raises ScoringJobRunning with the current owner
+        """
+        try:
+            self._take(datetime.now())
+        except DuplicateKeyError:
+            # the document exists and another owner holds it (the upsert collided on _id)
+            holder = self.collection.find_one({"_id": LEASE_ID}) or {}
+            raise ScoringJobRunning("❌ A batch scoring job is already running", holder.get("owner"))
+        return self
+
+    def renew(self):
+        """
+        extends the lease, raises ScoringJobRunning when another job has taken it
+        """
+        try:
+            self._take(datetime.now())
+        except DuplicateKeyError:
+            holder = self.collection.find_one({"_id": LEASE_ID}) or {}
+            raise ScoringJobRunning("❌ The scoring lease was lost to another job, nothing was swapped in",
+                                    holder.get("owner"))
+
+    def release(self):
+        self.collection.delete_one({"_id": LEASE_ID, "owner": self.owner})
+
+
+def iter_batches(cursor, batch_size: int):
+    while True:
+        batch = list(islice(cursor, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_batch(collection, docs: list, retries: int = SCORING_WRITE_RETRIES):
+    """
+    idempotent upserts of one batch, retried on transient errors
+    """
+    requests = [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs]
+    for attempt in range(retries + 1):
+        try:
+            return collection.bulk_write(requests, ordered=False)
+        except AutoReconnect:
+            if attempt == retries:
+                raise
+            time.sleep(2 ** attempt * 0.5)
+
+
+def score_batch(model, docs: list, loaded=None) -> list:
+    """
+    source documents + predicted_sales, the source _id is kept so upserts are idempotent
+    """
+    predictions = model.predict_frame(pd.DataFrame.from_records(docs), loaded)
+    return [
+        {**{k: v for k, v in doc.items() if k not in DROPPED_FIELDS}, "predicted_sales": float(prediction)}
+        for doc, prediction in zip(docs, predictions)
+    ]
+
+
+def drop_stale_staging(db):
+    """
+    staging collections left behind by jobs that crashed, only called while holding the lease
+    """
+    from config.mongodb import PREDICTED_SALES_COLLECTION
+    prefix = PREDICTED_SALES_COLLECTION + STAGING_SUFFIX
+    for name in db.list_collection_names():
+        if name.startswith(prefix):
+            db.drop_collection(name)
+
+
+def run_batch_scoring(model=None, db=None, batch_size: int = SCORING_BATCH_SIZE, lease: ScoringLease = None) -> dict:
+    """
+    scores sales_data into a staging collection and swaps it in, one job at a time across
+    processes. a lease that is passed in must already be held, it is released at the end.
+    """
+    from config.mongodb import get_db, SALES_COLLECTION, PREDICTED_SALES_COLLECTION, ROLLUPS_COLLECTION, METADATA_COLLECTION
+    from config.indexes import INDEXES, ensure_indexes
+    if model is None:
+        from utils.scoring import scoring_model as model
+
+    db = db if db is not None else get_db()
+    lease = lease or ScoringLease(db[METADATA_COLLECTION]).acquire()
+    try:
+        # a staging collection per job, a job that lost its lease can not write into the next one's
+        staging_name = f"{PREDICTED_SALES_COLLECTION}{STAGING_SUFFIX}_{lease.owner[:12]}"
+        drop_stale_staging(db)
+        staging = db[staging_name]
+
+        started = time.perf_counter()
+        # load the model before the cursor is opened, an idle cursor can time out. the whole
+        # job scores with this run even if another one is promoted meanwhile
+        loaded = model.load()
+        cursor = db[SALES_COLLECTION].find({}).batch_size(batch_size)
+        rows = 0
+        # predicted totals per store/dept/state/date, set on the rollups after the swap
+        rollups = RollupAccumulator()
+        for batch_number, docs in enumerate(iter_batches(cursor, batch_size), start=1):
+            scored = score_batch(model, docs, loaded)
+            write_batch(staging, scored)
+            rollups.add_predictions(scored)
+            rows += len(docs)
+            lease.renew()
+            print(f"✅ Scored batch {batch_number} ({rows} documents)")
+
+        if rows == 0:
+            db.drop_collection(staging_name)
+            return {"status": "empty", "rows": 0, "collection": PREDICTED_SALES_COLLECTION}
+
+        ## same indexes as the live collection, built before the swap so readers never lose them
+        ensure_indexes(db, {staging_name: INDEXES[PREDICTED_SALES_COLLECTION]})
+        lease.renew()
+        try:
+            staging.rename(PREDICTED_SALES_COLLECTION, dropTarget=True)
+        except OperationFailure as e:
+            raise RuntimeError(f"❌ Could not swap {staging_name} in: {e}")
+        try:
+            rollups.replace_predictions(db[ROLLUPS_COLLECTION], loaded.run_id)
+        except Exception as e:
+            print(f"⚠️ Could not update the rollups, rebuild them with python -m utils.rollups --rebuild: {e}")
+        result_cache.invalidate()
+
+        seconds = time.perf_counter() - started
+        print(f"💾 Swapped {rows} predictions into '{PREDICTED_SALES_COLLECTION}' in {seconds:.1f}s")
+        return {
+            "status": "success",
+            "rows": rows,
+            "batches": batch_number,
+            "seconds": round(seconds, 2),
+            "collection": PREDICTED_SALES_COLLECTION,
+            "model_run_id": loaded.run_id,
+            "finished_at": datetime.now().isoformat(),
+        }
+    except ScoringJobRunning:
+        db.drop_collection(staging_name)
+        raise
+    finally:
+        lease.release()
+
+
+class ScoringJobs:
+    """
+    /run-prediction jobs: the lease is taken on the request thread, so a busy scorer is
+    reported right away, and the job runs on a background thread. records live in memory.
+    """
+    def __init__(self, run=run_batch_scoring):
+        self.run = run
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self) -> dict:
+        from config.mongodb import get_collection, METADATA_COLLECTION
+        job_id = uuid.uuid4().hex
+        lease = ScoringLease(get_collection(METADATA_COLLECTION), owner=job_id).acquire()
+        with self._lock:
+            self.jobs[job_id] = {
+                'job_id': job_id,
+                'status': 'running',
+                'result': None,
+                'error': None,
+                'submitted_at': datetime.now().isoformat(),
+                'finished_at': None,
+            }
+            self._prune()
+        threading.Thread(target=self._run, args=(job_id, lease), name=f"scoring-{job_id[:8]}", daemon=True).start()
+        return self.get(job_id)
+
+    def _run(self, job_id: str, lease: ScoringLease):
+        try:
+            result = self.run(lease=lease)
+            update = {'status': 'succeeded', 'result': result}
+            if result["status"] == "empty":
+                update = {'status': 'failed', 'result': result, 'error': "No data found in MongoDB"}
+        except Exception as e:
+            print(f"❗ Scoring job {job_id} failed: {e}")
+            update = {'status': 'failed', 'error': str(e)}
+        with self._lock:
+            self.jobs[job_id].update(update, finished_at=datetime.now().isoformat())
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job['status'] != 'running']
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self) -> list:
+        with self._lock:
+            return [dict(job) for job in self.jobs.values()]
+
+
+scoring_jobs = ScoringJobs()
+
+
+if __name__ == '__main__':
+    result = run_batch_scoring()
+    print(result)
+    sys.exit(0 if result["status"] in ("success", "empty") else 1)
@@ -1,26 +1,76 @@
+import os
+import numpy as np
 import pandas as pd
 from datetime import timedelta
-from config.mongodb import sales_collection
 
-def compute_features_from_mongo(item_id: str, store_id: str, current_date):
-    start_date = current_date - timedelta(days=60)
+# "python" computes the features from the raw documents (the reference), "aggregate" runs
+# feature_pipeline on the server (needs MongoDB 5.1+ for $densify and $setWindowFields)
+FEATURE_MODE = os.getenv("FEATURE_MODE", "python")
+FEATURE_WINDOW_DAYS = 60
+EMPTY_FEATURES = {
+    "lag_7": 0,
+    "lag_28": 0,
+    "rolling_mean_28": 0,
+    "zero_streak": 0,
+    "price_pct_change": 0,
+}
 
-    cursor = sales_collection.find({
+def feature_filter(item_id: str, store_id: str, current_date):
+    return {
         "item_id": item_id,
         "store_id": store_id,
-        "date": {"$gte": start_date, "$lt": current_date},
+        "date": {"$gte": current_date - timedelta(days=FEATURE_WINDOW_DAYS), "$lt": current_date},
+        "sales": {"$exists": True}
+    }
+
+def batch_feature_filter(pairs, current_date):
+    """
+    one query for the windows of many (item_id, store_id) pairs, item ids grouped per store so
+    the item_store_date index answers every branch
+    """
+    items_per_store = {}
+    for item_id, store_id in pairs:
+        items_per_store.setdefault(store_id, set()).add(item_id)
+    return {
+        "$or": [{"store_id": store_id, "item_id": {"$in": sorted(items)}} for store_id, items in items_per_store.items()],
+        "date": {"$gte": current_date - timedelta(days=FEATURE_WINDOW_DAYS), "$lt": current_date},
         "sales": {"$exists": True}
-    })
+    }
+
+def compute_features_from_mongo(item_id: str, store_id: str, current_date, mode: str = None):
+    # imported here so compute_features_from_records can be used without a database (and
+    # without the server's utils package, benchmarks load this module by path)
+    from config.mongodb import get_collection, SALES_COLLECTION
+    from utils.metrics import timed
+    sales_collection = get_collection(SALES_COLLECTION, route="features")
+
+    mode = mode or FEATURE_MODE
+    if mode == "aggregate":
+        return compute_features_from_aggregation(sales_collection, item_id, store_id, current_date)
+    if mode != "python":
+        raise ValueError(f"❌ Unknown feature mode '{mode}'")
+
+    records = list(sales_collection.find(feature_filter(item_id, store_id, current_date)))
+    with timed("features"):
+        return compute_features_from_records(records, item_id, store_id, current_date)
+
+def feature_values(row):
+    """
+    feature dict from the latest row, missing (and nan) features count as 0
+    """
+    return {
+        "lag_7": int(row['lag_7']) if pd.notna(row['lag_7']) else 0,
+        "lag_28": int(row['lag_28']) if pd.notna(row['lag_28']) else 0,
+        "rolling_mean_28": float(row['rolling_mean_28']) if pd.notna(row['rolling_mean_28']) else 0,
+        "zero_streak": int(row['zero_streak']) if pd.notna(row['zero_streak']) else 0,
+        "price_pct_change": float(row['price_pct_change']) if pd.notna(row['price_pct_change']) else 0,
+    }
 
-    df = pd.DataFrame(list(cursor))
+def compute_features_from_records(records, item_id: str, store_id: str, current_date):
+    df = pd.DataFrame(records)
 
     if df.empty or 'date' not in df.columns:
-        return {
-            "lag_7": 0,
-            "lag_28": 0,
-            "rolling_mean_28": 0,
-            "zero_streak": 0,
-        }
+        return dict(EMPTY_FEATURES)
 
     df['date'] = pd.to_datetime(df['date'])
     df = df.sort_values('date')
@@ -51,18 +101,149 @@ def compute_features_from_mongo(item_id: str, store_id: str, current_date):
         .transform(lambda x: x.eq(0).astype(int).groupby(x.ne(0).cumsum()).cumsum())
     )
 
+    if 'sell_price' not in df.columns:
+        df['sell_price'] = float('nan')
     df['price_pct_change'] = (
         df.groupby('id')['sell_price']
           .pct_change(fill_method=None)
           .fillna(0)
     )
 
-    latest_row = df.iloc[-1]
+    return feature_values(df.iloc[-1])
 
-    return {
-        "lag_7": int(latest_row['lag_7']) if pd.notna(latest_row['lag_7']) else 0,
-        "lag_28": int(latest_row['lag_28']) if pd.notna(latest_row['lag_28']) else 0,
-        "rolling_mean_28": float(latest_row['rolling_mean_28']) if pd.notna(latest_row['rolling_mean_28']) else 0,
-        "zero_streak": int(latest_row['zero_streak']) if pd.notna(latest_row['zero_streak']) else 0,
-        "price_pct_change": float(latest_row['price_pct_change']) if pd.notna(latest_row['price_pct_change']) else 0,
-    }
+def missing_value(expression):
+    """
+    true for null, missing and nan (nan compares below every number in mongo, never compare it)
+    """
+    return {"$or": [{"$eq": [{"$ifNull": [expression, None]}, None]}, {"$eq": [expression, float('nan')]}]}
+
+def feature_pipeline(item_id: str, store_id: str, current_date):
+    """
+    aggregation returning the single feature document of the day before current_date, the
+    server side twin of compute_features_from_records: the series is densified to one
+    document per day, days before the first stored one are kept out of every feature and
+    missing days count as 0 sales with no price.
+    """
+    in_series = {"$and": [{"$ne": ["$first_date", None]}, {"$gte": ["$date", "$first_date"]}]}
+    return [
+        {"$match": feature_filter(item_id, store_id, current_date)},
+        {"$project": {"_id": 0, "date": 1, "sales": 1, "sell_price": 1, "observed_date": "$date"}},
+        {"$densify": {"field": "date", "range": {
+            "step": 1, "unit": "day",
+            "bounds": [current_date - timedelta(days=FEATURE_WINDOW_DAYS), current_date],
+        }}},
+        {"$setWindowFields": {"sortBy": {"date": 1}, "output": {
+            "first_date": {"$min": "$observed_date", "window": {"documents": ["unbounded", "unbounded"]}},
+        }}},
+        # sales of the reindexed series (null before the first day, nan and missing as 0)
+        {"$set": {"sales": {"$cond": [in_series, {"$cond": [missing_value("$sales"), 0, "$sales"]}, None]}}},
+        {"$set": {"nonzero_date": {"$cond": [
+            {"$and": [{"$ne": ["$sales", None]}, {"$ne": ["$sales", 0]}]}, "$date", None,
+        ]}}},
+        {"$setWindowFields": {"sortBy": {"date": 1}, "output": {
+            "lag_7": {"$shift": {"output": "$sales", "by": -7}},
+            "lag_28": {"$shift": {"output": "$sales", "by": -28}},
+            "rolling_mean_28": {"$avg": "$sales", "window": {"documents": [-28, -1]}},
+            "last_nonzero_date": {"$max": "$nonzero_date", "window": {"documents": ["unbounded", "current"]}},
+            "previous_price": {"$shift": {"output": "$sell_price", "by": -1}},
+        }}},
+        {"$sort": {"date": -1}},
+        {"$limit": 1},
+        {"$project": {
+            "_id": 0,
+            "lag_7": 1,
+            "lag_28": 1,
+            "rolling_mean_28": 1,
+            # zeros back to the last nonzero day, or to the first day of the series
+            "zero_streak": {"$cond": [{"$eq": ["$sales", 0]}, {"$ifNull": [
+                {"$dateDiff": {"startDate": "$last_nonzero_date", "endDate": "$date", "unit": "day"}},
+                {"$add": [{"$dateDiff": {"startDate": "$first_date", "endDate": "$date", "unit": "day"}}, 1]},
+            ]}, 0]},
+            # pct_change: x / previous - 1, division by 0 gives +-inf (0 / 0 is nan -> 0)
+            "price_pct_change": {"$switch": {"branches": [
+                {"case": {"$or": [missing_value("$sell_price"), missing_value("$previous_price")]}, "then": None},
+                {"case": {"$and": [{"$eq": ["$previous_price", 0]}, {"$gt": ["$sell_price", 0]}]},
+                 "then": {"$literal": float('inf')}},
+                {"case": {"$and": [{"$eq": ["$previous_price", 0]}, {"$lt": ["$sell_price", 0]}]},
+                 "then": {"$literal": float('-inf')}},
+                {"case": {"$eq": ["$previous_price", 0]}, "then": None},
+            ], "default": {"$subtract": [{"$divide": ["$sell_price", "$previous_price"]}, 1]}}},
+        }},
+    ]
+
+def compute_features_from_aggregation(sales_collection, item_id: str, store_id: str, current_date):
+    """
+    features computed by the server, only the final feature document is transferred
+    """
+    docs = list(sales_collection.aggregate(feature_pipeline(item_id, store_id, current_date)))
+    if not docs:
+        return dict(EMPTY_FEATURES)
+    return feature_values({name: docs[0].get(name) for name in EMPTY_FEATURES})
+
+def compute_features_batch_from_mongo(pairs, current_date):
+    """
+    features of many (item_id, store_id) pairs from a single grouped query
+    """
+    from config.mongodb import get_collection, SALES_COLLECTION
+    from utils.metrics import timed
+    sales_collection = get_collection(SALES_COLLECTION, route="features")
+
+    pairs = list(dict.fromkeys(pairs))
+    if not pairs:
+        return {}
+    records = list(sales_collection.find(batch_feature_filter(pairs, current_date),
+                                         {"_id": 0, "item_id": 1, "store_id": 1, "date": 1, "sales": 1, "sell_price": 1}))
+    with timed("features_batch"):
+        return compute_features_batch_from_records(records, pairs, current_date)
+
+def compute_features_batch_from_records(records, pairs, current_date):
+    """
+    compute_features_from_records for many pairs at once on a (pairs x days) grid, day
+    FEATURE_WINDOW_DAYS - 1 being the day before current_date. returns {(item_id, store_id): features}
+    """
+    pairs = list(dict.fromkeys(pairs))
+    n_days = FEATURE_WINDOW_DAYS
+    position_of = {pair: i for i, pair in enumerate(pairs)}
+    sales = np.full((len(pairs), n_days), np.nan)
+    prices = np.full((len(pairs), n_days), np.nan)
+    first_day = np.full(len(pairs), n_days)
+
+    for record in records:
+        row = position_of.get((record.get("item_id"), record.get("store_id")))
+        if row is None or record.get("date") is None:
+            continue
+        day = n_days - (current_date - pd.Timestamp(record["date"]).to_pydatetime()).days
+        if not 0 <= day < n_days:
+            continue
+        sales[row, day] = np.nan if record.get("sales") is None else record["sales"]
+        prices[row, day] = np.nan if record.get("sell_price") is None else record["sell_price"]
+        first_day[row] = min(first_day[row], day)
+
+    ## the reindexed series: missing days and nan sales are 0, days before the first are out
+    days = np.arange(n_days)
+    in_series = days[None, :] >= first_day[:, None]
+    sales = np.where(in_series, np.nan_to_num(sales, nan=0.0), np.nan)
+    last = n_days - 1
+
+    window = sales[:, last - 28:last]
+    counts = (~np.isnan(window)).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rolling_mean = np.nansum(window, axis=1) / counts
+        price_pct_change = prices[:, last] / prices[:, last - 1] - 1
+
+    nonzero_day = np.where(in_series & (sales != 0), days[None, :], -1).max(axis=1)
+    zero_streak = np.where(sales[:, last] == 0, last - np.maximum(nonzero_day, first_day - 1), 0)
+
+    features = {}
+    for i, pair in enumerate(pairs):
+        if first_day[i] == n_days:
+            features[pair] = dict(EMPTY_FEATURES)
+            continue
+        features[pair] = feature_values({
+            "lag_7": sales[i, last - 7],
+            "lag_28": sales[i, last - 28],
+            "rolling_mean_28": rolling_mean[i],
+            "zero_streak": zero_streak[i],
+            "price_pct_change": price_pct_change[i],
+        })
+    return features
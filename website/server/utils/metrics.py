@@ -0,0 +1,242 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import g, request, has_request_context, Response
+from pymongo import monitoring
+
+"""
+Serving metrics
+
+Counters, gauges and histograms kept in process memory and rendered in the Prometheus text
+exposition format on GET /metrics (each worker exposes its own). Recorded:
+  - every request: latency per route template and method, status counts, in-flight
+    requests and unhandled exceptions (init_app)
+  - every MongoDB command by collection and command name (MongoCommandMetrics, a pymongo
+    command listener on the shared client)
+  - feature computation and model inference stages (observe_stage / timed)
+With METRICS_TIMING_HEADERS=1 every response also carries a Server-Timing header with the
+time its request spent in the database, features and model (shown by browser devtools).
+Durations of streamed responses stop when the handler returns, not when the body is sent.
+Single /predict rows are scored on the micro batcher thread, their model time only shows in
+the stage histogram.
+"""
+METRICS_TIMING_HEADERS = os.getenv("METRICS_TIMING_HEADERS", "0") == "1"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _label_text(names, values) -> str:
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    pairs = (f'{name}="{value}"' for name, value in zip(names, escaped))
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict):
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_label_text(self.label_names, key)} {_number(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0}
+            state['counts'][bisect_left(self.buckets, value)] += 1
+            state['sum'] += value
+
+    def render(self) -> list:
+        with self._lock:
+            values = sorted((key, list(state['counts']), state['sum']) for key, state in self._values.items())
+        lines = self.header()
+        bucket_names = self.label_names + ("le",)
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_label_text(bucket_names, key + (_number(bound),))} {cumulative}")
+            labels = _label_text(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "Requests by route, method and status", ("route", "method", "status")))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Request latency by route and method", ("route", "method")))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "Requests being handled"))
+HTTP_EXCEPTIONS = REGISTRY.register(Counter(
+    "http_request_exceptions_total", "Unhandled exceptions by route and type", ("route", "exception")))
+MONGO_SECONDS = REGISTRY.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency by collection and command", ("collection", "command")))
+MONGO_FAILURES = REGISTRY.register(Counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands by collection and command", ("collection", "command")))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "serving_stage_duration_seconds", "Feature computation and model inference time by stage", ("stage",)))
+
+# Server-Timing metric names of the recorded stages
+TIMING_NAMES = {'db': 'db', 'features': 'features', 'features_batch': 'features', 'transform': 'model', 'predict': 'model'}
+
+
+def _add_request_timing(name: str, seconds: float):
+    if has_request_context() and hasattr(g, 'timings'):
+        name = TIMING_NAMES.get(name, name)
+        g.timings[name] = g.timings.get(name, 0.0) + seconds
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    _add_request_timing(stage, seconds)
+
+
+@contextmanager
+def timed(stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    command latency per collection and command name. pymongo calls the listener on the
+    thread that runs the command, so the time also lands in that request's Server-Timing.
+    """
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(event):
+        return event.connection_id, event.request_id
+
+    def started(self, event):
+        # getMore carries the cursor id under its name and the collection separately
+        collection = event.command.get('collection' if event.command_name == 'getMore' else event.command_name)
+        with self._lock:
+            self._collections[self._key(event)] = collection if isinstance(collection, str) else ""
+
+    def _finished(self, event, failed: bool):
+        with self._lock:
+            collection = self._collections.pop(self._key(event), "")
+        seconds = event.duration_micros / 1e6
+        MONGO_SECONDS.observe(seconds, collection=collection, command=event.command_name)
+        if failed:
+            MONGO_FAILURES.inc(collection=collection, command=event.command_name)
+        _add_request_timing('db', seconds)
+
+    def succeeded(self, event):
+        self._finished(event, failed=False)
+
+    def failed(self, event):
+        self._finished(event, failed=True)
+
+
+mongo_command_metrics = MongoCommandMetrics()
+
+
+def route_label() -> str:
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def init_app(app):
+    """
+    request metrics hooks and the /metrics endpoint
+    """
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.timings = {}
+        g.in_flight = True
+        HTTP_IN_FLIGHT.inc()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        seconds = time.perf_counter() - started
+        route = route_label()
+        HTTP_REQUEST_SECONDS.observe(seconds, route=route, method=request.method)
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        if METRICS_TIMING_HEADERS:
+            timings = [f"{name};dur={value * 1000:.1f}" for name, value in g.timings.items()]
+            response.headers.add("Server-Timing", ", ".join(timings + [f"app;dur={seconds * 1000:.1f}"]))
+        return response
+
+    @app.teardown_request
+    def finish_request(error=None):
+        if g.pop('in_flight', False):
+            HTTP_IN_FLIGHT.dec()
+        if error is not None:
+            HTTP_EXCEPTIONS.inc(route=route_label(), exception=type(error).__name__)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+    return app
@@ -0,0 +1,95 @@
+import os
+import base64
+from bson import json_util
+
+"""
+Keyset pagination
+
+Pages are read newest first on _id and continue from the last document of the previous page
+with a range predicate, so every page costs the same as the first one no matter how deep it
+is. The key is _id and not created_at: every document has an _id and all of them are
+ObjectIds (which start with their creation time), while created_at is missing on bulk loaded
+rows and a string on submitted ones. A range on a field of mixed BSON types only matches the
+type of its bound, pages after a type change would silently lose rows.
+The continuation token is opaque to clients: url safe base64 of the last _id as extended json.
+"""
+SORT_FIELD = "_id"
+DEFAULT_PAGE_SIZE = int(os.getenv("PAGE_SIZE", 1000))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 5000))
+SORT = [(SORT_FIELD, -1)]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(doc) -> str:
+    payload = json_util.dumps({"i": doc["_id"]})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return payload["i"]
+    except Exception:
+        raise InvalidCursor("invalid cursor")
+
+
+def keyset_filter(token: str, base_filter: dict = None) -> dict:
+    """
+    documents after the cursor in _id desc order
+    """
+    base_filter = base_filter or {}
+    if not token:
+        return base_filter
+    after = {"_id": {"$lt": decode_cursor(token)}}
+    return {"$and": [base_filter, after]} if base_filter else after
+
+
+def parse_page_size(value) -> int:
+    if value in (None, ""):
+        return DEFAULT_PAGE_SIZE
+    page_size = int(value)
+    if page_size < 1:
+        raise ValueError("limit has to be positive")
+    return min(page_size, MAX_PAGE_SIZE)
+
+
+def parse_fields(value, always=("_id",)):
+    """
+    projection from a comma separated `fields` argument, None returns every field.
+    the sort key is always projected, the next cursor is built from it
+    """
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(",") if field.strip()]
+    return {field: 1 for field in list(always) + fields}
+
+
+class PageStream:
+    """
+    the documents of one page read lazily from the cursor, so a page is never held in memory
+    as a whole. next_cursor is set once the page was read to the end.
+    """
+    def __init__(self, collection, token: str = None, page_size: int = DEFAULT_PAGE_SIZE,
+                 projection: dict = None, base_filter: dict = None, batch_size: int = 500):
+        self.page_size = page_size
+        self.next_cursor = None
+        self.cursor = (collection.find(keyset_filter(token, base_filter), projection)
+                       .sort(SORT)
+                       .limit(page_size + 1)
+                       .batch_size(min(batch_size, page_size + 1)))
+
+    def __iter__(self):
+        last = None
+        try:
+            for n, doc in enumerate(self.cursor):
+                if n == self.page_size:
+                    self.next_cursor = encode_cursor(last)
+                    break
+                last = doc
+                yield doc
+        finally:
+            self.cursor.close()
@@ -0,0 +1,166 @@
+import os
+import time
+import threading
+from functools import wraps
+from collections import OrderedDict
+from flask import request, Response
+
+"""
+Result cache
+
+Rendered responses of the dashboard reads are kept in process memory, keyed by route, query
+string, Accept and gzip, so repeated page loads skip Mongo and the encoder. Entries leave on
+LRU eviction (RESULT_CACHE_MAX_ENTRIES entries, RESULT_CACHE_MAX_MB of bodies), after
+RESULT_CACHE_TTL_SECONDS, or when a write bumps the generation: submitting inputs and batch
+scoring call invalidate(). A response rendered while the generation moved on is not stored,
+so a read racing a write never caches the old data. Writes from other processes (dbpush, a
+scoring job on another worker) show up after the TTL.
+"""
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE", "1") == "1"
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", 30))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 256))
+RESULT_CACHE_MAX_MB = float(os.getenv("RESULT_CACHE_MAX_MB", 64))
+
+
+class ResultCache:
+    """
+    LRU of (body, status, headers) with a TTL, a byte budget and a generation counter
+    """
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES, max_bytes: int = int(RESULT_CACHE_MAX_MB * 2 ** 20),
+                 ttl_seconds: float = RESULT_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['expires'] < time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry['value']
+
+    def put(self, key, value, size: int, generation: int) -> bool:
+        """
+        stores value unless the generation it was read at is stale or it does not fit the budget
+        """
+        with self._lock:
+            if generation != self.generation or size > self.max_bytes:
+                return False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = {'value': value, 'size': size, 'expires': time.monotonic() + self.ttl_seconds}
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def _drop(self, key):
+        self.bytes -= self._entries.pop(key)['size']
+
+    def invalidate(self):
+        """
+        drops every entry, fills that started before this call are not stored
+        """
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': RESULT_CACHE_ENABLED,
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'generation': self.generation,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+result_cache = ResultCache()
+
+
+def request_key():
+    return (request.path, tuple(sorted(request.args.items(multi=True))),
+            request.headers.get("Accept", ""), "gzip" in request.headers.get("Accept-Encoding", "").lower())
+
+
+def _tee(chunks, key, headers: list, generation: int):
+    """
+    yields the chunks of a streamed body as they are sent and stores the whole body once the
+    stream ended within the byte budget. a body that outgrows it, or a client that hangs up
+    before the end, is not stored.
+    """
+    parts, size = [], 0
+    try:
+        for chunk in chunks:
+            if parts is not None:
+                size += len(chunk)
+                if size > result_cache.max_bytes:
+                    parts = None
+                else:
+                    parts.append(chunk)
+            yield chunk
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+    if parts is not None:
+        result_cache.put(key, (b"".join(parts), 200, headers), size, generation)
+
+
+def cached_response(view):
+    """
+    serves a GET view from result_cache, only 200 responses are stored. a streamed body is
+    still streamed on a miss, it is copied into the cache while it goes out.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not RESULT_CACHE_ENABLED:
+            return view(*args, **kwargs)
+        key = request_key()
+        cached = result_cache.get(key)
+        if cached is not None:
+            body, status, headers = cached
+            return Response(body, status=status, headers=headers + [("X-Cache", "HIT")])
+
+        generation = result_cache.generation
+        response = view(*args, **kwargs)
+        if isinstance(response, Response) and response.status_code == 200:
+            # pairs, not a dict: repeated headers (Vary, Set-Cookie) are kept
+            headers = [(k, v) for k, v in response.headers.items() if k != "Content-Length"]
+            if response.is_streamed:
+                response.response = _tee(response.iter_encoded(), key, headers, generation)
+            else:
+                body = response.get_data()
+                result_cache.put(key, (body, 200, headers), len(body), generation)
+            response.headers["X-Cache"] = "MISS"
+        return response
+    return wrapper
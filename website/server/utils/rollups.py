@@ -0,0 +1,206 @@
+import sys
+import math
+from datetime import datetime
+from collections import defaultdict
+from pymongo import UpdateOne
+
+"""
+Aggregate rollups
+
+Store, department, state and date totals live in the sales_rollups collection, one document
+per (level, key) with _id "<level>:<key>", so the map and summary views read a handful of
+documents instead of scanning sales_data or predicted_sales. They are kept up to date
+incrementally:
+  - every insert into sales_data adds its rows, sales and prices with upserted $inc
+    (controllers.input_controller, utils/dbpush.py)
+  - batch scoring accumulates the predicted totals of the run while it streams and sets
+    them when the new predictions are swapped in; keys the run did not score are reset
+averages are derived from the sums when they are read. `python -m utils.rollups --rebuild`
+recomputes everything from sales_data and predicted_sales (bootstrap, or after writes that
+bypassed the rollups).
+
+overstock is stock the prediction will not move: actual_stock - predicted_sales when a
+document has a stock figure, otherwise the 28 day run rate (rolling_mean_28) minus the
+prediction, never below 0.
+"""
+LEVELS = {
+    'store': 'store_id',
+    'dept': 'dept_id',
+    'state': 'state_id',
+    'date': 'date',
+}
+SALES_FIELDS = ('rows', 'sales_sum', 'sales_count', 'price_sum', 'price_count')
+PREDICTED_FIELDS = ('predicted_rows', 'predicted_sum', 'overstock_sum', 'overstock_count')
+
+
+def _number(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value) else None
+
+
+def date_key(doc):
+    """
+    YYYY-MM-DD of a document, submitted inputs only carry created_at
+    """
+    value = doc.get('date') or doc.get('created_at')
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    return str(value)[:10] if value else None
+
+
+def rollup_keys(doc):
+    for level, field in LEVELS.items():
+        key = date_key(doc) if level == 'date' else doc.get(field)
+        if key is not None:
+            yield level, str(key)
+
+
+def overstock(doc):
+    predicted = _number(doc.get('predicted_sales'))
+    if predicted is None:
+        return None
+    stock = _number(doc.get('actual_stock'))
+    baseline = stock if stock is not None else _number(doc.get('rolling_mean_28'))
+    return None if baseline is None else max(baseline - predicted, 0.0)
+
+
+class RollupAccumulator:
+    """
+    per (level, key) sums of a set of documents, merged into the collection in one bulk write
+    """
+    def __init__(self):
+        self.totals = defaultdict(lambda: defaultdict(int))
+        self.labels = {}
+
+    def _add(self, doc, values: dict):
+        for level, key in rollup_keys(doc):
+            totals = self.totals[(level, key)]
+            for field, value in values.items():
+                totals[field] += value
+            if level == 'store' and doc.get('state_id'):
+                self.labels[(level, key)] = {'state_id': doc['state_id']}
+
+    def add_sales(self, docs):
+        for doc in docs:
+            sales, price = _number(doc.get('sales')), _number(doc.get('sell_price'))
+            self._add(doc, {
+                'rows': 1,
+                'sales_sum': sales or 0.0, 'sales_count': int(sales is not None),
+                'price_sum': price or 0.0, 'price_count': int(price is not None),
+            })
+        return self
+
+    def add_predictions(self, docs):
+        for doc in docs:
+            predicted, excess = _number(doc.get('predicted_sales')), overstock(doc)
+            self._add(doc, {
+                'predicted_rows': 1,
+                'predicted_sum': predicted or 0.0,
+                'overstock_sum': excess or 0.0, 'overstock_count': int(excess is not None),
+            })
+        return self
+
+    def _requests(self, totals_operator: str, extra: dict = None):
+        now = datetime.now()
+        requests = []
+        for (level, key), totals in self.totals.items():
+            fields = {'level': level, 'key': key, 'updated_at': now, **self.labels.get((level, key), {}), **(extra or {})}
+            if totals_operator == '$set':
+                update = {'$set': {**fields, **totals}}
+            else:
+                update = {totals_operator: dict(totals), '$set': fields}
+            requests.append(UpdateOne({'_id': f"{level}:{key}"}, update, upsert=True))
+        return requests
+
+    def increment(self, collection):
+        """
+        adds the sums to the rollups (sales side, every insert)
+        """
+        requests = self._requests('$inc')
+        if requests:
+            collection.bulk_write(requests, ordered=False)
+        return len(requests)
+
+    def replace_predictions(self, collection, run_id=None):
+        """
+        sets the predicted sums of a scoring run and zeroes them on keys the run did not score
+        """
+        scored_at = datetime.now()
+        # mongo keeps milliseconds, the untouched keys are found by comparing this value
+        scored_at = scored_at.replace(microsecond=scored_at.microsecond // 1000 * 1000)
+        run = {'predicted_run_id': run_id, 'predicted_at': scored_at}
+        requests = self._requests('$set', run)
+        if requests:
+            collection.bulk_write(requests, ordered=False)
+        collection.update_many({'predicted_at': {'$ne': scored_at}},
+                               {'$set': {**{field: 0 for field in PREDICTED_FIELDS}, **run}})
+        return len(requests)
+
+
+def apply_sales(collection, docs):
+    """
+    $inc of inserted sales documents, a failure only leaves the rollups behind (rebuild fixes them)
+    """
+    try:
+        return RollupAccumulator().add_sales(docs).increment(collection)
+    except Exception as e:
+        print(f"⚠️ Could not update the rollups: {e}")
+        return 0
+
+
+def summarize(doc: dict) -> dict:
+    """
+    rollup document with the averages derived from its sums
+    """
+    def ratio(total, count):
+        return round(doc.get(total, 0) / doc[count], 4) if doc.get(count) else None
+
+    summary = {k: v for k, v in doc.items() if k != '_id'}
+    summary['avg_sales'] = ratio('sales_sum', 'sales_count')
+    summary['avg_price'] = ratio('price_sum', 'price_count')
+    summary['avg_predicted_sales'] = ratio('predicted_sum', 'predicted_rows')
+    summary['avg_overstock'] = ratio('overstock_sum', 'overstock_count')
+    return summary
+
+
+def read_rollups(collection, level: str, start: str = None, end: str = None, limit: int = None) -> list:
+    """
+    rollups of a level ordered by key, start/end bound the keys (dates for the date level)
+    """
+    if level not in LEVELS:
+        raise ValueError(f"level has to be one of {', '.join(LEVELS)}")
+    query = {'level': level}
+    if start or end:
+        query['key'] = {**({'$gte': start} if start else {}), **({'$lte': end} if end else {})}
+    cursor = collection.find(query).sort('key', 1)
+    if limit:
+        cursor = cursor.limit(limit)
+    return [summarize(doc) for doc in cursor]
+
+
+def rebuild_rollups(db, batch_size: int = 10000) -> int:
+    """
+    recomputes every rollup from sales_data and predicted_sales, one pass over each
+    """
+    from config.mongodb import SALES_COLLECTION, PREDICTED_SALES_COLLECTION, ROLLUPS_COLLECTION
+    rebuilt = ROLLUPS_COLLECTION + "_rebuild"
+    db.drop_collection(rebuilt)
+    sales = RollupAccumulator()
+    for doc in db[SALES_COLLECTION].find({}).batch_size(batch_size):
+        sales.add_sales([doc])
+    predicted = RollupAccumulator()
+    for doc in db[PREDICTED_SALES_COLLECTION].find({}).batch_size(batch_size):
+        predicted.add_predictions([doc])
+    count = sales.increment(db[rebuilt])
+    predicted.replace_predictions(db[rebuilt])
+    db[rebuilt].create_index([('level', 1), ('key', 1)], name='level_key')
+    db[rebuilt].rename(ROLLUPS_COLLECTION, dropTarget=True)
+    print(f"📊 Rebuilt {db[ROLLUPS_COLLECTION].count_documents({})} rollups")
+    return count
+
+
+if __name__ == '__main__':
+    if '--rebuild' not in sys.argv[1:]:
+        print("usage (from website/server): python -m utils.rollups --rebuild")
+        sys.exit(2)
+    from config.mongodb import get_db
+    rebuild_rollups(get_db())
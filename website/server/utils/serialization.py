@@ -0,0 +1,163 @@
+import os
+import json
+import zlib
+from datetime import datetime, date
+from itertools import islice, chain
+from operator import methodcaller
+from flask import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+"""
+Streaming serialization
+
+Pages of documents are encoded in chunks of SERIALIZE_CHUNK_SIZE documents straight from the
+cursor, one encoder call per chunk. orjson writes NaN/Infinity as null and datetimes as ISO
+strings itself, ObjectIds (and anything else it does not know) go through json_default, so
+there is no per-field loop in Python. Without orjson the stdlib encoder is used and only a
+chunk that actually holds NaN/Infinity is cleaned value by value.
+
+The format is picked by ?format= or the Accept header:
+    json      {"status": "success", "data": [...], "next_cursor": ...}  (default)
+    ndjson    one document per line, then {"status": "success", "next_cursor": ...}
+    columnar  {"status": "success", "columns": {"field": [...]}, "count": n, "next_cursor": ...}
+and the body is gzipped when the client sends Accept-Encoding: gzip.
+"""
+SERIALIZE_CHUNK_SIZE = int(os.getenv("SERIALIZE_CHUNK_SIZE", 200))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 5))
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+COLUMNAR_MIMETYPE = "application/vnd.columnar+json"
+FORMATS = ("json", "ndjson", "columnar")
+
+
+def json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _finite(value):
+    return None if isinstance(value, float) and (value != value or value in (float("inf"), float("-inf"))) else value
+
+
+def _clean(value):
+    if isinstance(value, dict):
+        return {k: _clean(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_clean(v) for v in value]
+    return _finite(value)
+
+
+if orjson is not None:
+    def dumps(value) -> bytes:
+        return orjson.dumps(value, default=json_default)
+else:
+    def dumps(value) -> bytes:
+        encoded = json.dumps(value, default=json_default, separators=(",", ":"))
+        if "NaN" in encoded or "Infinity" in encoded:
+            encoded = json.dumps(_clean(value), default=json_default, separators=(",", ":"))
+        return encoded.encode()
+
+
+def negotiate_format(request) -> str:
+    """
+    ?format= wins over the Accept header, json when neither asks for something else
+    """
+    requested = request.args.get("format")
+    if requested:
+        if requested not in FORMATS:
+            raise ValueError(f"format has to be one of {', '.join(FORMATS)}")
+        return requested
+    accept = request.headers.get("Accept", "")
+    if NDJSON_MIMETYPE in accept:
+        return "ndjson"
+    if COLUMNAR_MIMETYPE in accept:
+        return "columnar"
+    return "json"
+
+
+def accepts_gzip(request) -> bool:
+    return "gzip" in request.headers.get("Accept-Encoding", "").lower()
+
+
+def chunked(docs, chunk_size: int = SERIALIZE_CHUNK_SIZE):
+    docs = iter(docs)
+    while True:
+        chunk = list(islice(docs, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def encode_json(chunks, page):
+    yield b'{"status":"success","data":['
+    first = True
+    for chunk in chunks:
+        body = dumps(chunk)[1:-1]
+        yield body if first else b"," + body
+        first = False
+    yield b'],"next_cursor":' + dumps(page.next_cursor) + b"}"
+
+
+def encode_ndjson(chunks, page):
+    for chunk in chunks:
+        yield b"".join(dumps(doc) + b"\n" for doc in chunk)
+    yield dumps({"status": "success", "next_cursor": page.next_cursor}) + b"\n"
+
+
+def encode_columnar(chunks, page):
+    """
+    arrays per field, fields missing from a document are null. needs the whole page before
+    the first byte, field names only go out once.
+    """
+    docs = [doc for chunk in chunks for doc in chunk]
+    fields = dict.fromkeys(chain.from_iterable(docs))
+    columns = {field: list(map(methodcaller("get", field), docs)) for field in fields}
+    yield dumps({"status": "success", "columns": columns, "count": len(docs), "next_cursor": page.next_cursor})
+
+
+ENCODERS = {"json": (encode_json, "application/json"),
+            "ndjson": (encode_ndjson, NDJSON_MIMETYPE),
+            "columnar": (encode_columnar, "application/json")}
+
+
+def gzipped(parts, level: int = GZIP_LEVEL):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for part in parts:
+        compressed = compressor.compress(part)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def encode_page(page, fmt: str = "json", gzip: bool = False, chunk_size: int = SERIALIZE_CHUNK_SIZE):
+    """
+    (body chunks, mimetype) of a page. the first chunk of documents is read before this
+    returns, so query errors surface before a response is started.
+    """
+    encoder, mimetype = ENCODERS[fmt]
+    chunks = chunked(page, chunk_size)
+    first = next(chunks, None)
+
+    def all_chunks():
+        if first is not None:
+            yield first
+            yield from chunks
+
+    body = encoder(all_chunks(), page)
+    return (gzipped(body) if gzip else body), mimetype
+
+
+def page_response(page, fmt: str = "json", gzip: bool = False, chunk_size: int = SERIALIZE_CHUNK_SIZE) -> Response:
+    """
+    streamed response of a pagination.PageStream, fmt and gzip from negotiate_format/accepts_gzip
+    """
+    body, mimetype = encode_page(page, fmt, gzip, chunk_size)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, mimetype=mimetype, headers=headers)
@@ -0,0 +1,292 @@
+import os
+import sys
+import json
+import uuid
+import socket
+import threading
+import subprocess
+from collections import deque
+from datetime import datetime
+
+"""
+Training jobs
+
+A training request becomes a job that runs the pipeline in its own worker process
+(python -m src.pipeline.training_job, from the project root like main1.py), so the server
+keeps answering while a model trains. The worker reports stage progress and the final
+metrics as json lines on its stdout, a reader thread per job folds them into the job record
+that the status endpoints and the server-sent event stream read. One job at a time runs per
+dataset, across every server process: a lock file per dataset (O_EXCL) holds the pid of its
+worker until the worker exits. A lock whose process is gone (a server or worker that crashed)
+is taken over, one whose worker outlived a server restart still blocks the dataset.
+"""
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../"))
+# named datasets are directories with the three M5 csv files
+TRAINING_DATA_DIR = os.getenv("TRAINING_DATA_DIR", os.path.join(PROJECT_ROOT, "benchmarks", "data"))
+DEFAULT_DATASET = "default"
+DATASET_FILES = {'calendar': 'calendar.csv', 'sales': 'sales_train_validation.csv', 'prices': 'sell_prices.csv'}
+WORKER_MODULE = "src.pipeline.training_job"
+# same value as src.pipeline.training_job.EVENT_PREFIX, not imported to keep the pipeline out of the server
+EVENT_PREFIX = "@@training-event "
+
+# the lock files sit next to the artifacts the runs write
+TRAINING_LOCK_DIR = os.getenv("TRAINING_LOCK_DIR", os.path.join(PROJECT_ROOT, "artifacts"))
+
+ACTIVE_STATUSES = ('queued', 'running')
+MAX_FINISHED_JOBS = int(os.getenv("TRAINING_MAX_FINISHED_JOBS", 50))
+LOG_TAIL_LINES = 50
+
+
+class JobConflict(Exception):
+    def __init__(self, job):
+        super().__init__(f"❌ Training is already running for dataset '{job['dataset']}'")
+        self.job = job
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class DatasetLock:
+    """
+    cross process lock of one dataset, a lock file with the owner's host, pid and job id
+    """
+    def __init__(self, dataset: str, lock_dir: str = TRAINING_LOCK_DIR):
+        self.path = os.path.join(lock_dir, f"training-{dataset}.lock")
+        self.owner = None
+
+    def holder(self):
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # created but not written yet
+            return {}
+
+    def _stale(self, holder) -> bool:
+        return bool(holder) and holder.get('host') == socket.gethostname() and not pid_alive(holder.get('pid', 0))
+
+    def acquire(self, job_id: str, dataset: str):
+        """
+        takes the lock for this process, raises JobConflict with the holder when it is taken
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                holder = self.holder()
+                if holder is None:
+                    continue
+                if not self._stale(holder):
+                    raise JobConflict({'job_id': holder.get('job_id'), 'dataset': dataset, 'pid': holder.get('pid'),
+                                       'host': holder.get('host'), 'status': 'running'})
+                print(f"🔓 Taking over the training lock of dead process {holder.get('pid')}")
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+        self.owner = {'job_id': job_id, 'dataset': dataset, 'host': socket.gethostname(), 'pid': os.getpid(),
+                      'locked_at': datetime.now().isoformat()}
+        with os.fdopen(fd, 'w') as file:
+            json.dump(self.owner, file)
+        return self
+
+    def hand_over(self, pid: int):
+        """
+        records the worker as the owner, the lock then outlives this process as long as the worker runs
+        """
+        self.owner['pid'] = pid
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(self.owner, file)
+        os.replace(tmp_path, self.path)
+
+    def release(self):
+        holder = self.holder()
+        if holder is not None and holder.get('job_id') == self.owner['job_id']:
+            os.remove(self.path)
+
+
+def dataset_paths(dataset: str):
+    """
+    input files of a dataset, None for the configured (default) files
+    """
+    if dataset == DEFAULT_DATASET:
+        return None
+    if not isinstance(dataset, str) or not dataset or os.path.basename(dataset) != dataset or dataset.startswith('.'):
+        raise ValueError(f"Invalid dataset name '{dataset}'")
+    paths = {key: os.path.join(TRAINING_DATA_DIR, dataset, name) for key, name in DATASET_FILES.items()}
+    missing = [path for path in paths.values() if not os.path.exists(path)]
+    if missing:
+        raise ValueError(f"Dataset '{dataset}' is missing {', '.join(map(os.path.basename, missing))}")
+    return paths
+
+
+def worker_command(data_paths, promote: bool = True) -> list:
+    command = [sys.executable, "-m", WORKER_MODULE]
+    for key, path in (data_paths or {}).items():
+        command += [f"--{key}", path]
+    if not promote:
+        command.append("--no-promote")
+    return command
+
+
+class TrainingJobRunner:
+    """
+    job records in memory, one worker process per job
+    """
+    def __init__(self, command=worker_command, cwd: str = PROJECT_ROOT, lock_dir: str = TRAINING_LOCK_DIR):
+        self.command = command
+        self.cwd = cwd
+        self.lock_dir = lock_dir
+        self.jobs = {}
+        self.changed = threading.Condition()
+
+    def submit(self, dataset: str = DEFAULT_DATASET, promote: bool = True) -> dict:
+        """
+        starts a job and returns its record, raises JobConflict when the dataset is busy.
+        a successful run is registered, and promoted (served) unless promote is off.
+        """
+        data_paths = dataset_paths(dataset)
+        with self.changed:
+            for job in self.jobs.values():
+                if job['dataset'] == dataset and job['status'] in ACTIVE_STATUSES:
+                    raise JobConflict(self.get(job['job_id']))
+
+            job_id = uuid.uuid4().hex
+            # other server processes, and workers that outlived a restart of this one
+            lock = DatasetLock(dataset, self.lock_dir).acquire(job_id, dataset)
+            self.jobs[job_id] = {
+                'job_id': job_id,
+                'dataset': dataset,
+                'promote': promote,
+                'status': 'queued',
+                'stage': None,
+                'stages': {},
+                'events': [],
+                'metrics': None,
+                'result': None,
+                'error': None,
+                'pid': None,
+                'log_tail': deque(maxlen=LOG_TAIL_LINES),
+                'submitted_at': datetime.now().isoformat(),
+                'finished_at': None,
+            }
+            self._prune()
+
+            try:
+                process = subprocess.Popen(self.command(data_paths, promote), cwd=self.cwd, stdout=subprocess.PIPE,
+                                           stderr=subprocess.STDOUT, text=True, bufsize=1)
+            except OSError as e:
+                lock.release()
+                self._apply(job_id, {'type': 'failed', 'error': f"Could not start the worker: {e}"})
+                return self.get(job_id)
+            lock.hand_over(process.pid)
+            self._apply(job_id, {'type': 'started', 'pid': process.pid})
+
+        threading.Thread(target=self._follow, args=(job_id, process, lock), name=f"training-{job_id[:8]}",
+                         daemon=True).start()
+        return self.get(job_id)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job['status'] not in ACTIVE_STATUSES]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def _follow(self, job_id: str, process, lock: DatasetLock):
+        """
+        reads the worker's output until it exits, a worker that dies without reporting fails its job
+        """
+        try:
+            self._read(job_id, process)
+        finally:
+            lock.release()
+
+    def _read(self, job_id: str, process):
+        for line in process.stdout:
+            line = line.rstrip("\n")
+            if line.startswith(EVENT_PREFIX):
+                try:
+                    self._apply(job_id, json.loads(line[len(EVENT_PREFIX):]))
+                    continue
+                except ValueError:
+                    pass
+            print(f"[training {job_id[:8]}] {line}")
+            with self.changed:
+                if job_id in self.jobs:
+                    self.jobs[job_id]['log_tail'].append(line)
+        exit_code = process.wait()
+        self._apply(job_id, {'type': 'failed', 'error': f"Worker exited with code {exit_code} without a result"})
+
+    def _apply(self, job_id: str, event: dict):
+        with self.changed:
+            job = self.jobs.get(job_id)
+            if job is None or job['status'] not in ACTIVE_STATUSES:
+                return
+            event.setdefault('time', datetime.now().timestamp())
+            job['events'].append({k: v for k, v in event.items() if k not in ('traceback', 'result')})
+            if event['type'] == 'started':
+                job['status'] = 'running'
+                job['pid'] = event['pid']
+            elif event['type'] == 'stage':
+                job['stage'] = event['stage']
+                job['stages'][event['stage']] = event['status']
+            elif event['type'] == 'completed':
+                job['status'] = 'succeeded'
+                job['result'] = event['result']
+                job['metrics'] = event['result'].get('metrics')
+            elif event['type'] == 'failed':
+                job['status'] = 'failed'
+                job['error'] = event['error']
+                if event.get('traceback'):
+                    print(f"❌ Training job {job_id} failed:\n{event['traceback']}")
+            if job['status'] not in ACTIVE_STATUSES:
+                job['finished_at'] = datetime.now().isoformat()
+            self.changed.notify_all()
+
+    def get(self, job_id: str):
+        with self.changed:
+            job = self.jobs.get(job_id)
+            return json.loads(json.dumps(job, default=list)) if job else None
+
+    def list(self) -> list:
+        with self.changed:
+            return [self.get(job_id) for job_id in self.jobs]
+
+    def stream(self, job_id: str, heartbeat_seconds: float = 15):
+        """
+        server-sent events of a job: every event recorded so far, then new ones as they come,
+        until the job finishes with a final `job` event holding the whole record. comment
+        lines keep idle connections open.
+        """
+        sent = 0
+        while True:
+            with self.changed:
+                job = self.jobs.get(job_id)
+                if job is None:
+                    return
+                if sent == len(job['events']) and job['status'] in ACTIVE_STATUSES:
+                    self.changed.wait(timeout=heartbeat_seconds)
+                events = job['events'][sent:]
+                sent += len(events)
+                finished = job['status'] not in ACTIVE_STATUSES
+            if not events and not finished:
+                yield ": keep-alive\n\n"
+            for event in events:
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+            if finished:
+                yield f"event: job\ndata: {json.dumps(self.get(job_id), default=str)}\n\n"
+                return
+
+
+training_jobs = TrainingJobRunner()
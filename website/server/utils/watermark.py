@@ -0,0 +1,90 @@
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+
+"""
+Sales watermark
+
+"Today" for the submit flow is the day after the latest sales date. Instead of sorting
+sales_data on every request, the latest date lives in one metadata document
+({_id: "sales_watermark", latest_date}) that writers advance atomically with $max, so
+concurrent writers can never move it backwards. Each process caches the value and rereads
+the document (a point read on _id) at most every WATERMARK_REFRESH_SECONDS.
+"""
+WATERMARK_ID = "sales_watermark"
+WATERMARK_REFRESH_SECONDS = float(os.getenv("WATERMARK_REFRESH_SECONDS", 60))
+
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d") if isinstance(value, str) else value
+
+
+def advance_watermark(metadata_collection, latest_date):
+    """
+    moves the watermark to latest_date unless it is already later, atomic on the server
+    """
+    metadata_collection.update_one(
+        {"_id": WATERMARK_ID},
+        {"$max": {"latest_date": parse_date(latest_date)}, "$currentDate": {"updated_at": True}},
+        upsert=True,
+    )
+
+
+def rebuild_watermark(metadata_collection, sales_collection):
+    """
+    sets the watermark from the latest date in sales_data (bootstrap, or after a bulk load
+    that did not advance it), returns that date
+    """
+    latest_doc = sales_collection.find_one({"date": {"$exists": True}}, {"date": 1}, sort=[("date", -1)])
+    if not latest_doc:
+        return None
+    latest_date = parse_date(latest_doc["date"])
+    advance_watermark(metadata_collection, latest_date)
+    return latest_date
+
+
+class SalesWatermark:
+    """
+    in process cache of the watermark, thread safe. the document is created from sales_data
+    the first time it is missing.
+    """
+    def __init__(self, refresh_seconds: float = WATERMARK_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._latest_date = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _collections(self):
+        from config.mongodb import get_collection, SALES_COLLECTION, METADATA_COLLECTION
+        return get_collection(METADATA_COLLECTION, route="submit_input"), get_collection(SALES_COLLECTION, route="submit_input")
+
+    def _load(self):
+        metadata_collection, sales_collection = self._collections()
+        doc = metadata_collection.find_one({"_id": WATERMARK_ID})
+        if doc and doc.get("latest_date") is not None:
+            return parse_date(doc["latest_date"])
+        print("🔖 No sales watermark yet, building it from sales_data")
+        return rebuild_watermark(metadata_collection, sales_collection)
+
+    def latest_date(self):
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at >= self.refresh_seconds:
+            with self._lock:
+                if self._loaded_at is None or now - self._loaded_at >= self.refresh_seconds:
+                    latest_date = self._load()
+                    if latest_date is None:
+                        raise Exception("No sales data with valid date found.")
+                    self._latest_date = max(latest_date, self._latest_date or latest_date)
+                    self._loaded_at = time.monotonic()
+        return self._latest_date
+
+    def next_date(self):
+        return self.latest_date() + timedelta(days=1)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+
+sales_watermark = SalesWatermark()